@@ -26,7 +26,11 @@ from dateutil.relativedelta import relativedelta
 import xlsxwriter
 from odoo import api, fields, models
 from datetime import datetime
-from odoo.tools import date_utils
+from odoo.tools import SQL, date_utils
+
+
+# Detail lines fetched per request when an account is unfolded
+GL_PAGE_SIZE = 200
 
 
 class AccountGeneralLedger(models.TransientModel):
@@ -37,7 +41,11 @@ class AccountGeneralLedger(models.TransientModel):
     @api.model
     def view_report(self, option, tag):
         """
-        Retrieve partner ledger report data based on options and tags.
+        Retrieve general ledger report data with the default filters: posted
+        entries of all the journals, any date.
+
+        The detail lines of the accounts are not part of the result, they
+        are fetched with get_account_lines when an account is unfolded.
 
         :param option: The options to filter the report data.
         :type option: str
@@ -45,44 +53,18 @@ class AccountGeneralLedger(models.TransientModel):
         :param tag: The tag to filter the report data.
         :type tag: str
 
-        :return: A dictionary containing the partner ledger report data.
+        :return: A dictionary containing the general ledger report data.
         :rtype: dict
         """
-        account_dict = {}
-        account_totals = {}
-        move_line_ids = self.env['account.move.line'].search(
-            [('parent_state', '=', 'posted')])
-        account_ids = move_line_ids.mapped('account_id')
-        account_dict['journal_ids'] = self.env['account.journal'].search_read(
-            [], ['name'])
-        account_dict['analytic_ids'] = self.env[
-            'account.analytic.account'].search_read(
-            [], ['name'])
-        for account in account_ids:
-            move_line_id = move_line_ids.filtered(
-                lambda x: x.account_id == account)
-            move_line_list = []
-            for move_line in move_line_id:
-                move_line_data = move_line.read(
-                    ['date', 'name', 'move_name', 'debit', 'credit',
-                     'partner_id', 'account_id', 'journal_id', 'move_id',
-                     'analytic_line_ids'])
-                move_line_list.append(move_line_data)
-            account_dict[account.display_name] = move_line_list
-            currency_id = self.env.company.currency_id.symbol
-            account_totals[account.display_name] = {
-                'total_debit': round(sum(move_line_id.mapped('debit')), 2),
-                'total_credit': round(sum(move_line_id.mapped('credit')), 2),
-                'currency_id': currency_id,
-                'account_id': account.id}
-            account_dict['account_totals'] = account_totals
-        return account_dict
+        return self.get_filter_values([], None, None, [], None)
 
     @api.model
     def get_filter_values(self, journal_id, date_range, options, analytic,
-                          method):
+                          method, with_lines=False):
         """
-        Retrieve filtered values for the partner ledger report.
+        Retrieve the account totals of the general ledger for the filters,
+        computed by a single query grouped by account. Accounts without
+        lines in the period are kept when they carry an opening balance.
 
         :param journal_id: The journal IDs to filter the report data.
         :type journal_id: list
@@ -99,104 +81,212 @@ class AccountGeneralLedger(models.TransientModel):
         :param analytic: The analytic IDs to filter the report data.
         :type analytic: list
 
-        :return: A dictionary containing the filtered values for the partner
-        ledger report.
+        :param with_lines: Whether to include the detail lines of all the
+            accounts, for the printed reports.
+        :type with_lines: bool
+
+        :return: A dictionary with the totals of each account under
+            'account_totals' and the detail lines of each account under its
+            name, empty unless with_lines is set.
         :rtype: dict
         """
-        account_dict = {}
+        date_from, date_to = self._get_date_bounds(date_range)
+        where = self._get_where_clause(journal_id, date_to, options, analytic,
+                                       method)
+        in_period = SQL("aml.date >= %s", date_from) if date_from else SQL(
+            "TRUE")
+        self.env['account.move.line'].flush_model()
+        self.env.cr.execute(SQL("""
+            SELECT aml.account_id,
+                   COALESCE(SUM(aml.debit - aml.credit)
+                            FILTER (WHERE NOT (%(in_period)s)), 0),
+                   COALESCE(SUM(aml.debit) FILTER (WHERE %(in_period)s), 0),
+                   COALESCE(SUM(aml.credit) FILTER (WHERE %(in_period)s), 0)
+              FROM account_move_line aml
+             WHERE %(where)s
+          GROUP BY aml.account_id
+            HAVING COUNT(*) FILTER (WHERE %(in_period)s) > 0
+                OR ROUND(SUM(aml.debit - aml.credit)
+                         FILTER (WHERE NOT (%(in_period)s)), 2) != 0
+        """, in_period=in_period, where=where))
+        rows = self.env.cr.fetchall()
+        accounts = self.env['account.account'].browse(
+            [row[0] for row in rows])
+        currency_id = self.env.company.currency_id.symbol
+        account_dict = {
+            'journal_ids': self.env['account.journal'].search_read(
+                [], ['name']),
+            'analytic_ids': self.env['account.analytic.account'].search_read(
+                [], ['name']),
+        }
         account_totals = {}
-        today = fields.Date.today()
-        quarter_start, quarter_end = date_utils.get_quarter(today)
-        previous_quarter_start = quarter_start - relativedelta(months=3)
-        previous_quarter_end = quarter_start - relativedelta(days=1)
-        if options == {}:
-            options = None
-        if options is None:
-            option_domain = ['posted']
-        elif 'draft' in options:
-            option_domain = ['posted', 'draft']
-        domain = [('journal_id', 'in', journal_id),
-                  ('parent_state', 'in', option_domain), ] if journal_id else [
-            ('parent_state', 'in', option_domain), ]
-        if method == {}:
-            method = None
-        if method is not None and 'cash' in method:
-            domain += [('journal_id', 'in',
-                        self.env.company.tax_cash_basis_journal_id.ids), ]
-        if analytic:
-            analytic_line = self.env['account.analytic.line'].search(
-                [('account_id', 'in', analytic)]).mapped('id')
-            domain += [('analytic_line_ids', 'in', analytic_line)]
-        if date_range:
-            if date_range == 'month':
-                domain += [('date', '>=', today.replace(day=1)),
-                           ('date', '<=', today)]
-            elif date_range == 'year':
-                domain += [('date', '>=', today.replace(month=1, day=1)),
-                           ('date', '<=', today)]
-            elif date_range == 'quarter':
-                domain += [('date', '>=', quarter_start),
-                           ('date', '<=', quarter_end)]
-            elif date_range == 'last-month':
-                last_month_start = today.replace(day=1) - relativedelta(
-                    months=1)
-                last_month_end = last_month_start + relativedelta(
-                    day=calendar.monthrange(last_month_start.year,
-                                            last_month_start.month)[
-                        1])
-                domain += [('date', '>=', last_month_start),
-                           ('date', '<=', last_month_end)]
-            elif date_range == 'last-year':
-                last_year_start = today.replace(month=1,
-                                                day=1) - relativedelta(years=1)
-                last_year_end = last_year_start.replace(month=12, day=31)
-                domain += [('date', '>=', last_year_start),
-                           ('date', '<=', last_year_end)]
-            elif date_range == 'last-quarter':
-                domain += [('date', '>=', previous_quarter_start),
-                           ('date', '<=', previous_quarter_end)]
-            elif 'start_date' in date_range and 'end_date' in date_range:
-                start_date = datetime.strptime(date_range['start_date'],
-                                               '%Y-%m-%d').date()
-                end_date = datetime.strptime(date_range['end_date'],
-                                             '%Y-%m-%d').date()
-                domain += [('date', '>=', start_date),
-                           ('date', '<=', end_date)]
-            elif 'start_date' in date_range:
-                start_date = datetime.strptime(date_range['start_date'],
-                                               '%Y-%m-%d').date()
-                domain += [('date', '>=', start_date)]
-            elif 'end_date' in date_range:
-                end_date = datetime.strptime(date_range['end_date'],
-                                             '%Y-%m-%d').date()
-                domain += [('date', '<=', end_date)]
-        move_line_ids = self.env['account.move.line'].search(domain)
-        account_ids = move_line_ids.mapped('account_id')
-        account_dict['journal_ids'] = self.env['account.journal'].search_read(
-            [], ['name'])
-        account_dict['analytic_ids'] = self.env[
-            'account.analytic.account'].search_read(
-            [], ['name'])
-        for account in account_ids:
-            move_line_id = move_line_ids.filtered(
-                lambda x: x.account_id == account)
-            move_line_list = []
-            for move_line in move_line_id:
-                move_line_data = move_line.read(
-                    ['date', 'name', 'move_name', 'debit', 'credit',
-                     'partner_id', 'account_id', 'journal_id', 'move_id',
-                     'analytic_line_ids'])
-                move_line_list.append(move_line_data)
-            account_dict[account.display_name] = move_line_list
-            currency_id = self.env.company.currency_id.symbol
+        for account, (__, initial_balance, debit, credit) in sorted(
+                zip(accounts, rows), key=lambda item: item[0].code or ''):
+            account_dict[account.display_name] = []
             account_totals[account.display_name] = {
-                'total_debit': round(sum(move_line_id.mapped('debit')), 2),
-                'total_credit': round(sum(move_line_id.mapped('credit')), 2),
+                'initial_balance': round(initial_balance, 2),
+                'total_debit': round(debit, 2),
+                'total_credit': round(credit, 2),
                 'currency_id': currency_id,
                 'account_id': account.id}
-            account_dict['account_totals'] = account_totals
+        account_dict['account_totals'] = account_totals
+        if with_lines and accounts:
+            names = {account.id: account.display_name for account in accounts}
+            for line in self._fetch_lines(where, date_from, accounts.ids):
+                account_dict[names[line['account_id']]].append([line])
         return account_dict
 
+    @api.model
+    def get_account_lines(self, account_id, journal_id, date_range, options,
+                          analytic, method, after=None, limit=GL_PAGE_SIZE):
+        """
+        Retrieve a page of detail lines of an account, for the same filters as
+        get_filter_values.
+
+        Lines are ordered by date and id, and paged on that key: ``after`` is
+        the [date, id] of the last line of the previous page, so that no page
+        needs to skip the lines before it.
+
+        :return: A dictionary with the 'lines', in the format of read() with
+            the running balance of the account, and 'after', the key of the
+            next page or False on the last page.
+        :rtype: dict
+        """
+        date_from, date_to = self._get_date_bounds(date_range)
+        where = self._get_where_clause(journal_id, date_to, options, analytic,
+                                       method)
+        self.env['account.move.line'].flush_model()
+        lines = self._fetch_lines(where, date_from, [account_id], after,
+                                  limit)
+        return {
+            'lines': [[line] for line in lines],
+            'after': [lines[-1]['date'], lines[-1]['id']] if len(
+                lines) == limit else False,
+        }
+
+    @api.model
+    def _fetch_lines(self, where, date_from, account_ids, after=None,
+                     limit=None):
+        """Detail lines of the accounts within the period, by date, with
+        the partner and the entry as [id, name] like read() does, and the
+        running balance of their account including the opening balance.
+
+        The page is bounded by the index on (account_id, date, id), and its
+        running balance starts from the sum of the lines before it."""
+        bounds = [SQL("aml.account_id = ANY(%s)", account_ids)]
+        before = None
+        if date_from:
+            bounds.append(SQL("aml.date >= %s", date_from))
+            before = SQL("aml.date < %s", date_from)
+        if after:
+            bounds.append(SQL("(aml.date, aml.id) > (%s, %s)",
+                              after[0], after[1]))
+            before = SQL("(aml.date, aml.id) <= (%s, %s)", after[0], after[1])
+        opening = {}
+        if before:
+            self.env.cr.execute(SQL("""
+                SELECT aml.account_id, SUM(aml.debit - aml.credit)
+                  FROM account_move_line aml
+                 WHERE %s AND aml.account_id = ANY(%s) AND %s
+              GROUP BY aml.account_id
+            """, where, account_ids, before))
+            opening = dict(self.env.cr.fetchall())
+        self.env.cr.execute(SQL("""
+            SELECT line.*, partner.name AS partner_name,
+                   SUM(line.debit - line.credit) OVER (
+                       PARTITION BY line.account_id ORDER BY line.date, line.id
+                       ROWS UNBOUNDED PRECEDING) AS balance
+              FROM (
+                SELECT aml.id, aml.date, aml.name, aml.move_name, aml.debit,
+                       aml.credit, aml.account_id, aml.partner_id,
+                       aml.journal_id, aml.move_id
+                  FROM account_move_line aml
+                 WHERE %(where)s AND %(bounds)s
+              ORDER BY aml.date, aml.id
+                 %(limit)s
+              ) line
+         LEFT JOIN res_partner partner ON partner.id = line.partner_id
+          ORDER BY line.date, line.id
+        """, where=where, bounds=SQL(" AND ").join(bounds),
+                                limit=SQL("LIMIT %s", limit) if limit
+                                else SQL()))
+        return [{
+            'id': row['id'],
+            'date': fields.Date.to_string(row['date']),
+            'name': row['name'],
+            'move_name': row['move_name'],
+            'debit': row['debit'],
+            'credit': row['credit'],
+            'balance': round(
+                opening.get(row['account_id'], 0) + row['balance'], 2),
+            'partner_id': [row['partner_id'], row['partner_name']] if row[
+                'partner_id'] else False,
+            'account_id': row['account_id'],
+            'journal_id': row['journal_id'],
+            'move_id': [row['move_id'], row['move_name']],
+        } for row in self.env.cr.dictfetchall()]
+
+    @api.model
+    def _get_where_clause(self, journal_id, date_to, options, analytic,
+                          method):
+        """SQL condition on account_move_line (aliased aml) for the filters,
+        except the start of the period."""
+        states = ['posted', 'draft'] if options and 'draft' in options else [
+            'posted']
+        conditions = [
+            SQL("aml.parent_state = ANY(%s)", states),
+            SQL("aml.company_id = ANY(%s)", self.env.companies.ids),
+        ]
+        if journal_id:
+            conditions.append(SQL("aml.journal_id = ANY(%s)", journal_id))
+        if method and 'cash' in method:
+            conditions.append(SQL(
+                "aml.journal_id = ANY(%s)",
+                self.env.company.tax_cash_basis_journal_id.ids))
+        if analytic:
+            conditions.append(SQL("""
+                EXISTS (SELECT 1 FROM account_analytic_line analytic_line
+                         WHERE analytic_line.move_line_id = aml.id
+                           AND analytic_line.account_id = ANY(%s))
+            """, analytic))
+        if date_to:
+            conditions.append(SQL("aml.date <= %s", date_to))
+        return SQL(" AND ").join(conditions)
+
+    @api.model
+    def _get_date_bounds(self, date_range):
+        """First and last dates of the date range filter, None when open."""
+        today = fields.Date.today()
+        if not date_range:
+            return None, None
+        if date_range == 'month':
+            return today.replace(day=1), today
+        if date_range == 'year':
+            return today.replace(month=1, day=1), today
+        if date_range == 'quarter':
+            return date_utils.get_quarter(today)
+        if date_range == 'last-month':
+            last_month_start = today.replace(day=1) - relativedelta(months=1)
+            return last_month_start, last_month_start + relativedelta(
+                day=calendar.monthrange(last_month_start.year,
+                                        last_month_start.month)[1])
+        if date_range == 'last-year':
+            last_year_start = today.replace(month=1, day=1) - relativedelta(
+                years=1)
+            return last_year_start, last_year_start.replace(month=12, day=31)
+        if date_range == 'last-quarter':
+            quarter_start = date_utils.get_quarter(today)[0]
+            return (quarter_start - relativedelta(months=3),
+                    quarter_start - relativedelta(days=1))
+        if isinstance(date_range, dict):
+            start_date = date_range.get('start_date')
+            end_date = date_range.get('end_date')
+            return (
+                datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else None,
+                datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else None,
+            )
+        return None, None
+
     @api.model
     def get_xlsx_report(self, data, response, report_name, report_action):
         """
@@ -293,6 +383,17 @@ class AccountGeneralLedger(models.TransientModel):
                         sheet.merge_range(row, col + 11, row, col + 12,
                                           data['total'][account]['balance_display'],
                                           txt_name)
+                        if data['total'][account]['initial_balance']:
+                            row += 1
+                            sheet.write(row, col, ' ', txt_name)
+                            sheet.write(row, col + 1, ' ', txt_name)
+                            sheet.merge_range(row, col + 2, row, col + 4,
+                                              'Initial Balance', txt_name)
+                            sheet.merge_range(row, col + 5, row, col + 10, ' ',
+                                              txt_name)
+                            sheet.merge_range(row, col + 11, row, col + 12,
+                                              data['total'][account]['initial_balance'],
+                                              txt_name)
                         for rec in data['data'][account]:
                             row += 1
                             partner = rec[0]['partner_id']
@@ -308,8 +409,8 @@ class AccountGeneralLedger(models.TransientModel):
                                               txt_name)
                             sheet.merge_range(row, col + 9, row, col + 10,
                                               rec[0]['credit'], txt_name)
-                            sheet.merge_range(row, col + 11, row, col + 12, ' ',
-                                              txt_name)
+                            sheet.merge_range(row, col + 11, row, col + 12,
+                                              rec[0]['balance'], txt_name)
                     row += 1
                     sheet.merge_range(row, col, row, col + 6, 'Total',
                                       filter_head)
@@ -320,8 +421,7 @@ class AccountGeneralLedger(models.TransientModel):
                                       data['grand_total']['total_credit_display'],
                                       filter_head)
                     sheet.merge_range(row, col + 11, row, col + 12,
-                                      float(data['grand_total']['total_debit']) -
-                                      float(data['grand_total']['total_credit']),
+                                      float(data['grand_total']['total_balance']),
                                       filter_head)
         workbook.close()
         output.seek(0)
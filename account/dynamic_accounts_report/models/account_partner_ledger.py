@@ -25,7 +25,12 @@ from dateutil.relativedelta import relativedelta
 import xlsxwriter
 from odoo import api, fields, models
 from datetime import datetime
-from odoo.tools import date_utils
+from odoo.tools import SQL, date_utils
+
+# Lines of a partner loaded at once when it is unfolded
+PL_PAGE_SIZE = 200
+# Lines fetched at once from the server-side cursor of the printed reports
+PL_FETCH_SIZE = 2000
 
 
 class AccountPartnerLedger(models.TransientModel):
@@ -47,60 +52,14 @@ class AccountPartnerLedger(models.TransientModel):
         :return: A dictionary containing the partner data for the report.
         :rtype: dict
         """
-        fiscal_year = self.env['res.company'].search([]).mapped('account_opening_date')[0].strftime('%Y-%m-%d')
-        fiscal_year_start = datetime.strptime(fiscal_year,
-                                              '%Y-%m-%d').date()
-        partner_dict = {}
-        partner_totals = {}
-        move_line_ids = self.env['account.move.line'].search(
-            [('account_type', 'in',
-              ['liability_payable', 'asset_receivable']),
-             ('parent_state', '=', 'posted')])
-        partner_ids = move_line_ids.mapped('partner_id')
-        for partner in partner_ids:
-            total_debit_balance = 0
-            total_credit_balance = 0
-            balance = 0
-            move_line_id = move_line_ids.filtered(
-                lambda x: x.partner_id == partner)
-            move_line_list = []
-            for move_line in move_line_id:
-                if move_line.invoice_date:
-                    if move_line.invoice_date < fiscal_year_start:
-                        total_debit_balance += move_line.debit
-                        total_credit_balance += move_line.credit
-                        balance = total_debit_balance - total_credit_balance
-                move_line_data = move_line.read(
-                    ['date', 'move_name', 'account_type', 'debit', 'credit',
-                     'date_maturity', 'account_id', 'journal_id', 'move_id',
-                     'matching_number', 'amount_currency'])
-                account_code = self.env['account.account'].browse(
-                    move_line.account_id.id).code
-                journal_code = self.env['account.journal'].browse(
-                    move_line.journal_id.id).code
-                if account_code:
-                    move_line_data[0]['jrnl'] = journal_code
-                    move_line_data[0]['code'] = account_code
-                move_line_list.append(move_line_data)
-            partner_dict[partner.name] = move_line_list
-            currency_id = self.env.company.currency_id.symbol
-            partner_totals[partner.name] = {
-                'total_debit': round(sum(move_line_id.mapped('debit')), 2),
-                'total_credit': round(sum(move_line_id.mapped('credit')), 2),
-                'currency_id': currency_id,
-                'initial_balance': balance,
-                'partner_id': partner.id,
-                'move_name': 'Initial Balance',
-                'initial_debit': total_debit_balance,
-                'initial_credit': total_credit_balance,
-            }
-            partner_dict['partner_totals'] = partner_totals
-        return partner_dict
+        return self.get_filter_values([], None, None, None)
 
     @api.model
-    def get_filter_values(self, partner_id, data_range, account, options):
+    def get_filter_values(self, partner_id, data_range, account, options,
+                          with_lines=False):
         """
-        Retrieve filtered partner-related data for generating a report.
+        Retrieve the partner totals of the ledger for the filters, computed
+        by a single query grouped by partner.
 
         :param partner_id: The ID(s) of the partner(s) to filter by.
         :type partner_id: list or int
@@ -114,240 +73,264 @@ class AccountPartnerLedger(models.TransientModel):
         :param options: Additional options for filtering the data.
         :type options: dict
 
-        :return: A dictionary containing the filtered partner data.
+        :param with_lines: Whether to include the lines of all the partners,
+            for the printed reports.
+        :type with_lines: bool
+
+        :return: A dictionary with the lines of each partner under its ID,
+            empty unless with_lines is set, and the totals of each partner
+            under 'partner_totals'.
         :rtype: dict
         """
-        if options == {}:
-            options = None
-        if account == {}:
-            account = None
-        account_type_domain = []
-        if options is None:
-            option_domain = ['posted']
-        elif 'draft' in options:
-            option_domain = ['posted', 'draft']
-        if account is None or (
-                'Receivable' in account and 'Payable' in account):
-            account_type_domain.append('liability_payable')
-            account_type_domain.append('asset_receivable')
-        elif 'Receivable' in account:
-            account_type_domain.append('asset_receivable')
-        elif 'Payable' in account:
-            account_type_domain.append('liability_payable')
+        date_from, date_to = self._get_date_bounds(data_range)
+        where = self._get_where_clause(partner_id, date_to, account, options)
+        in_period = SQL("aml.date >= %s", date_from) if date_from else SQL(
+            "TRUE")
+        self.env['account.move.line'].flush_model()
+        self.env['res.partner'].flush_model(['name'])
+        self.env.cr.execute(SQL("""
+            SELECT aml.partner_id,
+                   COALESCE(SUM(aml.debit) FILTER (WHERE NOT (%(in_period)s)), 0),
+                   COALESCE(SUM(aml.credit) FILTER (WHERE NOT (%(in_period)s)), 0),
+                   COALESCE(SUM(aml.debit) FILTER (WHERE %(in_period)s), 0),
+                   COALESCE(SUM(aml.credit) FILTER (WHERE %(in_period)s), 0)
+              FROM account_move_line aml
+              JOIN res_partner partner ON partner.id = aml.partner_id
+             WHERE %(where)s
+          GROUP BY aml.partner_id, partner.name
+            HAVING COUNT(*) FILTER (WHERE %(in_period)s) > 0
+                OR ROUND(SUM(aml.balance) FILTER (WHERE NOT (%(in_period)s)), 2) != 0
+          ORDER BY partner.name, aml.partner_id
+        """, in_period=in_period, where=where))
+        rows = self.env.cr.fetchall()
+        partners = self.env['res.partner'].browse([row[0] for row in rows])
+        currency_id = self.env.company.currency_id.symbol
         partner_dict = {}
         partner_totals = {}
-        today = fields.Date.today()
-        quarter_start, quarter_end = date_utils.get_quarter(today)
-        previous_quarter_start = quarter_start - relativedelta(months=3)
-        previous_quarter_end = quarter_start - relativedelta(days=1)
-        if not partner_id:
-            partner_id = self.env['account.move.line'].search([(
-                'account_type', 'in', account_type_domain),
-                ('parent_state', 'in', option_domain)]).mapped(
-                'partner_id').ids
-        balance_move_line_ids = []
-        for partners in partner_id:
-            partner = self.env['res.partner'].browse(partners).name
-            if data_range:
-                if data_range == 'month':
-                    move_line_ids = self.env['account.move.line'].search(
-                        [('partner_id', '=', partners), (
-                            'account_type', 'in',
-                            account_type_domain),
-                         ('parent_state', 'in', option_domain)]).filtered(
-                        lambda x: x.date.month == fields.Date.today().month)
-                    date_start = fields.Date.today().replace(day=1)
-                    balance_move_line_ids = self.env[
-                        'account.move.line'].search(
-                        [('partner_id', '=', partners), (
-                            'account_type', 'in',
-                            account_type_domain),
-                         ('parent_state', 'in', option_domain),
-                         ('invoice_date', '<', date_start)])
-                elif data_range == 'year':
-                    move_line_ids = self.env['account.move.line'].search(
-                        [('partner_id', '=', partners), (
-                            'account_type', 'in',
-                            account_type_domain),
-                         ('parent_state', 'in', option_domain)]).filtered(
-                        lambda x: x.date.year == fields.Date.today().year)
-                    date_start = fields.Date.today().replace(month=1, day=1)
-                    balance_move_line_ids = self.env[
-                        'account.move.line'].search(
-                        [('partner_id', '=', partners), (
-                            'account_type', 'in',
-                            account_type_domain),
-                         ('parent_state', 'in', option_domain),
-                         ('invoice_date', '<', date_start)])
-                elif data_range == 'quarter':
-                    move_line_ids = self.env['account.move.line'].search(
-                        [('partner_id', '=', partners), (
-                            'account_type', 'in',
-                            account_type_domain),
-                         ('date', '>=', quarter_start),
-                         ('date', '<=', quarter_end),
-                         ('parent_state', 'in', option_domain)])
-                    date_start = quarter_start
-                    balance_move_line_ids = self.env[
-                        'account.move.line'].search(
-                        [('partner_id', '=', partners), (
-                            'account_type', 'in',
-                            account_type_domain),
-                         ('parent_state', 'in', option_domain),
-                         ('invoice_date', '<', date_start)])
-                elif data_range == 'last-month':
-                    move_line_ids = self.env['account.move.line'].search(
-                        [('partner_id', '=', partners), (
-                            'account_type', 'in',
-                            account_type_domain),
-                         ('parent_state', 'in', option_domain)]).filtered(
-                        lambda x: x.date.month == fields.Date.today().month - 1)
-                    date_start = fields.Date.today().replace(day=1,month=fields.Date.today().month - 1)
-                    balance_move_line_ids = self.env[
-                        'account.move.line'].search(
-                        [('partner_id', '=', partners), (
-                            'account_type', 'in',
-                            account_type_domain),
-                         ('parent_state', 'in', option_domain),
-                         ('invoice_date', '<', date_start)])
-                elif data_range == 'last-year':
-                    move_line_ids = self.env['account.move.line'].search(
-                        [('partner_id', '=', partners), (
-                            'account_type', 'in',
-                            account_type_domain),
-                         ('parent_state', 'in', option_domain)]).filtered(
-                        lambda x: x.date.year == fields.Date.today().year - 1)
-                    date_start = fields.Date.today().replace(day=1,month=1,)
-                    balance_move_line_ids = self.env[
-                        'account.move.line'].search(
-                        [('partner_id', '=', partners), (
-                            'account_type', 'in',
-                            account_type_domain),
-                         ('parent_state', 'in', option_domain),
-                         ('invoice_date', '<', date_start)])
-                elif data_range == 'last-quarter':
-                    move_line_ids = self.env['account.move.line'].search(
-                        [('partner_id', '=', partners), (
-                            'account_type', 'in',
-                            account_type_domain),
-                         ('date', '>=', previous_quarter_start),
-                         ('date', '<=', previous_quarter_end),
-                         ('parent_state', 'in', option_domain)])
-                    date_start = previous_quarter_start
-                    balance_move_line_ids = self.env[
-                        'account.move.line'].search(
-                        [('partner_id', '=', partners), (
-                            'account_type', 'in',
-                            account_type_domain),
-                         ('parent_state', 'in', option_domain),
-                         ('invoice_date', '<', date_start)])
-                elif 'start_date' in data_range and 'end_date' in data_range:
-                    start_date = datetime.strptime(data_range['start_date'],
-                                                   '%Y-%m-%d').date()
-                    end_date = datetime.strptime(data_range['end_date'],
-                                                 '%Y-%m-%d').date()
-                    move_line_ids = self.env['account.move.line'].search(
-                        [('partner_id', '=', partners), (
-                            'account_type', 'in',
-                            account_type_domain),
-                         ('date', '>=', start_date),
-                         ('date', '<=', end_date),
-                         ('parent_state', 'in', option_domain)])
-                    date_start = start_date
-                    balance_move_line_ids = self.env[
-                        'account.move.line'].search(
-                        [('partner_id', '=', partners), (
-                            'account_type', 'in',
-                            account_type_domain),
-                         ('parent_state', 'in', option_domain),
-                         ('invoice_date', '<', date_start)])
-                elif 'start_date' in data_range:
-                    start_date = datetime.strptime(data_range['start_date'],
-                                                   '%Y-%m-%d').date()
-                    move_line_ids = self.env['account.move.line'].search(
-                        [('partner_id', '=', partners), (
-                            'account_type', 'in',
-                            account_type_domain),
-                         ('date', '>=', start_date),
-                         ('parent_state', 'in', option_domain)])
-                    date_start = start_date
-                    balance_move_line_ids = self.env[
-                        'account.move.line'].search(
-                        [('partner_id', '=', partners), (
-                            'account_type', 'in',
-                            account_type_domain),
-                         ('parent_state', 'in', option_domain),
-                         ('invoice_date', '<', date_start)])
-                elif 'end_date' in data_range:
-                    end_date = datetime.strptime(data_range['end_date'],
-                                                 '%Y-%m-%d').date()
-                    move_line_ids = self.env['account.move.line'].search(
-                        [('partner_id', '=', partners), (
-                            'account_type', 'in',
-                            account_type_domain),
-                         ('date', '<=', end_date),
-                         ('parent_state', 'in', option_domain)])
-                    fiscal_year = self.env['res.company'].search([]).mapped(
-                        'account_opening_date')[0].strftime('%Y-%m-%d')
-                    date_start = datetime.strptime(fiscal_year,
-                                                          '%Y-%m-%d').date()
-                    balance_move_line_ids = self.env[
-                        'account.move.line'].search(
-                        [('partner_id', '=', partners), (
-                            'account_type', 'in',
-                            account_type_domain),
-                         ('parent_state', 'in', option_domain),
-                         ('invoice_date', '<', date_start)])
-            else:
-                move_line_ids = self.env['account.move.line'].search(
-                    [('partner_id', '=', partners), (
-                        'account_type', 'in',
-                        account_type_domain),
-                     ('parent_state', 'in', option_domain)])
-            total_debit_balance = 0
-            total_credit_balance = 0
-            balance = 0
-            move_line_list = []
-            for move_line in move_line_ids:
-                move_line_data = move_line.read(
-                    ['date', 'move_name', 'account_type', 'debit', 'credit',
-                     'date_maturity', 'account_id', 'journal_id', 'move_id',
-                     'matching_number', 'amount_currency'])
-                account_code = self.env['account.account'].browse(
-                    move_line.account_id.id).code
-                journal_code = self.env['account.journal'].browse(
-                    move_line.journal_id.id).code
-                if account_code:
-                    move_line_data[0]['jrnl'] = journal_code
-                    move_line_data[0]['code'] = account_code
-                move_line_list.append(move_line_data)
-            for remaining_move in balance_move_line_ids:
-                if remaining_move.invoice_date:
-                    if remaining_move.invoice_date < date_start:
-                        total_debit_balance += remaining_move.debit
-                        total_credit_balance += remaining_move.credit
-                        balance = total_debit_balance - total_credit_balance
-            partner_dict[partner] = move_line_list
-            currency_id = self.env.company.currency_id.symbol
-            partner_totals[partner] = {
-                'total_debit': round(sum(move_line_ids.mapped('debit')), 2),
-                'total_credit': round(sum(move_line_ids.mapped('credit')), 2),
+        for partner, (__, initial_debit, initial_credit, debit,
+                      credit) in zip(partners, rows):
+            partner_dict[partner.id] = []
+            partner_totals[partner.id] = {
+                'total_debit': round(debit, 2),
+                'total_credit': round(credit, 2),
                 'currency_id': currency_id,
-                'partner_id': partners,
-                'initial_balance': balance,
+                'partner_id': partner.id,
+                'partner_name': partner.name,
+                'initial_balance': round(initial_debit - initial_credit, 2),
                 'move_name': 'Initial Balance',
-                'initial_debit': total_debit_balance,
-                'initial_credit': total_credit_balance,
+                'initial_debit': round(initial_debit, 2),
+                'initial_credit': round(initial_credit, 2),
             }
-            partner_dict['partner_totals'] = partner_totals
+        if with_lines and partners:
+            for line in self._iter_lines(where, date_from):
+                partner_dict[line['partner_id']].append([line])
+        partner_dict['partner_totals'] = partner_totals
         return partner_dict
 
+    @api.model
+    def get_partner_lines(self, partner, data_range, account, options,
+                          after=None, limit=PL_PAGE_SIZE):
+        """
+        Retrieve a page of lines of a partner, with their running balance,
+        for the same filters as get_filter_values.
+
+        :param partner: The ID of the unfolded partner.
+        :type partner: int
+
+        :param after: The (date, id) of the last line already loaded.
+        :type after: list
+
+        :param limit: The number of lines of the page.
+        :type limit: int
+
+        :return: A dictionary with the lines under 'lines' and the key of the
+            last one under 'after', False when there are no more lines.
+        :rtype: dict
+        """
+        date_from, date_to = self._get_date_bounds(data_range)
+        where = self._get_where_clause([partner], date_to, account, options)
+        self.env['account.move.line'].flush_model()
+        opening = self._get_opening_balances(where, date_from, after)
+        self.env.cr.execute(
+            self._get_lines_query(where, date_from, after, limit + 1))
+        rows = self.env.cr.dictfetchall()
+        lines = self._prepare_lines(rows[:limit], opening)
+        return {
+            'lines': [[line] for line in lines],
+            'after': [fields.Date.to_string(rows[limit - 1]['date']),
+                      rows[limit - 1]['id']] if len(rows) > limit else False,
+        }
+
+    @api.model
+    def _iter_lines(self, where, date_from):
+        """Lines of all the partners, streamed from a server-side cursor in
+        the order of the partner totals."""
+        self.env['account.move.line'].flush_model()
+        opening = self._get_opening_balances(where, date_from)
+        cr = self.env.cr
+        cr.execute(SQL("DECLARE partner_ledger_lines NO SCROLL CURSOR FOR %s",
+                       self._get_lines_query(where, date_from)))
+        try:
+            while True:
+                cr.execute(SQL("FETCH FORWARD %s FROM partner_ledger_lines",
+                               PL_FETCH_SIZE))
+                rows = cr.dictfetchall()
+                if not rows:
+                    break
+                yield from self._prepare_lines(rows, opening)
+        finally:
+            cr.execute("CLOSE partner_ledger_lines")
+
+    @api.model
+    def _get_opening_balances(self, where, date_from, after=None):
+        """Balance of each partner before the period, or up to the (date, id)
+        key ``after`` of the last line already loaded."""
+        if after:
+            before = SQL("(aml.date, aml.id) <= (%s, %s)", after[0], after[1])
+        elif date_from:
+            before = SQL("aml.date < %s", date_from)
+        else:
+            return {}
+        self.env.cr.execute(SQL("""
+            SELECT aml.partner_id, SUM(aml.balance)
+              FROM account_move_line aml
+             WHERE %s AND %s
+          GROUP BY aml.partner_id
+        """, where, before))
+        return dict(self.env.cr.fetchall())
+
+    @api.model
+    def _get_lines_query(self, where, date_from, after=None, limit=None):
+        """Query of the lines of the period after the (date, id) key
+        ``after``, ordered by partner then by date. The keyset and the limit
+        are applied through the (partner_id, date, id) index before the
+        running balance, which only sums the returned lines: it is completed
+        by _get_opening_balances."""
+        bounds = [where]
+        if date_from:
+            bounds.append(SQL("aml.date >= %s", date_from))
+        if after:
+            bounds.append(SQL("(aml.date, aml.id) > (%s, %s)",
+                              after[0], after[1]))
+        return SQL("""
+            SELECT line.*,
+                   SUM(line.balance) OVER (
+                       PARTITION BY line.partner_id ORDER BY line.date, line.id
+                       ROWS UNBOUNDED PRECEDING) AS running_balance
+              FROM (
+                SELECT aml.id, aml.partner_id, aml.date, aml.move_name,
+                       aml.account_type, aml.debit, aml.credit, aml.balance,
+                       aml.date_maturity, aml.account_id, aml.journal_id,
+                       aml.move_id, aml.matching_number, aml.amount_currency
+                  FROM account_move_line aml
+                 WHERE %(bounds)s
+              ORDER BY aml.partner_id, aml.date, aml.id
+                 %(limit)s
+              ) line
+              JOIN res_partner partner ON partner.id = line.partner_id
+          ORDER BY partner.name, line.partner_id, line.date, line.id
+        """, bounds=SQL(" AND ").join(bounds),
+                   limit=SQL("LIMIT %s", limit) if limit else SQL())
+
+    @api.model
+    def _prepare_lines(self, rows, opening):
+        """Line dictionaries of the view and the printed reports."""
+        accounts = self.env['account.account'].browse(
+            {row['account_id'] for row in rows})
+        journals = self.env['account.journal'].browse(
+            {row['journal_id'] for row in rows})
+        account_names = {account.id: (account.display_name, account.code)
+                         for account in accounts}
+        journal_names = {journal.id: (journal.display_name, journal.code)
+                         for journal in journals}
+        lines = []
+        for row in rows:
+            account_name, account_code = account_names[row['account_id']]
+            journal_name, journal_code = journal_names[row['journal_id']]
+            lines.append({
+                'id': row['id'],
+                'partner_id': row['partner_id'],
+                'date': row['date'],
+                'move_name': row['move_name'],
+                'account_type': row['account_type'],
+                'debit': row['debit'],
+                'credit': row['credit'],
+                'balance': round(opening.get(row['partner_id'], 0) +
+                                 row['running_balance'], 2),
+                'date_maturity': row['date_maturity'],
+                'account_id': [row['account_id'], account_name],
+                'journal_id': [row['journal_id'], journal_name],
+                'move_id': [row['move_id'], row['move_name']],
+                'matching_number': row['matching_number'],
+                'amount_currency': row['amount_currency'],
+                'jrnl': journal_code,
+                'code': account_code,
+            })
+        return lines
+
+    @api.model
+    def _get_where_clause(self, partner_id, date_to, account, options):
+        """SQL condition on account_move_line (aliased aml) for the filters,
+        except the start of the period."""
+        states = ['posted', 'draft'] if options and 'draft' in options else [
+            'posted']
+        account_types = [
+            account_type for key, account_type in (
+                ('Receivable', 'asset_receivable'),
+                ('Payable', 'liability_payable'))
+            if account and key in account
+        ] or ['asset_receivable', 'liability_payable']
+        conditions = [
+            SQL("aml.parent_state = ANY(%s)", states),
+            SQL("aml.account_type = ANY(%s)", account_types),
+            SQL("aml.company_id = ANY(%s)", self.env.companies.ids),
+            SQL("aml.partner_id IS NOT NULL"),
+        ]
+        if partner_id:
+            conditions.append(SQL("aml.partner_id = ANY(%s)", partner_id))
+        if date_to:
+            conditions.append(SQL("aml.date <= %s", date_to))
+        return SQL(" AND ").join(conditions)
+
+    @api.model
+    def _get_date_bounds(self, data_range):
+        """First and last dates of the date range filter, None when open."""
+        today = fields.Date.today()
+        if not data_range:
+            return None, None
+        if data_range == 'month':
+            return date_utils.get_month(today)
+        if data_range == 'year':
+            return (date_utils.start_of(today, 'year'),
+                    date_utils.end_of(today, 'year'))
+        if data_range == 'quarter':
+            return date_utils.get_quarter(today)
+        if data_range == 'last-month':
+            return date_utils.get_month(today - relativedelta(months=1))
+        if data_range == 'last-year':
+            last_year = today - relativedelta(years=1)
+            return (date_utils.start_of(last_year, 'year'),
+                    date_utils.end_of(last_year, 'year'))
+        if data_range == 'last-quarter':
+            return date_utils.get_quarter(today - relativedelta(months=3))
+        if isinstance(data_range, dict):
+            start_date = data_range.get('start_date')
+            end_date = data_range.get('end_date')
+            return (
+                datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else None,
+                datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else None,
+            )
+        return None, None
+
     @api.model
     def get_xlsx_report(self, data, response, report_name, report_action):
         """
-        Generate an Excel report based on the provided data.
+        Generate an Excel report for the filters of the provided data. The
+        lines are streamed from the database and written row by row, so that
+        neither the browser nor the workbook holds the whole ledger.
 
-        :param data: The data used to generate the report.
+        :param data: The filters of the report and the arguments of
+            get_filter_values under 'args'.
         :type data: str (JSON format)
 
         :param response: The response object to write the report to.
@@ -360,7 +343,8 @@ class AccountPartnerLedger(models.TransientModel):
         """
         data = json.loads(data)
         output = io.BytesIO()
-        workbook = xlsxwriter.Workbook(output, {'in_memory': True})
+        # Rows are flushed as they are written, they must come in order
+        workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
         start_date = data['filters']['start_date'] if data['filters']['start_date'] else ''
         end_date = data['filters']['end_date'] if data['filters']['end_date'] else ''
         sheet = workbook.add_worksheet()
@@ -391,23 +375,19 @@ class AccountPartnerLedger(models.TransientModel):
         col = 0
         sheet.write('A1:B1', report_name, head)
         sheet.write('B3:B4', 'Date Range', filter_head)
-        sheet.write('B4:B4', 'Partners', filter_head)
-        sheet.write('B5:B4', 'Accounts', filter_head)
-        sheet.write('B6:B4', 'Options', filter_head)
-
         if start_date or end_date:
             sheet.merge_range('C3:G3', f"{start_date} to {end_date}", filter_body)
-
+        sheet.write('B4:B4', 'Partners', filter_head)
         if data['filters']['partner']:
             display_names = [partner.get('display_name', 'undefined') for partner in data['filters']['partner']]
             display_names_str = ', '.join(display_names)
             sheet.merge_range('C4:G4', display_names_str, filter_body)
-
+        sheet.write('B5:B4', 'Accounts', filter_head)
         if data['filters']['account']:
             account_keys = list(data['filters']['account'].keys())
             account_keys_str = ', '.join(account_keys)
             sheet.merge_range('C5:G5', account_keys_str, filter_body)
-
+        sheet.write('B6:B4', 'Options', filter_head)
         if data['filters']['options']:
             option_keys = list(data['filters']['options'].keys())
             option_keys_str = ', '.join(option_keys)
@@ -430,72 +410,66 @@ class AccountPartnerLedger(models.TransientModel):
             sheet.merge_range('J9:K9', 'Credit', sub_heading)
             sheet.merge_range('L9:M9', 'Balance', sub_heading)
 
+            partner_id, data_range, account, options = data['args']
+            totals = self.get_filter_values(partner_id, data_range, account,
+                                            options)['partner_totals']
+            date_from, date_to = self._get_date_bounds(data_range)
+            lines = self._iter_lines(
+                self._get_where_clause(partner_id, date_to, account, options),
+                date_from)
+            line = next(lines, None)
+            grand_total_debit = grand_total_credit = 0
             row = 8
-            # Ensure data['partners'] is iterable; default to empty list if None
-            partners = data.get('partners', []) or []
-            for partner in partners:
+            for total in totals.values():
                 row += 1
-                # Format partner totals
-                total_debit = data['total'][partner]['total_debit'] if data['total'] and partner in data['total'] else 0
-                total_credit = data['total'][partner]['total_credit'] if data['total'] and partner in data[
-                    'total'] else 0
-                balance = total_debit - total_credit
+                total_debit = total['total_debit']
+                total_credit = total['total_credit']
+                grand_total_debit += total_debit
+                grand_total_credit += total_credit
 
-                sheet.write(row, col, partner, txt_name)
+                sheet.write(row, col, total['partner_name'], txt_name)
                 sheet.write(row, col + 1, ' ', txt_name)
                 sheet.write(row, col + 2, ' ', txt_name)
                 sheet.merge_range(row, col + 3, row, col + 4, ' ', txt_name)
                 sheet.merge_range(row, col + 5, row, col + 6, ' ', txt_name)
                 sheet.merge_range(row, col + 7, row, col + 8, format_number(total_debit), txt_name)
                 sheet.merge_range(row, col + 9, row, col + 10, format_number(total_credit), txt_name)
-                sheet.merge_range(row, col + 11, row, col + 12, format_number(balance), txt_name)
+                sheet.merge_range(row, col + 11, row, col + 12, format_number(total_debit - total_credit), txt_name)
 
                 # Handle initial balance
-                initial_balance = data['total'][partner]['initial_balance'] if data['total'] and partner in data[
-                    'total'] else 0
-                if initial_balance != 0:
+                if total['initial_balance'] != 0:
                     row += 1
-                    initial_debit = data['total'][partner]['initial_debit'] if data['total'] and partner in data[
-                        'total'] else 0
-                    initial_credit = data['total'][partner]['initial_credit'] if data['total'] and partner in data[
-                        'total'] else 0
-
                     sheet.write(row, col, '', txt_name)
                     sheet.write(row, col + 1, ' ', txt_name)
                     sheet.write(row, col + 2, ' ', txt_name)
                     sheet.merge_range(row, col + 3, row, col + 4, 'Initial Balance', head_highlight)
                     sheet.merge_range(row, col + 5, row, col + 6, ' ', txt_name)
-                    sheet.merge_range(row, col + 7, row, col + 8, format_number(initial_debit), txt_name)
-                    sheet.merge_range(row, col + 9, row, col + 10, format_number(initial_credit), txt_name)
-                    sheet.merge_range(row, col + 11, row, col + 12, format_number(initial_balance), txt_name)
+                    sheet.merge_range(row, col + 7, row, col + 8, format_number(total['initial_debit']), txt_name)
+                    sheet.merge_range(row, col + 9, row, col + 10, format_number(total['initial_credit']), txt_name)
+                    sheet.merge_range(row, col + 11, row, col + 12, format_number(total['initial_balance']), txt_name)
 
-                # Process move lines for the partner
-                for rec in data['data'][partner]:
+                # Lines come in the order of the partner totals
+                while line and line['partner_id'] == total['partner_id']:
                     row += 1
-                    sheet.write(row, col, rec[0]['date'], txt_name)
-                    sheet.write(row, col + 1, rec[0]['jrnl'], txt_name)
-                    sheet.write(row, col + 2, rec[0]['code'], txt_name)
-                    sheet.merge_range(row, col + 3, row, col + 4, rec[0]['move_name'], txt_name)
-                    sheet.merge_range(row, col + 5, row, col + 6, rec[0]['date_maturity'] or '', txt_name)
-                    sheet.merge_range(row, col + 7, row, col + 8, format_number(rec[0]['debit']), txt_name)
-                    sheet.merge_range(row, col + 9, row, col + 10, format_number(rec[0]['credit']), txt_name)
-                    sheet.merge_range(row, col + 11, row, col + 12, ' ', txt_name)
+                    sheet.write(row, col, fields.Date.to_string(line['date']), txt_name)
+                    sheet.write(row, col + 1, line['jrnl'], txt_name)
+                    sheet.write(row, col + 2, line['code'], txt_name)
+                    sheet.merge_range(row, col + 3, row, col + 4, line['move_name'], txt_name)
+                    sheet.merge_range(row, col + 5, row, col + 6, fields.Date.to_string(line['date_maturity']) or '', txt_name)
+                    sheet.merge_range(row, col + 7, row, col + 8, format_number(line['debit']), txt_name)
+                    sheet.merge_range(row, col + 9, row, col + 10, format_number(line['credit']), txt_name)
+                    sheet.merge_range(row, col + 11, row, col + 12, format_number(line['balance']), txt_name)
+                    line = next(lines, None)
+            lines.close()
 
             # Grand totals
             row += 1
-            # Ensure grand_total values are numbers
-            grand_total_debit = data['grand_total']['total_debit'] if data['grand_total'] and data['grand_total'][
-                'total_debit'] is not None else 0
-            grand_total_credit = data['grand_total']['total_credit'] if data['grand_total'] and data['grand_total'][
-                'total_credit'] is not None else 0
-            grand_balance = grand_total_debit - grand_total_credit
-
             sheet.merge_range(row, col, row, col + 6, 'Total', filter_head)
             sheet.merge_range(row, col + 7, row, col + 8, format_number(grand_total_debit), filter_head)
             sheet.merge_range(row, col + 9, row, col + 10, format_number(grand_total_credit), filter_head)
-            sheet.merge_range(row, col + 11, row, col + 12, format_number(grand_balance), filter_head)
+            sheet.merge_range(row, col + 11, row, col + 12, format_number(grand_total_debit - grand_total_credit), filter_head)
 
         workbook.close()
         output.seek(0)
         response.stream.write(output.read())
-        output.close()
\ No newline at end of file
+        output.close()
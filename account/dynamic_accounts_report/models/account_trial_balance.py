@@ -25,6 +25,7 @@ import json
 from datetime import datetime
 import xlsxwriter
 from odoo import api, fields, models
+from odoo.tools import SQL
 from odoo.tools.date_utils import get_month, get_fiscal_year, \
     get_quarter_number, subtract
 
@@ -38,54 +39,31 @@ class AccountTrialBalance(models.TransientModel):
     def view_report(self):
         """
         Generates a trial balance report for multiple accounts.
-        Retrieves account information and calculates total debit and credit
-        amounts for each account within the specified date range. Returns a list
-        of dictionaries containing account details and transaction totals.
+        Calculates the initial, current month and ending debit and credit
+        amounts of every account in a single query. Returns a list of
+        dictionaries containing account details and transaction totals, and
+        the journals of the filter.
 
-        :return: List of dictionaries representing the trial balance report.
-        :rtype: list
+        :return: List of dictionaries representing the trial balance report
+            and a dictionary with the journals.
+        :rtype: tuple
         """
-        account_ids = self.env['account.move.line'].search([]).mapped(
-            'account_id')
-        today = fields.Date.today()
+        date_from, date_to = get_month(fields.Date.today())
         move_line_list = []
-        for account_id in account_ids:
-            initial_move_line_ids = self.env['account.move.line'].search(
-                [('date', '<', get_month(today)[0]),
-                 ('account_id', '=', account_id.id),
-                 ('parent_state', '=', 'posted')])
-            initial_total_debit = round(
-                sum(initial_move_line_ids.mapped('debit')), 2)
-            initial_total_credit = round(
-                sum(initial_move_line_ids.mapped('credit')), 2)
-            move_line_ids = self.env['account.move.line'].search(
-                [('date', '>=', get_month(today)[0]),
-                 ('account_id', '=', account_id.id),
-                 ('date', '<=', get_month(today)[1]),
-                 ('parent_state', '=', 'posted')])
-            total_debit = round(sum(move_line_ids.mapped('debit')), 2)
-            total_credit = round(sum(move_line_ids.mapped('credit')), 2)
-            sum_debit = initial_total_debit + total_debit
-            sum_credit = initial_total_credit + total_credit
-            diff_credit_debit = sum_debit - sum_credit
-            if diff_credit_debit > 0:
-                end_total_debit = diff_credit_debit
-                end_total_credit = 0.0
-            else:
-                end_total_debit = 0.0
-                end_total_credit = abs(diff_credit_debit)
-            data = {
-                'account': account_id.display_name,
-                'account_id': account_id.id,
-                'journal_ids': self.env['account.journal'].search_read([], ['name']),
-                'initial_total_debit': "{:,.2f}".format(initial_total_debit),
-                'initial_total_credit': "{:,.2f}".format(initial_total_credit),
-                'total_debit': total_debit,
-                'total_credit': total_credit,
+        for account, balance in self._get_balances(date_from, date_to):
+            end_total_debit, end_total_credit = self._get_end_balance(balance)
+            move_line_list.append({
+                'account': account.display_name,
+                'account_id': account.id,
+                'initial_total_debit': "{:,.2f}".format(
+                    balance['initial_debit']),
+                'initial_total_credit': "{:,.2f}".format(
+                    balance['initial_credit']),
+                'total_debit': balance['debit'],
+                'total_credit': balance['credit'],
                 'end_total_debit': "{:,.2f}".format(end_total_debit),
                 'end_total_credit': "{:,.2f}".format(end_total_credit)
-            }
-            move_line_list.append(data)
+            })
         journal = {
             'journal_ids': self.env['account.journal'].search_read([], [
                 'name'])
@@ -99,222 +77,177 @@ class AccountTrialBalance(models.TransientModel):
         """
         Retrieves and calculates filtered values for generating a financial
         report.
-        Retrieves and processes account movement data based on the provided
-        filters. Calculates initial, dynamic, and end total debit and credit
-        amounts for each account,considering date range, comparison type, and
-        other filter criteria.
+        Calculates initial, dynamic, and end total debit and credit amounts
+        for each account, considering date range, comparison type, and other
+        filter criteria. The amounts of all the accounts and all the
+        comparison periods are computed by a single query.
 
         :param str start_date: Start date of the reporting period.
         :param str end_date: End date of the reporting period.
         :param int comparison_number: Number of periods for comparison.
         :param str comparison_type: Type of comparison (month, year, quarter).
         :param list[int] journal_list: List of selected journal IDs.
-        :param list[int] analytic: List of selected analytic line IDs.
+        :param list[int] analytic: List of selected analytic account IDs.
         :param dict options: Additional filtering options (e.g., 'draft').
         :param dict method: Find the method.
         :return: List of dictionaries representing the financial report.
         :rtype: list
         """
-
-        if options == {}:
-            options = None
-        if options is None:
-            option_domain = ['posted']
-        elif 'draft' in options:
-            option_domain = ['posted', 'draft']
-        if method == {}:
-            method = None
-        dynamic_total_debit = {}
+        start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
+        end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
+        if comparison_type == 'year':
+            start_date = get_fiscal_year(start_date)[0]
+            end_date = get_fiscal_year(end_date)[1]
+        number = int(comparison_number) if comparison_number else 0
+        months = {'month': 1, 'quarter': 3}.get(comparison_type)
+        periods = []
         dynamic_date_num = {}
-        dynamic_total_credit = {}
-        account_ids = self.env['account.move.line'].search([]).mapped(
-            'account_id')
-        move_line_list = []
-        start_date_first = \
-            get_fiscal_year(datetime.strptime(start_date, "%Y-%m-%d").date())[
-                0] if comparison_type == 'year' else datetime.strptime(
-                start_date, "%Y-%m-%d").date()
-        end_date_first = \
-            get_fiscal_year(datetime.strptime(end_date, "%Y-%m-%d").date())[
-                1] if comparison_type == 'year' else datetime.strptime(end_date,
-                                                                       "%Y-%m-%d").date()
-        for account_id in account_ids:
-            start_date = start_date_first
-            end_date = end_date_first
-            if comparison_number:
-                if comparison_type == 'month':
-                    initial_start_date = subtract(start_date, months=eval(
-                        comparison_number))
-                elif comparison_type == 'year':
-                    initial_start_date = subtract(start_date, years=eval(
-                        comparison_number))
-                else:
-                    initial_start_date = subtract(start_date, months=eval(
-                        comparison_number) * 3)
-            else:
-                initial_start_date = start_date
-            domain = [('date', '<', initial_start_date),
-                      ('account_id', '=', account_id.id),
-                      ('parent_state', 'in', option_domain), ]
-            if journal_list:
-                domain.append(
-                    ('journal_id', 'in', journal_list), )
-            if analytic:
-                domain.append(
-                    ('analytic_line_ids', 'in', analytic))
-            if method is not None and 'cash' in method:
-                domain.append(('journal_id', 'in',
-                               self.env.company.tax_cash_basis_journal_id.ids))
-            initial_move_line_ids = self.env['account.move.line'].search(
-                domain)
-            initial_total_debit = round(
-                sum(initial_move_line_ids.mapped('debit')), 2)
-            initial_total_credit = round(
-                sum(initial_move_line_ids.mapped('credit')), 2)
-            if comparison_number:
-                if comparison_type == 'year':
-                    for i in range(1, eval(comparison_number) + 1):
-                        com_start_date = subtract(start_date, years=i)
-                        com_end_date = subtract(end_date, years=i)
-                        domain = [('date', '>=', com_start_date),
-                                  ('account_id', '=', account_id.id),
-                                  ('date', '<=', com_end_date),
-                                  ('parent_state', 'in', option_domain), ]
-                        if journal_list:
-                            domain.append(
-                                ('journal_id', 'in', journal_list), )
-                        if analytic:
-                            domain.append(
-                                ('analytic_line_ids', 'in', analytic))
-                        if method is not None and 'cash' in method:
-                            domain.append(('journal_id', 'in',
-                                           self.env.company.tax_cash_basis_journal_id.ids))
-                        move_lines = self.env['account.move.line'].search(
-                            domain)
-                        dynamic_total_debit[
-                            f"dynamic_total_debit_{i}"] = round(
-                            sum(move_lines.mapped('debit')), 2)
-                        dynamic_total_credit[
-                            f"dynamic_total_credit_{i}"] = round(
-                            sum(move_lines.mapped('credit')), 2)
-                if comparison_type == 'month':
-                    dynamic_date_num[
-                        f"dynamic_date_num{0}"] = self.get_month_name(
-                        start_date) + ' ' + str(
-                        start_date.year)
-                    for i in range(1, eval(comparison_number) + 1):
-                        com_start_date = subtract(start_date, months=i)
-                        com_end_date = subtract(end_date, months=i)
-                        domain = [('date', '>=', com_start_date),
-                                  ('account_id', '=', account_id.id),
-                                  ('date', '<=', com_end_date),
-                                  ('parent_state', 'in', option_domain)]
-                        if journal_list:
-                            domain.append(
-                                ('journal_id', 'in', journal_list), )
-                        if analytic:
-                            domain.append(
-                                ('analytic_line_ids', 'in', analytic))
-                        if method is not None and 'cash' in method:
-                            domain.append(('journal_id', 'in',
-                                           self.env.company.tax_cash_basis_journal_id.ids), )
-                        move_lines = self.env['account.move.line'].search(
-                            domain)
-                        dynamic_date_num[
-                            f"dynamic_date_num{i}"] = self.get_month_name(
-                            com_start_date) + ' ' + str(
-                            com_start_date.year)
-                        dynamic_total_debit[
-                            f"dynamic_total_debit_{i}"] = round(
-                            sum(move_lines.mapped('debit')), 2)
-                        dynamic_total_credit[
-                            f"dynamic_total_credit_{i}"] = round(
-                            sum(move_lines.mapped('credit')), 2)
-                if comparison_type == 'quarter':
-                    dynamic_date_num[
-                        f"dynamic_date_num{0}"] = 'Q' + ' ' + str(
-                        get_quarter_number(start_date)) + ' ' + str(
-                        start_date.year)
-                    for i in range(1, eval(comparison_number) + 1):
-                        com_start_date = subtract(start_date, months=i * 3)
-                        com_end_date = subtract(end_date, months=i * 3)
-                        domain = [('date', '>=', com_start_date),
-                                  ('account_id', '=', account_id.id),
-                                  ('date', '<=', com_end_date),
-                                  ('parent_state', 'in', option_domain), ]
-                        if journal_list:
-                            domain.append(
-                                ('journal_id', 'in', journal_list))
-                        if analytic:
-                            domain.append(
-                                ('analytic_line_ids', 'in', analytic))
-                        if method is not None and 'cash' in method:
-                            domain.append(('journal_id', 'in',
-                                           self.env.company.tax_cash_basis_journal_id.ids))
-                        move_lines = self.env['account.move.line'].search(domain)
-                        dynamic_date_num[
-                            f"dynamic_date_num{i}"] = 'Q' + ' ' + str(
-                            get_quarter_number(com_start_date)) + ' ' + str(
-                            com_start_date.year)
-                        dynamic_total_debit[
-                            f"dynamic_total_debit_{i}"] = round(
-                            sum(move_lines.mapped('debit')), 2)
-                        dynamic_total_credit[
-                            f"dynamic_total_credit_{i}"] = round(
-                            sum(move_lines.mapped('credit')), 2)
-            domain = [('date', '>=', start_date),
-                      ('account_id', '=', account_id.id),
-                      ('date', '<=', end_date),
-                      ('parent_state', 'in', option_domain)]
-            if journal_list:
-                domain.append(
-                    ('journal_id', 'in', journal_list), )
-            if analytic:
-                domain.append(
-                    ('analytic_line_ids', 'in', analytic))
-            if method is not None and 'cash' in method:
-                domain.append(('journal_id', 'in',
-                               self.env.company.tax_cash_basis_journal_id.ids))
-            move_line_ids = self.env['account.move.line'].search(domain)
-            total_debit = round(sum(move_line_ids.mapped('debit')), 2)
-            total_credit = round(sum(move_line_ids.mapped('credit')), 2)
-            sum_debit = initial_total_debit + sum(
-                dynamic_total_debit.values()) + total_debit
-            sum_credit = initial_total_credit + sum(
-                dynamic_total_credit.values()) + total_credit
-            diff_credit_debit = sum_debit - sum_credit
-            if diff_credit_debit > 0:
-                end_total_debit = diff_credit_debit
-                end_total_credit = 0.0
+        if number and comparison_type == 'month':
+            dynamic_date_num["dynamic_date_num0"] = self.get_month_name(
+                start_date) + ' ' + str(start_date.year)
+        elif number and comparison_type == 'quarter':
+            dynamic_date_num["dynamic_date_num0"] = 'Q' + ' ' + str(
+                get_quarter_number(start_date)) + ' ' + str(start_date.year)
+        for i in range(1, number + 1):
+            if months:
+                com_start_date = subtract(start_date, months=i * months)
+                com_end_date = subtract(end_date, months=i * months)
             else:
-                end_total_debit = 0.0
-                end_total_credit = abs(diff_credit_debit)
+                com_start_date = subtract(start_date, years=i)
+                com_end_date = subtract(end_date, years=i)
+            periods.append((com_start_date, com_end_date))
+            if comparison_type == 'month':
+                dynamic_date_num[f"dynamic_date_num{i}"] = self.get_month_name(
+                    com_start_date) + ' ' + str(com_start_date.year)
+            elif comparison_type == 'quarter':
+                dynamic_date_num[f"dynamic_date_num{i}"] = 'Q' + ' ' + str(
+                    get_quarter_number(com_start_date)) + ' ' + str(
+                    com_start_date.year)
+        if number:
+            initial_start_date = subtract(
+                start_date, months=number * months) if months else subtract(
+                start_date, years=number)
+        else:
+            initial_start_date = start_date
+
+        move_line_list = []
+        for account, balance in self._get_balances(
+                start_date, end_date, initial_start_date, periods,
+                journal_list, analytic, options, method):
+            end_total_debit, end_total_credit = self._get_end_balance(balance)
             data = {
-                'account': account_id.display_name,
-                'account_id': account_id.id,
-                'journal_ids': self.env['account.journal'].search_read([], [
-                    'name']),
-                'initial_total_debit': initial_total_debit,
-                'initial_total_credit': initial_total_credit,
-                'total_debit': total_debit,
-                'total_credit': total_credit,
+                'account': account.display_name,
+                'account_id': account.id,
+                'initial_total_debit': balance['initial_debit'],
+                'initial_total_credit': balance['initial_credit'],
+                'total_debit': balance['debit'],
+                'total_credit': balance['credit'],
                 'end_total_debit': end_total_debit,
                 'end_total_credit': end_total_credit
             }
-            if comparison_number:
+            if number:
                 if dynamic_date_num:
                     data['dynamic_date_num'] = dynamic_date_num
-                for i in range(1, eval(comparison_number) + 1):
-                    data[f'dynamic_total_debit_{i}'] = dynamic_total_debit.get(
-                        f"dynamic_total_debit_{eval(comparison_number) + 1 - i}",
-                        0.0)
-                    data[
-                        f'dynamic_total_credit_{i}'] = dynamic_total_credit.get(
-                        f"dynamic_total_credit_{eval(comparison_number) + 1 - i}",
-                        0.0)
+                # Oldest comparison period first
+                for i, (debit, credit) in enumerate(
+                        reversed(balance['periods']), 1):
+                    data[f'dynamic_total_debit_{i}'] = debit
+                    data[f'dynamic_total_credit_{i}'] = credit
             move_line_list.append(data)
         return move_line_list
 
+    @api.model
+    def _get_balances(self, start_date, end_date, initial_start_date=None,
+                      periods=(), journal_list=None, analytic=None,
+                      options=None, method=None):
+        """
+        Debit and credit of every account before the initial start date, in
+        each comparison period and in the reporting period, summed in a single
+        query grouped by account.
+
+        :param date start_date: Start date of the reporting period.
+        :param date end_date: End date of the reporting period.
+        :param date initial_start_date: Date from which the amounts are no
+            longer part of the initial balance, the start date by default.
+        :param list periods: (start, end) dates of the comparison periods.
+        :return: List of (account, balance) sorted by account code, the
+            balance being a dictionary with the rounded initial_debit,
+            initial_credit, debit and credit, and the (debit, credit) of each
+            comparison period under 'periods'.
+        :rtype: list
+        """
+        initial = SQL("aml.date < %s", initial_start_date or start_date)
+        buckets = [initial] + [
+            SQL("aml.date BETWEEN %s AND %s", date_from, date_to)
+            for date_from, date_to in periods
+        ] + [SQL("aml.date BETWEEN %s AND %s", start_date, end_date)]
+        columns = SQL(", ").join(
+            SQL("COALESCE(SUM(aml.debit) FILTER (WHERE %(bucket)s), 0), "
+                "COALESCE(SUM(aml.credit) FILTER (WHERE %(bucket)s), 0)",
+                bucket=bucket)
+            for bucket in buckets
+        )
+        self.env['account.move.line'].flush_model()
+        self.env.cr.execute(SQL("""
+            SELECT aml.account_id, %(columns)s
+              FROM account_move_line aml
+             WHERE %(where)s
+          GROUP BY aml.account_id
+        """, columns=columns, where=self._get_where_clause(
+            journal_list, analytic, options, method)))
+        rows = self.env.cr.fetchall()
+        accounts = self.env['account.account'].browse(
+            [row[0] for row in rows])
+        result = []
+        for account, row in sorted(zip(accounts, rows),
+                                   key=lambda item: item[0].code or ''):
+            amounts = [round(amount, 2) for amount in row[1:]]
+            pairs = list(zip(amounts[::2], amounts[1::2]))
+            result.append((account, {
+                'initial_debit': pairs[0][0],
+                'initial_credit': pairs[0][1],
+                'periods': pairs[1:-1],
+                'debit': pairs[-1][0],
+                'credit': pairs[-1][1],
+            }))
+        return result
+
+    @api.model
+    def _get_where_clause(self, journal_list, analytic, options, method):
+        """SQL condition on account_move_line (aliased aml) for the
+        filters."""
+        states = ['posted', 'draft'] if options and 'draft' in options else [
+            'posted']
+        conditions = [
+            SQL("aml.parent_state = ANY(%s)", states),
+            SQL("aml.company_id = ANY(%s)", self.env.companies.ids),
+        ]
+        if journal_list:
+            conditions.append(SQL("aml.journal_id = ANY(%s)", journal_list))
+        if method and 'cash' in method:
+            conditions.append(SQL(
+                "aml.journal_id = ANY(%s)",
+                self.env.company.tax_cash_basis_journal_id.ids))
+        if analytic:
+            conditions.append(SQL("""
+                EXISTS (SELECT 1 FROM account_analytic_line analytic_line
+                         WHERE analytic_line.move_line_id = aml.id
+                           AND analytic_line.account_id = ANY(%s))
+            """, analytic))
+        return SQL(" AND ").join(conditions)
+
+    @api.model
+    def _get_end_balance(self, balance):
+        """Ending balance of an account as a (debit, credit) pair, only one of
+        them being set."""
+        diff_credit_debit = (
+            balance['initial_debit'] - balance['initial_credit']
+            + sum(debit - credit for debit, credit in balance['periods'])
+            + balance['debit'] - balance['credit'])
+        if diff_credit_debit > 0:
+            return round(diff_credit_debit, 2), 0.0
+        return 0.0, round(abs(diff_credit_debit), 2)
+
     @api.model
     def get_month_name(self, date):
         """
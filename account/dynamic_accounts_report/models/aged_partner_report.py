@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+################################################################################
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2025-TODAY Cybrosys Technologies(<https://www.cybrosys.com>)
+#    Author: Swetha Anand (<https://www.cybrosys.com>)
+#
+#    You can modify it under the terms of the GNU LESSER
+#    GENERAL PUBLIC LICENSE (LGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU LESSER GENERAL PUBLIC LICENSE (LGPL v3) for more details.
+#
+#    You should have received a copy of the GNU LESSER GENERAL PUBLIC LICENSE
+#    (LGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+################################################################################
+from odoo import api, fields, models
+from odoo.tools import SQL
+
+# Aging buckets: at date, 1-30, 31-60, 61-90, 91-120 and older days overdue
+AGE_BUCKET_DAYS = [0, 30, 60, 90, 120]
+
+
+class AgePartnerReport(models.AbstractModel):
+    """Aging engine shared by the aged receivable and payable reports. The
+    residual of the open items as of the chosen date is bucketed on its
+    maturity in SQL, the partner totals being summed in the same query."""
+    _name = 'age.partner.report'
+    _description = 'Aged Partner Report'
+
+    # Account type of the aged items
+    _age_account_type = None
+    # Key of the aged amount in the lines and of its total, 'debit' or 'credit'
+    _age_amount_key = None
+
+    @api.model
+    def view_report(self):
+        """
+        Retrieve the partner totals of the report as of today.
+
+        :return: Dictionary with an empty list of lines under each partner
+            ID and the totals of each partner under 'partner_totals'.
+        :rtype: dict
+        """
+        return self.get_filter_values(None, [])
+
+    @api.model
+    def get_filter_values(self, date, partner, with_lines=False):
+        """
+        Retrieve the aged amounts of each partner as of a date.
+
+        :param str date: As-of date (format: 'YYYY-MM-DD'), today when empty.
+        :param list partner: IDs of the partners to report, all when empty.
+        :param bool with_lines: Whether to include the open items of all the
+            partners, for the printed reports.
+        :return: Dictionary with the open items under each partner ID,
+            empty unless with_lines is set, and the totals of each partner
+            under 'partner_totals'.
+        :rtype: dict
+        """
+        date = fields.Date.to_date(date) or fields.Date.today()
+        amount_sum = '%s_sum' % self._age_amount_key
+        columns = SQL(", ").join(
+            SQL("COALESCE(SUM(item.residual) FILTER (WHERE item.bucket = %s), 0)",
+                bucket)
+            for bucket in range(len(AGE_BUCKET_DAYS) + 1)
+        )
+        self.env.cr.execute(SQL("""
+            WITH item AS (%(items)s)
+            SELECT item.partner_id, SUM(item.residual), %(columns)s
+              FROM item
+          GROUP BY item.partner_id
+        """, items=self._get_items_query(date, partner), columns=columns))
+        rows = self.env.cr.fetchall()
+        partners = self.env['res.partner'].browse([row[0] for row in rows])
+        currency_id = self.env.company.currency_id.symbol
+        move_line_list = {}
+        partner_total = {}
+        for partner_id, row in sorted(zip(partners, rows),
+                                      key=lambda item: item[0].name or ''):
+            move_line_list[partner_id.id] = []
+            partner_total[partner_id.id] = {
+                amount_sum: round(row[1], 2),
+                **{'diff%s_sum' % bucket: round(amount, 2)
+                   for bucket, amount in enumerate(row[2:])},
+                'currency_id': currency_id,
+                'partner_id': partner_id.id,
+                'partner_name': partner_id.name,
+            }
+        if with_lines and partners:
+            for line in self._get_lines(date, partners.ids):
+                move_line_list[line.pop('partner_id')].append(line)
+        move_line_list['partner_totals'] = partner_total
+        return move_line_list
+
+    @api.model
+    def get_partner_lines(self, partner_id, date):
+        """
+        Retrieve the open items of a partner as of a date, when the partner
+        is unfolded.
+
+        :param int partner_id: ID of the partner.
+        :param str date: As-of date (format: 'YYYY-MM-DD'), today when empty.
+        :return: List of dictionaries with the item and its aged amount.
+        :rtype: list
+        """
+        date = fields.Date.to_date(date) or fields.Date.today()
+        lines = self._get_lines(date, [partner_id])
+        for line in lines:
+            del line['partner_id']
+        return lines
+
+    @api.model
+    def _get_lines(self, date, partner_ids):
+        """Open items of the partners as of a date, with their residual in
+        the column of its aging bucket."""
+        self.env.cr.execute(SQL("""
+            WITH item AS (%(items)s)
+            SELECT item.id, item.partner_id, item.residual, item.bucket
+              FROM item
+          ORDER BY item.date, item.id
+        """, items=self._get_items_query(date, partner_ids)))
+        rows = self.env.cr.fetchall()
+        move_lines = self.env['account.move.line'].browse(
+            [row[0] for row in rows])
+        move_line_data = move_lines.read(
+            ['name', 'move_name', 'date', 'amount_currency', 'account_id',
+             'date_maturity', 'currency_id', 'move_id'])
+        for val, (__, partner_id, residual, bucket) in zip(move_line_data,
+                                                           rows):
+            val['partner_id'] = partner_id
+            val[self._age_amount_key] = round(residual, 2)
+            for index in range(len(AGE_BUCKET_DAYS) + 1):
+                val['diff%s' % index] = round(residual,
+                                              2) if index == bucket else 0.0
+        return move_line_data
+
+    @api.model
+    def _get_items_query(self, date, partner_ids):
+        """
+        Query of the items open as of a date: their residual is the balance
+        less the partial reconciliations made until that date, signed so that
+        the aged amount is positive, and their bucket is the index of
+        AGE_BUCKET_DAYS past which they are overdue.
+        """
+        self.env['account.move.line'].flush_model()
+        self.env['account.partial.reconcile'].flush_model()
+        sign = 1 if self._age_amount_key == 'debit' else -1
+        overdue = SQL("(%s::date - aml.date_maturity)", date)
+        bucket = SQL(" ").join(
+            SQL("WHEN %s <= %s THEN %s", overdue, days, index)
+            for index, days in enumerate(AGE_BUCKET_DAYS)
+        )
+        conditions = [
+            SQL("aml.parent_state = 'posted'"),
+            SQL("aml.account_type = %s", self._age_account_type),
+            SQL("aml.company_id = ANY(%s)", self.env.companies.ids),
+            SQL("aml.partner_id IS NOT NULL"),
+            SQL("aml.date <= %s", date),
+            # Items fully reconciled by the date have no residual left
+            SQL("""(NOT aml.reconciled
+                    OR EXISTS (SELECT 1 FROM account_partial_reconcile part
+                                WHERE part.debit_move_id = aml.id AND part.max_date > %(date)s)
+                    OR EXISTS (SELECT 1 FROM account_partial_reconcile part
+                                WHERE part.credit_move_id = aml.id AND part.max_date > %(date)s))""",
+                date=date),
+        ]
+        if partner_ids:
+            conditions.append(SQL("aml.partner_id = ANY(%s)", partner_ids))
+        return SQL("""
+            SELECT *
+              FROM (
+                SELECT aml.id, aml.partner_id, aml.date,
+                       %(sign)s * (aml.balance - COALESCE((
+                           SELECT SUM(part.amount)
+                             FROM account_partial_reconcile part
+                            WHERE part.debit_move_id = aml.id
+                              AND part.max_date <= %(date)s
+                       ), 0) + COALESCE((
+                           SELECT SUM(part.amount)
+                             FROM account_partial_reconcile part
+                            WHERE part.credit_move_id = aml.id
+                              AND part.max_date <= %(date)s
+                       ), 0)) AS residual,
+                       CASE WHEN aml.date_maturity IS NULL THEN 0
+                            %(bucket)s
+                            ELSE %(older)s
+                       END AS bucket
+                  FROM account_move_line aml
+                 WHERE %(where)s
+              ) item
+             WHERE ROUND(item.residual, 2) != 0
+        """, sign=sign, bucket=bucket, older=len(AGE_BUCKET_DAYS), date=date,
+                   where=SQL(" AND ").join(conditions))
@@ -21,13 +21,28 @@
 ################################################################################
 import io
 import json
-import datetime
 import xlsxwriter
+from collections import defaultdict
 from odoo import api, fields, models, _
 from odoo.exceptions import ValidationError
+from odoo.tools import SQL
 from odoo.tools.date_utils import get_month, get_fiscal_year, get_quarter, \
     subtract
 
+# Account types shown in the report, in their order of appearance
+ACCOUNT_TYPES = [
+    'income', 'income_other', 'expense', 'expense_depreciation',
+    'expense_direct_cost', 'asset_receivable', 'asset_cash', 'asset_current',
+    'asset_non_current', 'asset_prepayments', 'asset_fixed',
+    'liability_payable', 'liability_credit_card', 'liability_current',
+    'liability_non_current', 'equity', 'equity_unaffected',
+]
+# Account types whose balance is shown as credit minus debit
+CREDIT_ACCOUNT_TYPES = [
+    'income', 'income_other', 'liability_payable', 'liability_current',
+    'liability_non_current', 'equity', 'equity_unaffected',
+]
+
 
 class ProfitLossReport(models.TransientModel):
     """For creating Profit and Loss and Balance sheet report."""
@@ -64,258 +79,181 @@ class ProfitLossReport(models.TransientModel):
 
     @api.model
     def view_report(self, option, comparison, comparison_type):
-        datas = []
-        account_types = {
-            'income': 'income',
-            'income_other': 'income_other',
-            'expense': 'expense',
-            'expense_depreciation': 'expense_depreciation',
-            'expense_direct_cost': 'expense_direct_cost',
-            'asset_receivable': 'asset_receivable',
-            'asset_cash': 'asset_cash',
-            'asset_current': 'asset_current',
-            'asset_non_current': 'asset_non_current',
-            'asset_prepayments': 'asset_prepayments',
-            'asset_fixed': 'asset_fixed',
-            'liability_payable': 'liability_payable',
-            'liability_credit_card': 'liability_credit_card',
-            'liability_current': 'liability_current',
-            'liability_non_current': 'liability_non_current',
-            'equity': 'equity',
-            'equity_unaffected': 'equity_unaffected',
-        }
+        """
+        Compute the profit and loss and balance sheet of each period, from
+        the balance of every account in every period summed by a single
+        query.
+
+        :param option: ID of the report wizard holding the filters.
+        :param comparison: Number of previous periods to compare with.
+        :param comparison_type: 'month' or 'year'.
+        :return: The data of the last period, the filter data and the data
+            of every period.
+        :rtype: tuple
+        """
         financial_report_id = self.browse(option)
-        current_year = fields.Date.today().year
-        current_date = fields.Date.today()
-        if financial_report_id.target_move == 'draft':
-            target_move = ['posted', 'draft']
-        else:
-            target_move = ['posted']
-        if comparison:
-            for count in range(0, int(comparison) + 1):
-                if comparison_type == "month":
-                    account_move_lines = self.env['account.move.line'].search(
-                        [(
-                            'parent_state', 'in', target_move),
-                            ('date', '>=', (current_date - datetime.timedelta(
-                                days=30 * count)).strftime('%Y-%m-01')),
-                            ('date', '<=', (current_date - datetime.timedelta(
-                                days=30 * count)).strftime('%Y-%m-12'))])
-                elif comparison_type == "year":
-                    account_move_lines = self.env['account.move.line'].search(
-                        [(
-                            'parent_state', 'in', target_move),
-                            ('date', '>=', f'{current_year - count}-01-01'),
-                            ('date', '<=', f'{current_year - count}-12-31')])
-                lists = [{'id': rec.id, 'value': [eval(i) for i in
-                                                  rec.analytic_distribution.keys()]}
-                         for rec in account_move_lines if
-                         rec.analytic_distribution]
-                if financial_report_id.analytic_ids:
-                    account_move_lines = account_move_lines.filtered(lambda
-                                                                         rec: rec.id in [
-                        lst['id'] for lst in lists if lst['value'] and any(
-                            i in financial_report_id.analytic_ids.mapped('id')
-                            for i in lst['value'])])
-                account_move_lines = account_move_lines.filtered(lambda
-                                                                     a: not financial_report_id.journal_ids or a.journal_id in financial_report_id.journal_ids)
-                account_move_lines = account_move_lines.filtered(lambda
-                                                                     a: not financial_report_id.account_ids or a.account_id in financial_report_id.account_ids)
-                account_move_lines = account_move_lines.filtered(lambda
-                                                                     a: not financial_report_id.date_from or a.date >= financial_report_id.date_from)
-                account_move_lines = account_move_lines.filtered(lambda
-                                                                     a: not financial_report_id.date_to or a.date <= financial_report_id.date_to)
-                account_entries = {}
-                for account_type in account_types.values():
-                    account_entries[account_type] = self._get_entries(
-                        account_move_lines, self.env['account.account'].search(
-                            [('account_type', '=', account_type)]),
-                        account_type)
-                total_income = sum(
-                    float(entry['amount'].replace(',', '')) for account_type
-                    in
-                    ['income', 'income_other'] for entry in
-                    account_entries[account_type][0]) - sum(
-                    float(entry['amount'].replace(',', '')) for entry in
-                    account_entries['expense_direct_cost'][0])
-                total_expense = sum(
-                    float(entry['amount'].replace(',', '')) for account_type
-                    in
-                    ['expense', 'expense_depreciation'] for entry in
-                    account_entries[account_type][0])
-                total_current_asset = sum(
-                    float(entry['amount'].replace(',', '')) for account_type
-                    in
-                    ['asset_receivable', 'asset_current', 'asset_cash',
-                     'asset_prepayments'] for entry in
-                    account_entries[account_type][0])
-                total_assets = total_current_asset + sum(
-                    float(entry['amount'].replace(',', '')) for account_type
-                    in
-                    ['asset_fixed', 'asset_non_current'] for entry in
-                    account_entries[account_type][0])
-                total_current_liability = sum(
-                    float(entry['amount'].replace(',', '')) for account_type
-                    in
-                    ['liability_current', 'liability_payable'] for entry in
-                    account_entries[account_type][0])
-                total_liability = total_current_liability + sum(
-                    float(entry['amount'].replace(',', '')) for account_type
-                    in
-                    ['liability_non_current'] for entry in
-                    account_entries[account_type][0])
-                total_unallocated_earning = (
-                                                    total_income - total_expense) + sum(
-                    float(entry['amount'].replace(',', '')) for account_type
-                    in
-                    ['equity_unaffected'] for entry in
-                    account_entries[account_type][0])
-                total_equity = total_unallocated_earning + sum(
-                    float(entry['amount'].replace(',', '')) for account_type
-                    in
-                    ['equity'] for entry in
-                    account_entries[account_type][0])
-                total = total_liability + total_equity
-                data = {
-                    'total': total_income - total_expense,
-                    'total_expense': "{:,.2f}".format(total_expense),
-                    'total_income': "{:,.2f}".format(total_income),
-                    'total_current_asset': "{:,.2f}".format(
-                        total_current_asset),
-                    'total_assets': "{:,.2f}".format(total_assets),
-                    'total_current_liability': "{:,.2f}".format(
-                        total_current_liability),
-                    'total_liability': "{:,.2f}".format(total_liability),
-                    'total_earnings': "{:,.2f}".format(
-                        total_income - total_expense),
-                    'total_unallocated_earning': "{:,.2f}".format(
-                        total_unallocated_earning),
-                    'total_equity': "{:,.2f}".format(total_equity),
-                    'total_balance': "{:,.2f}".format(total),
-                    **account_entries}
-                datas.append(data)
-        else:
-            current_year = fields.Date.today().year
-            date_from = financial_report_id.date_from or f'{current_year}-01-01'
-            date_to = financial_report_id.date_to or f'{current_year}-12-31'
-            account_move_lines = self.env['account.move.line'].search(
-                [('parent_state', 'in', target_move),
-                 ('date', '>=', date_from),
-                 ('date', '<=', date_to)])
-            lists = [{'id': rec.id,
-                      'value': [eval(i) for i in
-                                rec.analytic_distribution.keys()]}
-                     for rec in account_move_lines if
-                     rec.analytic_distribution]
-            if financial_report_id.analytic_ids:
-                account_move_lines = account_move_lines.filtered(
-                    lambda rec: rec.id in [lst['id'] for lst in lists if
-                                           lst['value'] and any(
-                                               i in financial_report_id.analytic_ids.mapped(
-                                                   'id') for i in
-                                               lst['value'])])
-            account_move_lines = account_move_lines.filtered(lambda
-                                                                 a: not financial_report_id.journal_ids or a.journal_id in financial_report_id.journal_ids)
-            account_move_lines = account_move_lines.filtered(lambda
-                                                                 a: not financial_report_id.account_ids or a.account_id in financial_report_id.account_ids)
-            account_move_lines = account_move_lines.filtered(lambda
-                                                                 a: not financial_report_id.date_from or a.date >= financial_report_id.date_from)
-            account_move_lines = account_move_lines.filtered(lambda
-                                                                 a: not financial_report_id.date_to or a.date <= financial_report_id.date_to)
-            account_entries = {}
-            for account_type in account_types.values():
-                account_entries[account_type] = self._get_entries(
-                    account_move_lines, self.env['account.account'].search(
-                        [('account_type', '=', account_type)]), account_type)
-            total_income = sum(
-                float(entry['amount'].replace(',', '')) for account_type in
-                ['income', 'income_other'] for entry in
-                account_entries[account_type][0]) - sum(
-                float(entry['amount'].replace(',', '')) for entry in
-                account_entries['expense_direct_cost'][0])
-            total_expense = sum(
-                float(entry['amount'].replace(',', '')) for account_type in
-                ['expense', 'expense_depreciation'] for entry in
-                account_entries[account_type][0])
-            total_current_asset = sum(
-                float(entry['amount'].replace(',', '')) for account_type in
-                ['asset_receivable', 'asset_current', 'asset_cash',
-                 'asset_prepayments'] for entry in
-                account_entries[account_type][0])
-            total_assets = total_current_asset + sum(
-                float(entry['amount'].replace(',', '')) for account_type in
-                ['asset_fixed', 'asset_non_current'] for entry in
-                account_entries[account_type][0])
-            total_current_liability = sum(
-                float(entry['amount'].replace(',', '')) for account_type in
-                ['liability_current', 'liability_payable'] for entry in
-                account_entries[account_type][0])
-            total_liability = total_current_liability + sum(
-                float(entry['amount'].replace(',', '')) for account_type in
-                ['liability_non_current'] for entry in
-                account_entries[account_type][0])
-            total_unallocated_earning = (total_income - total_expense) + sum(
-                float(entry['amount'].replace(',', '')) for account_type in
-                ['equity_unaffected'] for entry in
-                account_entries[account_type][0])
-            total_equity = total_unallocated_earning + sum(
-                float(entry['amount'].replace(',', '')) for account_type in
-                ['equity'] for entry in account_entries[account_type][0])
-            total = total_liability + total_equity
-            data = {
-                'total': total_income - total_expense,
-                'total_expense': "{:,.2f}".format(total_expense),
-                'total_income': "{:,.2f}".format(total_income),
-                'total_current_asset': "{:,.2f}".format(total_current_asset),
-                'total_assets': "{:,.2f}".format(total_assets),
-                'total_current_liability': "{:,.2f}".format(
-                    total_current_liability),
-                'total_liability': "{:,.2f}".format(total_liability),
-                'total_earnings': "{:,.2f}".format(
-                    total_income - total_expense),
-                'total_unallocated_earning': "{:,.2f}".format(
-                    total_unallocated_earning),
-                'total_equity': "{:,.2f}".format(total_equity),
-                'total_balance': "{:,.2f}".format(total),
-                **account_entries}
-            datas.append(data)
+        periods = financial_report_id._get_periods(comparison,
+                                                   comparison_type)
+        balances = financial_report_id._get_balances(periods)
+        accounts_by_type = defaultdict(list)
+        for account in self.env['account.account'].search(
+                [('account_type', 'in', ACCOUNT_TYPES)]):
+            accounts_by_type[account.account_type].append(account)
+        datas = [
+            self._get_period_data(accounts_by_type, balances[period])
+            for period in range(len(periods))
+        ]
         filters = self._get_filter_data()
-        return data, filters, datas
+        return datas[-1], filters, datas
+
+    def _get_periods(self, comparison, comparison_type):
+        """
+            Get the periods of the report, the current one first followed by
+            the compared ones, restricted to the dates of the filter.
+            :param comparison: Number of previous periods to compare with.
+            :param comparison_type: 'month' or 'year'.
+            :return: A list of (date_from, date_to) tuples.
+            """
+        today = fields.Date.today()
+        if not comparison:
+            return [(
+                self.date_from or today.replace(month=1, day=1),
+                self.date_to or today.replace(month=12, day=31),
+            )]
+        periods = []
+        for count in range(0, int(comparison) + 1):
+            if comparison_type == 'month':
+                date_from, date_to = get_month(subtract(today, months=count))
+            else:
+                date_from, date_to = get_fiscal_year(
+                    subtract(today, years=count))
+            if self.date_from:
+                date_from = max(date_from, self.date_from)
+            if self.date_to:
+                date_to = min(date_to, self.date_to)
+            periods.append((date_from, date_to))
+        return periods
+
+    def _get_balances(self, periods):
+        """
+            Get the debit minus credit balance of every account in every
+            period, for the journals, accounts, analytic accounts and target
+            move of the filter.
+            :param periods: A list of (date_from, date_to) tuples.
+            :return: A dictionary {period index: {account ID: balance}}.
+            """
+        states = ['posted', 'draft'] if self.target_move == 'draft' else [
+            'posted']
+        conditions = [
+            SQL("aml.parent_state = ANY(%s)", states),
+            SQL("aml.company_id = ANY(%s)", self.env.companies.ids),
+        ]
+        if self.journal_ids:
+            conditions.append(SQL("aml.journal_id = ANY(%s)",
+                                  self.journal_ids.ids))
+        if self.account_ids:
+            conditions.append(SQL("aml.account_id = ANY(%s)",
+                                  self.account_ids.ids))
+        if self.analytic_ids:
+            # Same expression as the GIN index of analytic.mixin on the
+            # distribution keys, which may hold several accounts each
+            conditions.append(SQL(
+                r"""regexp_split_to_array(jsonb_path_query_array(aml.analytic_distribution, '$.keyvalue()."key"')::text, '\D+') && %s""",
+                [str(analytic_id) for analytic_id in self.analytic_ids.ids]))
+        values = SQL(", ").join(
+            SQL("(%s, %s::date, %s::date)", index, date_from, date_to)
+            for index, (date_from, date_to) in enumerate(periods)
+        )
+        self.env['account.move.line'].flush_model()
+        self.env.cr.execute(SQL("""
+            SELECT period.num, aml.account_id,
+                   SUM(aml.debit) - SUM(aml.credit)
+              FROM account_move_line aml
+              JOIN (VALUES %(values)s) AS period(num, date_from, date_to)
+                ON aml.date BETWEEN period.date_from AND period.date_to
+             WHERE %(where)s
+          GROUP BY period.num, aml.account_id
+        """, values=values, where=SQL(" AND ").join(conditions)))
+        balances = defaultdict(dict)
+        for period, account_id, balance in self.env.cr.fetchall():
+            balances[period][account_id] = balance
+        return balances
+
+    @api.model
+    def _get_period_data(self, accounts_by_type, balances):
+        """
+            Get the report data of a period, totals being computed on the
+            amounts before they are formatted.
+            :param accounts_by_type: The accounts of each account type.
+            :param balances: The balance of each account in the period.
+            :return: A dictionary with the formatted totals and the entries
+                of each account type.
+            """
+        amounts = {
+            account_type: self._get_entries(accounts_by_type[account_type],
+                                            balances, account_type)
+            for account_type in ACCOUNT_TYPES
+        }
 
-    def _get_entries(self, account_move_lines, account_ids, account_type):
+        def total(*account_types):
+            return sum(amounts[account_type][1]
+                       for account_type in account_types)
+
+        total_income = total('income', 'income_other') - total(
+            'expense_direct_cost')
+        total_expense = total('expense', 'expense_depreciation')
+        total_current_asset = total('asset_receivable', 'asset_current',
+                                    'asset_cash', 'asset_prepayments')
+        total_assets = total_current_asset + total('asset_fixed',
+                                                   'asset_non_current')
+        total_current_liability = total('liability_current',
+                                        'liability_payable')
+        total_liability = total_current_liability + total(
+            'liability_non_current')
+        total_unallocated_earning = (total_income - total_expense) + total(
+            'equity_unaffected')
+        total_equity = total_unallocated_earning + total('equity')
+        account_entries = {
+            account_type: (
+                [{'name': name, 'amount': "{:,.2f}".format(amount)}
+                 for name, amount in entries],
+                "{:,.2f}".format(type_total))
+            for account_type, (entries, type_total) in amounts.items()
+        }
+        return {
+            'total': total_income - total_expense,
+            'total_expense': "{:,.2f}".format(total_expense),
+            'total_income': "{:,.2f}".format(total_income),
+            'total_current_asset': "{:,.2f}".format(total_current_asset),
+            'total_assets': "{:,.2f}".format(total_assets),
+            'total_current_liability': "{:,.2f}".format(
+                total_current_liability),
+            'total_liability': "{:,.2f}".format(total_liability),
+            'total_earnings': "{:,.2f}".format(total_income - total_expense),
+            'total_unallocated_earning': "{:,.2f}".format(
+                total_unallocated_earning),
+            'total_equity': "{:,.2f}".format(total_equity),
+            'total_balance': "{:,.2f}".format(
+                total_liability + total_equity),
+            **account_entries}
+
+    @api.model
+    def _get_entries(self, accounts, balances, account_type):
         """
             Get the entries for the specified account type.
-            :param account_move_lines: The account move lines to filter.
-            :param account_ids: The account IDs to filter.
+            :param accounts: The accounts of the account type.
+            :param balances: The debit minus credit balance of each account.
             :param account_type: The account type.
-            :return: A tuple containing the entries and the total amount.
+            :return: A tuple containing the (name, amount) entries and the
+                total amount.
             """
-        entries = []
-        total = 0
-        for account in account_ids:
-            filtered_lines = account_move_lines.filtered(
-                lambda line: line.account_id == account)
-            if filtered_lines:
-                if account_type in ['income', 'income_other',
-                                    'liability_payable', 'liability_current',
-                                    'liability_non_current', 'equity',
-                                    'equity_unaffected']:
-                    amount = -(sum(filtered_lines.mapped('debit')) - sum(
-                        filtered_lines.mapped('credit')))
-                else:
-                    amount = sum(filtered_lines.mapped('debit')) - sum(
-                        filtered_lines.mapped('credit'))
-                entries.append({
-                    'name': "{} - {}".format(account.code, account.name),
-                    'amount': "{:,.2f}".format(amount),
-                })
-                total += amount
-            else:
-                entries.append({
-                    'name': "{} - {}".format(account.code, account.name),
-                    'amount': "{:,.2f}".format(0),
-                })
-        return entries, "{:,.2f}".format(total)
+        sign = -1 if account_type in CREDIT_ACCOUNT_TYPES else 1
+        entries = [
+            ("{} - {}".format(account.code, account.name),
+             sign * balances.get(account.id, 0.0))
+            for account in accounts
+        ]
+        return entries, sum(amount for __, amount in entries)
 
     def filter(self, vals):
         """
@@ -32,6 +32,8 @@ class AgedReceivable extends owl.Component {
             diff5_sum: null,
             selected_partner: [],
             selected_partner_rec: [],
+            loaded: {},
+            expanded: {},
         });
         this.load_data(self.initial_render = true);
     }
@@ -55,9 +57,7 @@ class AgedReceivable extends owl.Component {
             self.state.data = await self.orm.call("age.receivable.report", "view_report", []);
             for (const index in self.state.data) {
                 const value = self.state.data[index];
-                if (index !== 'partner_totals') {
-                    move_line_list.push(index);
-                } else {
+                if (index === 'partner_totals') {
                     move_lines_total = value;
                     for (const moveLine of Object.values(move_lines_total)) {
                         currency = moveLine.currency_id;
@@ -72,6 +72,9 @@ class AgedReceivable extends owl.Component {
                     }
                 }
             }
+            self.state.loaded = {}
+            self.state.expanded = {}
+            move_line_list = this.sortPartners(move_lines_total)
             self.state.move_line = move_line_list;
             self.state.total = move_lines_total;
             self.state.currency = currency;
@@ -140,22 +143,48 @@ class AgedReceivable extends owl.Component {
             target: "current",
         });
     }
+    async loadPartnerLines(partner) {
+        // Open items are fetched when a partner is unfolded
+        if (this.state.loaded[partner]) {
+            return;
+        }
+        this.state.data[partner] = await this.orm.call("age.receivable.report", "get_partner_lines", [
+            this.state.total[partner]['partner_id'],
+            this.date_range.el.value,
+        ]);
+        this.state.loaded[partner] = true;
+    }
+    async togglePartner(partner) {
+        if (this.state.expanded[partner]) {
+            this.state.expanded[partner] = false;
+        } else {
+            await this.loadPartnerLines(partner);
+            this.state.expanded[partner] = true;
+        }
+    }
+    async loadAllLines() {
+        // Reports are printed with the open items of every partner
+        const data = await this.orm.call("age.receivable.report", "get_filter_values", [this.date_range.el.value, this.state.selected_partner, true]);
+        for (const partner of Object.keys(data.partner_totals)) {
+            this.state.data[partner] = data[partner];
+            this.state.loaded[partner] = true;
+        }
+    }
     async unfoldAll(ev) {
         /**
-         * Unfolds all items in the table body if the event target does not have the 'selected-filter' class,
-         * or folds all items if the event target has the 'selected-filter' class.
+         * Unfolds all partners, loading their open items, if the event target does not have the 'selected-filter' class,
+         * or folds all partners if the event target has the 'selected-filter' class.
          *
          * @param {Event} ev - The event object triggered by the action.
          */
         if (!ev.target.classList.contains("selected-filter")) {
-            for (var length = 0; length < this.tbody.el.children.length; length++) {
-                 this.tbody.el.children[length].classList.add('show');
+            await this.loadAllLines();
+            for (const partner of this.state.move_line) {
+                this.state.expanded[partner] = true;
             }
             ev.target.classList.add("selected-filter");
         } else {
-            for (var length = 0; length < this.tbody.el.children.length; length++) {
-                this.tbody.el.children[length].classList.remove('show')
-            }
+            this.state.expanded = {};
             ev.target.classList.remove("selected-filter");
         }
     }
@@ -168,6 +197,7 @@ class AgedReceivable extends owl.Component {
          */
         ev.preventDefault();
         var self = this;
+        await this.loadAllLines();
         var action_title = self.props.action.display_name;
         let totals = {
             'diff0_sum':this.state.diff0_sum,
@@ -215,6 +245,7 @@ class AgedReceivable extends owl.Component {
          * Generates and downloads an XLSX report for the partner ledger.
          */
         var self = this;
+        await this.loadAllLines();
         var action_title = self.props.action.display_name;
         let totals = {
             'diff0_sum':this.state.diff0_sum,
@@ -281,9 +312,7 @@ class AgedReceivable extends owl.Component {
         let filtered_data = await this.orm.call("age.receivable.report", "get_filter_values", [this.date_range.el.value, this.state.selected_partner,]);
         for (const index in filtered_data) {
             const value = filtered_data[index];
-            if (index !== 'partner_totals') {
-                move_line_list.push(index);
-            } else {
+            if (index === 'partner_totals') {
                 move_lines_total = value;
                 for (const moveLine of Object.values(move_lines_total)) {
                     diff0Sum += moveLine.diff0_sum || 0;
@@ -297,6 +326,9 @@ class AgedReceivable extends owl.Component {
             }
         }
         this.state.data = filtered_data
+        this.state.loaded = {}
+        this.state.expanded = {}
+        move_line_list = this.sortPartners(move_lines_total)
         this.state.move_line = move_line_list
         this.state.total = move_lines_total
         this.state.total_debit = TotalDebit
@@ -307,6 +339,12 @@ class AgedReceivable extends owl.Component {
         this.state.diff4_sum = diff4Sum
         this.state.diff5_sum = diff5Sum
     }
+    sortPartners(partner_totals) {
+        // Partners are keyed by ID, which objects enumerate in numeric order
+        return Object.keys(partner_totals).sort((a, b) =>
+            partner_totals[a].partner_name.localeCompare(partner_totals[b].partner_name) ||
+            partner_totals[a].partner_id - partner_totals[b].partner_id);
+    }
     getDomain() {
         return [];
     }
@@ -24,6 +24,7 @@ class GeneralLedger extends owl.Component {
             total_debit_display : null,
             total_credit_display : null,
             total_credit: null,
+            total_balance: null,
             currency: null,
             journals: null,
             selected_journal_list: [],
@@ -38,6 +39,8 @@ class GeneralLedger extends owl.Component {
             method: {
                         'accural': true
                     },
+            account_after: {},
+            expanded: {},
         });
         this.load_data(self.initial_render = true);
     }
@@ -54,18 +57,13 @@ class GeneralLedger extends owl.Component {
     async load_data() {
         let account_list = []
         let account_totals = ''
-        let totalDebitSum = 0;
-        let totalCreditSum = 0;
         let currency;
         var self = this;
         var action_title = self.props.action.display_name;
         try {
             var self = this;
-            let filtered_data = await this.orm.call("account.general.ledger", "get_filter_values", [self.state.selected_journal_list, self.state.date_range, self.state.options, self.state.selected_analytic_list,self.state.method]);
-            self.state.journals = filtered_data['journal_ids']
-            self.state.analytics = filtered_data['analytic_ids']
-            account_totals = filtered_data['account_totals']
             self.state.account_data = await self.orm.call("account.general.ledger", "view_report", [self.wizard_id, action_title,]);
+            self.state.account_after = {}
             for (const [index, value] of Object.entries(self.state.account_data)){
                 if (index !== 'account_totals' && index !== 'journal_ids' && index !== 'analytic_ids') {
                     account_list.push(index)
@@ -77,15 +75,7 @@ class GeneralLedger extends owl.Component {
                 }
                 else {
                     account_totals = value
-                    Object.values(account_totals).forEach(account_list => {
-                        currency = account_list.currency_id
-                        totalDebitSum += account_list.total_debit || 0;
-                        account_list.total_debit_display = this.formatNumberWithSeparators(account_list.total_debit || 0);
-                        totalCreditSum += account_list.total_credit || 0;
-                        account_list.total_credit_display = this.formatNumberWithSeparators(account_list.total_credit || 0);
-                        let balance = account_list.total_debit - account_list.total_credit;
-                        account_list.balance_display = this.formatNumberWithSeparators(balance);
-                    });
+                    currency = Object.values(account_totals).map(account_list => account_list.currency_id)[0]
                 }
             }
             self.state.account = account_list
@@ -94,24 +84,77 @@ class GeneralLedger extends owl.Component {
             self.state.account_total_list = account_totals
             self.state.account_total = account_totals
             self.state.currency = currency
-            self.state.total_debit = totalDebitSum.toFixed(2)
-            self.state.total_debit_display = this.formatNumberWithSeparators(self.state.total_debit)
-            self.state.total_credit = totalCreditSum.toFixed(2)
-            self.state.total_credit_display = this.formatNumberWithSeparators(self.state.total_credit)
+            this.setTotals(account_totals)
             self.state.title = action_title
         }
         catch (el) {
             window.location.href;
         }
     }
+    setTotals(account_totals) {
+        // The balance of an account includes its opening balance before the period
+        let totalDebitSum = 0;
+        let totalCreditSum = 0;
+        let totalBalanceSum = 0;
+        Object.values(account_totals).forEach(account_list => {
+            const balance = (account_list.initial_balance || 0) + (account_list.total_debit || 0) - (account_list.total_credit || 0);
+            totalDebitSum += account_list.total_debit || 0;
+            totalCreditSum += account_list.total_credit || 0;
+            totalBalanceSum += balance;
+            account_list.total_debit_display = this.formatNumberWithSeparators(account_list.total_debit || 0);
+            account_list.total_credit_display = this.formatNumberWithSeparators(account_list.total_credit || 0);
+            account_list.initial_balance_display = this.formatNumberWithSeparators(account_list.initial_balance || 0);
+            account_list.balance_display = this.formatNumberWithSeparators(balance);
+        });
+        this.state.total_debit = totalDebitSum.toFixed(2)
+        this.state.total_debit_display = this.formatNumberWithSeparators(this.state.total_debit)
+        this.state.total_credit = totalCreditSum.toFixed(2)
+        this.state.total_credit_display = this.formatNumberWithSeparators(this.state.total_credit)
+        this.state.total_balance = totalBalanceSum.toFixed(2)
+    }
+    filterArgs() {
+        return [this.state.selected_journal_list, this.state.date_range, this.state.options, this.state.selected_analytic_list, this.state.method];
+    }
+    async loadAccountLines(account, more = false) {
+        // Detail lines are fetched when an account is unfolded, one page at a time
+        const loaded = this.state.account_data[account];
+        if (!more && (loaded.length || this.state.account_after[account] === false)) {
+            return;
+        }
+        const result = await this.orm.call("account.general.ledger", "get_account_lines", [
+            this.state.account_data.account_totals[account]['account_id'],
+            ...this.filterArgs(),
+            more ? this.state.account_after[account] : null,
+        ]);
+        this.state.account_data[account] = [...loaded, ...result.lines];
+        this.state.account_after[account] = result.after;
+    }
+    async toggleAccount(account) {
+        if (this.state.expanded[account]) {
+            this.state.expanded[account] = false;
+        } else {
+            await this.loadAccountLines(account);
+            this.state.expanded[account] = true;
+        }
+    }
+    async loadAllLines() {
+        // Reports are printed with the detail lines of every account
+        const data = await this.orm.call("account.general.ledger", "get_filter_values", [...this.filterArgs(), true]);
+        for (const account of Object.keys(data.account_totals)) {
+            this.state.account_data[account] = data[account];
+            this.state.account_after[account] = false;
+        }
+    }
     async printPdf(ev) {
         ev.preventDefault();
         var self = this;
+        await this.loadAllLines();
         let totals = {
             'total_debit':this.state.total_debit || false,
             'total_debit_display':this.state.total_debit_display || false,
             'total_credit':this.state.total_credit || false,
             'total_credit_display':this.state.total_credit_display || false,
+            'total_balance':this.state.total_balance || false,
             'currency':this.state.currency  || false,
         }
         var action_title = self.props.action.display_name;
@@ -134,11 +177,13 @@ class GeneralLedger extends owl.Component {
     }
     async print_xlsx() {
         var self = this;
+        await this.loadAllLines();
         let totals = {
             'total_debit':this.state.total_debit,
             'total_debit_display':this.state.total_debit_display || false,
             'total_credit':this.state.total_credit,
             'total_credit_display':this.state.total_credit_display || false,
+            'total_balance':this.state.total_balance,
             'currency':this.state.currency,
         }
         var action_title = self.props.action.display_name;
@@ -192,8 +237,6 @@ class GeneralLedger extends owl.Component {
     async applyFilter(val, ev, is_delete = false) {
         let account_list = []
         let account_totals = ''
-        let totalDebitSum = 0;
-        let totalCreditSum = 0;
         this.state.account = null
         this.state.account_data = null
         this.state.account_total = null
@@ -314,31 +357,27 @@ class GeneralLedger extends owl.Component {
             }
             else {
                 account_totals = value
-                Object.values(account_totals).forEach(account_list => {
-                        totalDebitSum += account_list.total_debit || 0;
-                        totalCreditSum += account_list.total_credit || 0;
-                    });
             }
         }
         this.state.account = account_list
         this.state.account_data = filtered_data
+        this.state.account_after = {}
+        this.state.expanded = {}
         this.state.account_total = account_totals
-        this.state.total_debit = totalDebitSum.toFixed(2)
-        this.state.total_credit = totalCreditSum.toFixed(2)
+        this.setTotals(account_totals)
         if (this.unfoldButton.el.classList.contains("selected-filter")) {
             this.unfoldButton.el.classList.remove("selected-filter");
         }
     }
     async unfoldAll(ev) {
         if (!ev.target.classList.contains("selected-filter")) {
-            for (var length = 0; length < this.tbody.el.children.length; length++) {
-                this.tbody.el.children[length].classList.add('show')
+            await this.loadAllLines();
+            for (const account of Object.keys(this.state.account_data.account_totals)) {
+                this.state.expanded[account] = true;
             }
             ev.target.classList.add("selected-filter");
         } else {
-            for (var length = 0; length < this.tbody.el.children.length; length++) {
-                this.tbody.el.children[length].classList.remove('show')
-            }
+            this.state.expanded = {};
             ev.target.classList.remove("selected-filter");
         }
     }
@@ -34,6 +34,8 @@ class PartnerLedger extends owl.Component {
             account: null,
             options: null,
             message_list : [],
+            partner_after: {},
+            expanded: {},
         });
         this.load_data(self.initial_render = true);
     }
@@ -66,7 +68,6 @@ class PartnerLedger extends owl.Component {
             const dataArray = self.state.data;
              Object.entries(dataArray).forEach(([key, value]) => {
             if (key !== 'partner_totals') {
-                partner_list.push(key);
                 value.forEach(entry => {
                     entry[0].debit_display = this.formatNumberWithSeparators(entry[0].debit || 0);
                     entry[0].credit_display = this.formatNumberWithSeparators(entry[0].credit || 0);
@@ -83,6 +84,9 @@ class PartnerLedger extends owl.Component {
                 partner.total_debit_display = this.formatNumberWithSeparators(partner.total_debit || 0)
                 partner.total_credit_display = this.formatNumberWithSeparators(partner.total_credit || 0)
             });
+            partner_list = this.sortPartners(partner_totals)
+            self.state.partner_after = {}
+            self.state.expanded = {}
             self.state.partners = partner_list
             self.state.partner_list = partner_list
             self.state.total_list = partner_totals
@@ -98,7 +102,55 @@ class PartnerLedger extends owl.Component {
             window.location.href;
         }
     }
-        async printPdf(ev) {
+    sortPartners(partner_totals) {
+        // Partners are keyed by ID, which objects enumerate in numeric order
+        return Object.keys(partner_totals).sort((a, b) =>
+            partner_totals[a].partner_name.localeCompare(partner_totals[b].partner_name) ||
+            partner_totals[a].partner_id - partner_totals[b].partner_id);
+    }
+    filterArgs() {
+        return [this.state.selected_partner, this.state.date_range, this.state.account, this.state.options];
+    }
+    formatLines(lines) {
+        for (const entry of lines) {
+            entry[0].debit_display = this.formatNumberWithSeparators(entry[0].debit || 0);
+            entry[0].credit_display = this.formatNumberWithSeparators(entry[0].credit || 0);
+            entry[0].amount_currency_display = this.formatNumberWithSeparators(entry[0].amount_currency || 0);
+        }
+        return lines;
+    }
+    async loadPartnerLines(partner, more = false) {
+        // Lines are fetched when a partner is unfolded, one page at a time
+        const loaded = this.state.data[partner];
+        if (!more && (loaded.length || this.state.partner_after[partner] === false)) {
+            return;
+        }
+        const [, ...filters] = this.filterArgs();
+        const result = await this.orm.call("account.partner.ledger", "get_partner_lines", [
+            this.state.total[partner]['partner_id'],
+            ...filters,
+            more ? this.state.partner_after[partner] : null,
+        ]);
+        this.state.data[partner] = [...loaded, ...this.formatLines(result.lines)];
+        this.state.partner_after[partner] = result.after;
+    }
+    async togglePartner(partner) {
+        if (this.state.expanded[partner]) {
+            this.state.expanded[partner] = false;
+        } else {
+            await this.loadPartnerLines(partner);
+            this.state.expanded[partner] = true;
+        }
+    }
+    async loadAllLines() {
+        // The PDF report is printed with the lines of every partner
+        const data = await this.orm.call("account.partner.ledger", "get_filter_values", [...this.filterArgs(), true]);
+        for (const partner of Object.keys(data.partner_totals)) {
+            this.state.data[partner] = this.formatLines(data[partner]);
+            this.state.partner_after[partner] = false;
+        }
+    }
+    async printPdf(ev) {
         /**
          * Generates and displays a PDF report for the partner ledger.
          *
@@ -106,6 +158,7 @@ class PartnerLedger extends owl.Component {
          * @returns {Promise} - A promise that resolves to the result of the action.
          */
         ev.preventDefault();
+        await this.loadAllLines();
         let partner_list = []
         let partner_value = []
         let partner_totals = ''
@@ -203,10 +256,9 @@ class PartnerLedger extends owl.Component {
             'currency':this.state.currency,
         }
         var action_title = self.props.action.display_name;
+        // The lines are streamed by the server from the filters
         var datas = {
-            'partners': self.state.partners,
-            'data': self.state.data,
-            'total': self.state.total,
+            'args': this.filterArgs(),
             'title': action_title,
             'filters': this.filter(),
             'grand_total': totals,
@@ -375,10 +427,7 @@ class PartnerLedger extends owl.Component {
         let filtered_data = await this.orm.call("account.partner.ledger", "get_filter_values", [this.state.selected_partner, this.state.date_range, this.state.account, this.state.options,]);
         for (let index in filtered_data) {
             const value = filtered_data[index];
-            if (index !== 'partner_totals') {
-                partner_list.push(index)
-            }
-            else {
+            if (index === 'partner_totals') {
                 partner_totals = value
                 Object.values(partner_totals).forEach(partner_list => {
                         totalDebitSum += partner_list.total_debit || 0;
@@ -386,8 +435,11 @@ class PartnerLedger extends owl.Component {
                     });
             }
         }
+        partner_list = this.sortPartners(partner_totals)
         this.state.partners = partner_list
         this.state.data = filtered_data
+        this.state.partner_after = {}
+        this.state.expanded = {}
         this.state.total = partner_totals
         this.state.total_debit = totalDebitSum
         this.state.total_credit = totalCreditSum
@@ -406,14 +458,13 @@ class PartnerLedger extends owl.Component {
          * @param {Event} ev - The event object triggered by the action.
          */
         if (!ev.target.classList.contains("selected-filter")) {
-            for (var length = 0; length < this.tbody.el.children.length; length++) {
-                this.tbody.el.children[length].classList.add('show')
+            await this.loadAllLines();
+            for (const partner of this.state.partners) {
+                this.state.expanded[partner] = true;
             }
             ev.target.classList.add("selected-filter");
         } else {
-            for (var length = 0; length < this.tbody.el.children.length; length++) {
-                  this.tbody.el.children[length].classList.remove('show')
-            }
+            this.state.expanded = {};
             ev.target.classList.remove("selected-filter");
         }
     }
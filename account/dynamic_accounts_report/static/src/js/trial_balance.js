@@ -65,9 +65,6 @@ class TrialBalance extends owl.Component {
             self.state.date_viewed.push(monthNamesShort[today.getMonth()] + '  ' + today.getFullYear())
             self.state.journals = self.state.data[1]['journal_ids']
             self.state.accounts = self.state.data[0]
-            $.each(self.state.data, function (index, value) {
-                self.state.journals = value.journal_ids
-            })
         }
         catch (el) {
             window.location.href;
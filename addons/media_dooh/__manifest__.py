@@ -12,6 +12,7 @@
         'data/ir_sequence_data.xml',
         'data/reports_data.xml',
         'views/slot_views.xml',
+        'views/proof_of_play_views.xml',
         'views/menus.xml',
         'views/sale_views.xml',
         'views/digital_screen_views.xml',
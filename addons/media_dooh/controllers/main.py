@@ -0,0 +1,19 @@
+from odoo import http
+from odoo.http import request, content_disposition
+
+
+class MediaDoohController(http.Controller):
+
+    @http.route('/media_dooh/playlist/<int:screen_id>', type='http', auth='user', methods=['GET'])
+    def download_playlist(self, screen_id):
+        """ Playlist file of the screen for the current month, generated on
+        each download rather than stored as an attachment. """
+        screen = request.env['media.digital.screen'].browse(screen_id).exists()
+        if not screen:
+            raise request.not_found()
+        screen.check_access('read')
+        filename, content = screen._get_playlist_file()
+        return request.make_response(content, [
+            ('Content-Type', 'application/json'),
+            ('Content-Disposition', content_disposition(filename)),
+        ])
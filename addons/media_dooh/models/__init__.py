@@ -3,3 +3,5 @@ from . import content
 from . import sale_order_inherit
 from . import digital_screen_inherit
 from . import account_move_inherit
+from . import playlist
+from . import proof_of_play
@@ -16,6 +16,20 @@ class MediaDoohContentVersion(models.Model):
     
     is_active = fields.Boolean(string='Active', default=False)
     notes = fields.Text(string='Notes')
+    daily_plays = fields.Integer(string='Plays Today', compute='_compute_daily_plays')
+    daily_airtime = fields.Integer(string='On-Air Today (sec)', compute='_compute_daily_plays')
+
+    def _compute_daily_plays(self):
+        today = fields.Date.today()
+        screen_ids = self.slot_id.digital_screen_id.ids
+        schedule = self.env['media.dooh.playlist']._get_schedule(screen_ids, today, today) if screen_ids else {}
+        plays, seconds = {}, {}
+        for screen_schedule in schedule.values():
+            plays.update(screen_schedule['plays'])
+            seconds.update(screen_schedule['seconds'])
+        for version in self:
+            version.daily_plays = plays.get(version._origin.id, [0])[0]
+            version.daily_airtime = seconds.get(version._origin.id, [0])[0]
     
     @api.model_create_multi
     def create(self, vals_list):
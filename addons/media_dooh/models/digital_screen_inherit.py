@@ -1,4 +1,10 @@
-from odoo import models, fields, api
+from odoo import models, fields, api, _
+from odoo.tools import SQL
+from dateutil.relativedelta import relativedelta
+
+# Days of proof of play the measured audience of a screen is based on
+AUDIENCE_DAYS = 30
+
 
 class MediaDigitalScreen(models.Model):
     _inherit = 'media.digital.screen'
@@ -16,43 +22,73 @@ class MediaDigitalScreen(models.Model):
 
     def _set_number_of_slots(self):
         """ Automatically create or remove slots based on number_of_slots field """
+        slot_counts = self._get_slot_counts()
+        slots_to_create = []
+        slots_to_unlink = self.env['media.dooh.slot']
         for screen in self:
-            current_slots = screen.slot_ids
+            current_count = sum(slot_counts.get(screen.id, {}).values())
             target_count = screen.number_of_slots
-            current_count = len(current_slots)
-            
+
             if target_count > current_count:
-                # Create more slots
-                slots_to_create = []
-                for i in range(current_count + 1, target_count + 1):
-                    slots_to_create.append({
-                        'digital_screen_id': screen.id,
-                        'name': 'New',
-                    })
-                if slots_to_create:
-                    self.env['media.dooh.slot'].create(slots_to_create)
-            
+                slots_to_create += [{
+                    'digital_screen_id': screen.id,
+                    'name': 'New',
+                } for __ in range(target_count - current_count)]
+
             elif target_count < current_count:
                 # Remove extra available slots to match target
                 # Prioritize removing available ones from the end
                 diff = current_count - target_count
-                available_slots = current_slots.filtered(lambda s: s.state == 'available').sorted(key=lambda s: s.id, reverse=True)
-                
-                slots_to_unlink = available_slots[:diff]
-                slots_to_unlink.unlink()
-    
+                slots_to_unlink |= self.env['media.dooh.slot'].search([
+                    ('digital_screen_id', '=', screen.id),
+                    ('state', '=', 'available'),
+                ], order='id desc', limit=diff)
+
+        if slots_to_create:
+            # Slots of a whole network are created in one batch, numbers reserved at once
+            self.env['media.dooh.slot'].with_context(tracking_disable=True).create(slots_to_create)
+        slots_to_unlink.unlink()
+
+    def _get_slot_counts(self):
+        """ Number of slots per state of the screens, in one grouped query.
+
+        :return: dict {screen id: {state: count}}
+        """
+        counts = {}
+        screen_ids = [screen_id for screen_id in self._origin.ids if screen_id]
+        if screen_ids:
+            for screen, state, count in self.env['media.dooh.slot']._read_group(
+                    [('digital_screen_id', 'in', screen_ids)], ['digital_screen_id', 'state'], ['__count']):
+                counts.setdefault(screen.id, {})[state] = count
+        return counts
+
     occupied_slots = fields.Integer(string='Occupied Slots', compute='_compute_slot_counts_and_views', store=True)
     available_slots = fields.Integer(string='Available Slots', compute='_compute_slot_counts_and_views', store=True)
     slot_count = fields.Integer(compute='_compute_slot_counts_and_views', store=True)
+    views_per_day = fields.Integer(compute='_compute_slot_counts_and_views', store=True,
+                                   help="Daily plays of a slot, measured by proof of play over the last 30 days when available.")
+    estimated_monthly_impressions = fields.Integer(string='Est. Monthly Impressions', compute='_compute_slot_counts_and_views', store=True,
+                                                   help="Impressions reported by the player over the last 30 days, per 30 days.")
 
     @api.depends('slot_ids.state', 'number_of_slots', 'operating_hours_start', 'operating_hours_end', 'slot_duration')
     def _compute_slot_counts_and_views(self):
+        slot_counts = self._get_slot_counts()
+        audience = self._get_measured_audience()
         for screen in self:
-            occupied = len(screen.slot_ids.filtered(lambda s: s.state == 'booked'))
+            if screen._origin.id:
+                counts = slot_counts.get(screen._origin.id, {})
+                occupied = counts.get('booked', 0)
+                screen.slot_count = sum(counts.values())
+            else:
+                occupied = len(screen.slot_ids.filtered(lambda s: s.state == 'booked'))
+                screen.slot_count = len(screen.slot_ids)
             screen.occupied_slots = occupied
             screen.available_slots = screen.number_of_slots - occupied
-            screen.slot_count = len(screen.slot_ids)
 
+            if screen._origin.id in audience:
+                screen.views_per_day, screen.estimated_monthly_impressions = audience[screen._origin.id]
+                continue
+            screen.estimated_monthly_impressions = 0
             duration_hours = screen.operating_hours_end - screen.operating_hours_start
             if duration_hours > 0:
                 total_seconds = duration_hours * 3600
@@ -61,6 +97,43 @@ class MediaDigitalScreen(models.Model):
             else:
                 screen.views_per_day = 0
 
+    def _get_measured_audience(self, days=AUDIENCE_DAYS):
+        """ Audience of the screens measured by proof of play over the last
+        ``days`` full days: the average daily plays of a slot, and the
+        impressions brought to 30 days. The window moves every day, see
+        ``_get_rollover_ids``.
+
+        :return: dict {screen id: (views per day, monthly impressions)}
+        """
+        screen_ids = [screen_id for screen_id in self._origin.ids if screen_id]
+        if not screen_ids:
+            return {}
+        today = fields.Date.today()
+        self.env['media.dooh.play.stat'].flush_model(['screen_id', 'slot_id', 'date', 'plays', 'impressions'])
+        self.env.cr.execute(SQL("""
+            SELECT screen_id,
+                   SUM(plays) / COUNT(DISTINCT (slot_id, date)),
+                   SUM(impressions) * 30 / COUNT(DISTINCT date)
+              FROM media_dooh_play_stat
+             WHERE screen_id = ANY(%(screen_ids)s)
+               AND date >= %(date_from)s
+               AND date < %(today)s
+          GROUP BY screen_id
+        """, screen_ids=screen_ids, date_from=today - relativedelta(days=days), today=today))
+        return {screen_id: (int(views), int(impressions)) for screen_id, views, impressions in self.env.cr.fetchall()}
+
+    @api.model
+    def _get_rollover_ids(self, last_date, today):
+        """ Screens whose audience window gained or lost days of plays since ``last_date``. """
+        window = relativedelta(days=AUDIENCE_DAYS)
+        self.env['media.dooh.play.stat'].flush_model(['screen_id', 'date'])
+        self.env.cr.execute(SQL("""
+            SELECT DISTINCT screen_id FROM media_dooh_play_stat
+             WHERE (date >= %(last)s AND date < %(today)s)
+                OR (date >= %(last_window)s AND date < %(today_window)s)
+        """, last=last_date, today=today, last_window=last_date - window, today_window=today - window))
+        return [row[0] for row in self.env.cr.fetchall()]
+
     def action_view_slots(self):
         self.ensure_one()
         return {
@@ -71,3 +144,20 @@ class MediaDigitalScreen(models.Model):
             'domain': [('digital_screen_id', '=', self.id)],
             'context': {'default_digital_screen_id': self.id},
         }
+
+    def action_export_playlist(self):
+        """ Download the playlist file of the screen for the current month. """
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_url',
+            'url': '/media_dooh/playlist/%s' % self.id,
+            'target': 'self',
+        }
+
+    def _get_playlist_file(self):
+        """ Name and content of the playlist file of the screen for the current month. """
+        self.ensure_one()
+        date_from = fields.Date.today().replace(day=1)
+        date_to = date_from + relativedelta(months=1, days=-1)
+        filename = _("playlist-%(screen)s-%(month)s.json", screen=self.name, month=date_from.strftime('%Y-%m'))
+        return filename, self.env['media.dooh.playlist']._export_playlist(self, date_from, date_to)
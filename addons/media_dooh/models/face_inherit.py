@@ -18,7 +18,7 @@ class MediaFace(models.Model):
     slot_count = fields.Integer(compute='_compute_slot_counts_and_views')
 
 
-    @api.depends('slot_ids.state', 'number_of_slots', 'operating_hours_start', 'operating_hours_end', 'slot_duration')
+    @api.depends('slot_ids.state', 'number_of_slots')
     def _compute_slot_counts_and_views(self):
         for face in self:
             occupied = len(face.slot_ids.filtered(lambda s: s.state == 'booked'))
@@ -26,17 +26,32 @@ class MediaFace(models.Model):
             face.available_slots = face.number_of_slots - occupied
             face.slot_count = len(face.slot_ids)
 
-            # Computing views_per_day here to stay consistent with dependencies
-            if face.face_type == 'digital':
-                duration_hours = face.operating_hours_end - face.operating_hours_start
-                if duration_hours > 0:
-                    total_seconds = duration_hours * 3600
-                    loop_duration = face.slot_duration * face.number_of_slots
-                    face.views_per_day = int(total_seconds / loop_duration) if loop_duration > 0 else 0
-                else:
-                    face.views_per_day = 0
-            else:
+    @api.depends('face_type', 'site_id', 'operating_hours_start', 'operating_hours_end', 'slot_duration', 'number_of_slots')
+    def _compute_views_per_day(self):
+        """ Digital faces show the audience measured by proof of play on the
+        screen of their site, or the number of loops played per day when the
+        screen has no plays yet. """
+        digital = self.filtered(lambda face: face.face_type == 'digital')
+        screens = self.env['media.digital.screen'].search([('site_id', 'in', digital.site_id.ids)])
+        audience = screens._get_measured_audience()
+        views_by_site = {screen.site_id.id: audience[screen.id][0] for screen in screens if screen.id in audience}
+        for face in self:
+            if face.face_type != 'digital':
                 face.views_per_day = 0
+            elif face.site_id.id in views_by_site:
+                face.views_per_day = views_by_site[face.site_id.id]
+            else:
+                duration_hours = face.operating_hours_end - face.operating_hours_start
+                loop_duration = face.slot_duration * face.number_of_slots
+                face.views_per_day = int(duration_hours * 3600 / loop_duration) if duration_hours > 0 and loop_duration > 0 else 0
+
+    @api.model
+    def _get_rollover_ids(self, last_date, today):
+        """ Also the digital faces whose screen audience window moved since ``last_date``. """
+        face_ids = super(MediaFace, self)._get_rollover_ids(last_date, today)
+        screens = self.env['media.digital.screen'].browse(self.env['media.digital.screen']._get_rollover_ids(last_date, today))
+        faces = screens.face_ids.filtered(lambda face: face.face_type == 'digital')
+        return list(set(face_ids) | set(faces.ids))
 
     def action_view_slots(self):
         self.ensure_one()
@@ -0,0 +1,214 @@
+import json
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from odoo import models, fields, api
+from odoo.tools import SQL
+
+
+class MediaDoohPlaylist(models.AbstractModel):
+    """ Loop scheduler of the digital screens.
+
+    A screen plays a loop of ``slot_duration`` positions from the start of its
+    operating hours. Each slot gets a number of positions matching its share of
+    voice, spread over the loop, and plays its active creative version at those
+    positions on the days it is leased, within its daypart. As the loop is the
+    same every day, the plays of a position are counted arithmetically once per
+    screen, and the days only switch the slots on or off.
+    """
+    _name = 'media.dooh.playlist'
+    _description = 'DOOH Playlist Scheduler'
+
+    @api.model
+    def _get_schedule(self, screen_ids, date_from, date_to):
+        """ Playlist of the screens for every day between ``date_from`` and ``date_to`` included.
+
+        :return: dict {screen id: {
+            'loop': [slot id per loop position],
+            'slots': {slot id: slot row},
+            'versions': {slot id: active version row},
+            'on_air': {slot id: bytearray with 1 for the leased days},
+            'days': [dates],
+            'plays': {version id: [plays per day]},
+            'seconds': {version id: [on-air seconds per day]},
+        }}
+        """
+        screens = self._load_screens(screen_ids)
+        slots_by_screen = self._load_slots(screen_ids)
+        slot_ids = [slot['id'] for slots in slots_by_screen.values() for slot in slots]
+        versions = self._load_versions(slot_ids)
+        days = [date_from + timedelta(days=i) for i in range((date_to - date_from).days + 1)]
+        on_air = self._load_on_air_days(slot_ids, date_from, date_to)
+
+        schedule = {}
+        for screen_id, screen in screens.items():
+            slots = slots_by_screen.get(screen_id, [])
+            loop = self._build_loop(slots, screen['number_of_slots'])
+            daily_plays = self._count_plays(screen, slots, loop)
+            plays, seconds = {}, {}
+            for slot in slots:
+                version = versions.get(slot['id'])
+                if not version or not daily_plays.get(slot['id']):
+                    continue
+                mask = on_air.get(slot['id'], bytearray(len(days)))
+                plays[version['id']] = [daily_plays[slot['id']] * flag for flag in mask]
+                seconds[version['id']] = [count * slot['ad_duration'] for count in plays[version['id']]]
+            schedule[screen_id] = {
+                'loop': loop,
+                'slots': {slot['id']: slot for slot in slots},
+                'versions': {slot['id']: versions[slot['id']] for slot in slots if slot['id'] in versions},
+                'on_air': {slot['id']: on_air[slot['id']] for slot in slots if slot['id'] in on_air},
+                'days': days,
+                'plays': plays,
+                'seconds': seconds,
+            }
+        return schedule
+
+    @api.model
+    def _build_loop(self, slots, number_of_slots):
+        """ Loop order of ``slots``: each slot gets its share of the
+        ``number_of_slots`` positions, interleaved so that a slot with several
+        positions is evenly spread (smooth weighted round-robin).
+        """
+        weights = {slot['id']: max(1, round(slot['sov'] * number_of_slots / 100.0)) for slot in slots}
+        total = sum(weights.values())
+        current = dict.fromkeys(weights, 0)
+        loop = []
+        for __ in range(total):
+            for slot_id, weight in weights.items():
+                current[slot_id] += weight
+            chosen = max(current, key=current.get)
+            current[chosen] -= total
+            loop.append(chosen)
+        return loop
+
+    @api.model
+    def _count_plays(self, screen, slots, loop):
+        """ Daily plays of each slot in ``loop``, within the operating hours and the slot's daypart.
+
+        :return: dict {slot id: plays per day}
+        """
+        if not loop or not screen['slot_duration']:
+            return {}
+        loop_seconds = len(loop) * screen['slot_duration']
+        open_at = screen['operating_hours_start'] * 3600
+        close_at = screen['operating_hours_end'] * 3600
+        slots = {slot['id']: slot for slot in slots}
+        plays = defaultdict(int)
+        for position, slot_id in enumerate(loop):
+            slot = slots[slot_id]
+            offset = open_at + position * screen['slot_duration']
+            for start, end in self._get_dayparts(slot):
+                start, end = max(start, open_at), min(end, close_at)
+                # Loops k >= 0 with start <= offset + k * loop_seconds and the ad ending by ``end``
+                first = max(0, math.ceil((start - offset) / loop_seconds))
+                last = math.floor((end - slot['ad_duration'] - offset) / loop_seconds)
+                plays[slot_id] += max(0, last - first + 1)
+        return plays
+
+    @api.model
+    def _get_dayparts(self, slot):
+        """ Daypart of ``slot`` as (start, end) seconds of the day, split in two
+        when it goes past midnight.
+        """
+        start, end = slot['play_start_time'] * 3600, slot['play_end_time'] * 3600
+        if end > start:
+            return [(start, end)]
+        return [(0, end), (start, 86400)]
+
+    @api.model
+    def _load_screens(self, screen_ids):
+        Screen = self.env['media.digital.screen']
+        Screen.flush_model(['slot_duration', 'number_of_slots', 'operating_hours_start', 'operating_hours_end'])
+        self.env.cr.execute(SQL("""
+            SELECT id, slot_duration, number_of_slots, operating_hours_start, operating_hours_end
+              FROM media_digital_screen
+             WHERE id = ANY(%s)
+        """, list(screen_ids)))
+        return {row['id']: row for row in self.env.cr.dictfetchall()}
+
+    @api.model
+    def _load_slots(self, screen_ids):
+        self.env['media.dooh.slot'].flush_model(['name', 'digital_screen_id', 'sov', 'play_start_time', 'play_end_time', 'ad_duration'])
+        self.env.cr.execute(SQL("""
+            SELECT id, name, digital_screen_id, sov, play_start_time, play_end_time, ad_duration
+              FROM media_dooh_slot
+             WHERE digital_screen_id = ANY(%s)
+          ORDER BY digital_screen_id, id
+        """, list(screen_ids)))
+        slots = defaultdict(list)
+        for row in self.env.cr.dictfetchall():
+            slots[row['digital_screen_id']].append(row)
+        return slots
+
+    @api.model
+    def _load_versions(self, slot_ids):
+        """ Active creative version of each slot, the latest one if several are flagged active. """
+        self.env['media.dooh.content.version'].flush_model(['slot_id', 'is_active', 'name', 'content_filename', 'content_type'])
+        self.env.cr.execute(SQL("""
+            SELECT DISTINCT ON (slot_id) id, slot_id, name, content_filename, content_type
+              FROM media_dooh_content_version
+             WHERE slot_id = ANY(%s) AND is_active
+          ORDER BY slot_id, id DESC
+        """, slot_ids))
+        return {row['slot_id']: row for row in self.env.cr.dictfetchall()}
+
+    @api.model
+    def _load_on_air_days(self, slot_ids, date_from, date_to):
+        """ Days on which each slot is leased by a confirmed order.
+
+        :return: dict {slot id: bytearray with 1 for the leased days of the period}
+        """
+        self.env['sale.order.line'].flush_model(['media_slot_id', 'state', 'start_date', 'end_date'])
+        self.env.cr.execute(SQL("""
+            SELECT media_slot_id, GREATEST(start_date, %(date_from)s), LEAST(end_date, %(date_to)s)
+              FROM sale_order_line
+             WHERE media_slot_id = ANY(%(slot_ids)s)
+               AND state IN ('sale', 'done')
+               AND start_date <= %(date_to)s
+               AND end_date >= %(date_from)s
+        """, slot_ids=slot_ids, date_from=date_from, date_to=date_to))
+        size = (date_to - date_from).days + 1
+        on_air = {}
+        for slot_id, start, end in self.env.cr.fetchall():
+            mask = on_air.setdefault(slot_id, bytearray(size))
+            first, last = (start - date_from).days, (end - date_from).days
+            mask[first:last + 1] = b'\x01' * (last - first + 1)
+        return on_air
+
+    @api.model
+    def _export_playlist(self, screen, date_from, date_to):
+        """ Compact playlist file of ``screen`` for its player, as JSON bytes.
+
+        The player plays the loop from the opening time; a loop position plays
+        its creative when the day is set in ``days`` and the time is within
+        ``daypart``, and is left blank otherwise.
+        """
+        schedule = self._get_schedule(screen.ids, date_from, date_to)[screen.id]
+        creatives = {}
+        for slot_id, version in schedule['versions'].items():
+            mask = schedule['on_air'].get(slot_id)
+            if not mask:
+                continue
+            slot = schedule['slots'][slot_id]
+            creatives[version['id']] = {
+                'slot': slot['name'],
+                'file': version['content_filename'] or version['name'],
+                'type': version['content_type'],
+                'daypart': [slot['play_start_time'], slot['play_end_time']],
+                'days': ''.join('1' if flag else '0' for flag in mask),
+                'plays': sum(schedule['plays'].get(version['id'], [])),
+            }
+        on_loop = {slot_id: version['id'] for slot_id, version in schedule['versions'].items() if version['id'] in creatives}
+        loop = [on_loop.get(slot_id, 0) for slot_id in schedule['loop']]
+        playlist = {
+            'screen': screen.name,
+            'from': fields.Date.to_string(date_from),
+            'to': fields.Date.to_string(date_to),
+            'hours': [screen.operating_hours_start, screen.operating_hours_end],
+            'slot_duration': screen.slot_duration,
+            'loop': loop,
+            'creatives': creatives,
+        }
+        return json.dumps(playlist, separators=(',', ':')).encode()
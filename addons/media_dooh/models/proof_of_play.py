@@ -0,0 +1,263 @@
+import csv
+import io
+import json
+import logging
+import re
+from datetime import datetime, timezone
+
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+from odoo.tools import SQL
+from dateutil.relativedelta import relativedelta
+
+_logger = logging.getLogger(__name__)
+
+# Player log rows inserted per statement
+POP_BATCH_SIZE = 10000
+# Errors kept in the import log, the others are only counted
+POP_MAX_ERRORS = 20
+# Whitespace and punctuation between the records of a JSON array or of JSON lines
+JSON_SEPARATORS = re.compile(r'[\s,\[\]]*')
+
+
+class MediaDoohPlayStat(models.Model):
+    """ Hourly plays and impressions of each slot, rolled up from the player
+    logs. The raw logs are kept in ``media_dooh_play_log``, a table partitioned
+    by month that is only written by the imports and is not an ORM model.
+    """
+    _name = 'media.dooh.play.stat'
+    _description = 'DOOH Proof of Play'
+    _order = 'date desc, hour desc, slot_id'
+
+    slot_id = fields.Many2one('media.dooh.slot', string='Digital Slot', required=True, readonly=True, ondelete='cascade')
+    screen_id = fields.Many2one('media.digital.screen', string='Digital Screen', required=True, readonly=True, index=True, ondelete='cascade')
+    sale_line_id = fields.Many2one('sale.order.line', string='Lease Line', readonly=True, index='btree_not_null', ondelete='set null',
+                                   help="Lease of the slot on that day.")
+    date = fields.Date(string='Date', required=True, readonly=True, index=True)
+    hour = fields.Integer(string='Hour (UTC)', required=True, readonly=True)
+    plays = fields.Integer(string='Plays', readonly=True)
+    impressions = fields.Integer(string='Impressions', readonly=True)
+
+    _slot_hour_uniq = models.Constraint('UNIQUE(slot_id, date, hour)', "Plays are rolled up once per slot and hour.")
+
+    def init(self):
+        self.env.cr.execute("""
+            CREATE TABLE IF NOT EXISTS media_dooh_play_log (
+                slot_id int4 NOT NULL REFERENCES media_dooh_slot (id) ON DELETE CASCADE,
+                screen_id int4 NOT NULL,
+                played_at timestamp NOT NULL,
+                duration int2,
+                impressions int4 NOT NULL DEFAULT 0,
+                import_id int4,
+                UNIQUE (slot_id, played_at)
+            ) PARTITION BY RANGE (played_at)
+        """)
+
+    @api.model
+    def _ensure_log_partitions(self, months):
+        """ Create the monthly partitions of the play log for ``months`` (first days of month). """
+        for month in months:
+            self.env.cr.execute(SQL(
+                "CREATE TABLE IF NOT EXISTS %s PARTITION OF media_dooh_play_log FOR VALUES FROM (%s) TO (%s)",
+                SQL.identifier('media_dooh_play_log_%s' % month.strftime('%Y_%m')), month, month + relativedelta(months=1),
+            ))
+
+
+class MediaDoohPopImport(models.Model):
+    _name = 'media.dooh.pop.import'
+    _description = 'DOOH Proof of Play Import'
+    _order = 'create_date desc, id desc'
+
+    name = fields.Char(string='File Name', required=True)
+    file = fields.Binary(string='Player Log', attachment=True, required=True,
+                         help="CSV with a header line, JSON array or JSON lines. Each play needs a slot, "
+                              "a played_at timestamp and optionally duration and impressions.")
+    state = fields.Selection([
+        ('draft', 'Draft'),
+        ('done', 'Imported'),
+        ('failed', 'Failed'),
+    ], string='Status', default='draft', required=True, readonly=True)
+    imported_count = fields.Integer(string='Plays Imported', readonly=True)
+    duplicate_count = fields.Integer(string='Duplicates', readonly=True, help="Plays already loaded by a previous import.")
+    rejected_count = fields.Integer(string='Rejected', readonly=True)
+    log = fields.Text(string='Errors', readonly=True)
+
+    def action_import(self):
+        for record in self.filtered(lambda r: r.state == 'draft'):
+            with record._open_file() as stream:
+                record._import_stream(stream)
+        return True
+
+    def _open_file(self):
+        """ Binary stream of the uploaded log, read from the filestore without loading it whole. """
+        self.ensure_one()
+        attachment = self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', self._name),
+            ('res_field', '=', 'file'),
+            ('res_id', '=', self.id),
+        ], limit=1)
+        if not attachment:
+            raise UserError(_("There is no player log to import."))
+        if attachment.store_fname:
+            return open(attachment._full_path(attachment.store_fname), 'rb')
+        return io.BytesIO(attachment.raw)
+
+    def _import_stream(self, stream):
+        """ Load the plays of ``stream`` by batches and roll them up. """
+        self.ensure_one()
+        slots = self._get_slot_index()
+        self.env.cr.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS media_dooh_play_staging (
+                slot_id int4, screen_id int4, played_at timestamp, duration int2, impressions int4
+            ) ON COMMIT DROP
+        """)
+        imported = read = rejected = 0
+        errors = []
+        batch = []
+        screen_ids = set()
+        for number, record in enumerate(self._iter_records(stream), 1):
+            try:
+                row = self._parse_record(record, slots)
+            except (KeyError, ValueError, TypeError) as e:
+                rejected += 1
+                if len(errors) < POP_MAX_ERRORS:
+                    errors.append(_("Play %(number)s: %(error)s", number=number, error=e))
+                continue
+            batch.append(row)
+            screen_ids.add(row[1])
+            if len(batch) == POP_BATCH_SIZE:
+                imported += self._insert_batch(batch)
+                read += len(batch)
+                batch = []
+        if batch:
+            imported += self._insert_batch(batch)
+            read += len(batch)
+
+        self.write({
+            'state': 'done' if read or not rejected else 'failed',
+            'imported_count': imported,
+            'duplicate_count': read - imported,
+            'rejected_count': rejected,
+            'log': '\n'.join(errors) or False,
+        })
+        self.env['media.dooh.play.stat'].invalidate_model()
+        screens = self.env['media.digital.screen'].browse(screen_ids)
+        self.env.add_to_compute(screens._fields['views_per_day'], screens)
+        faces = screens.face_ids.filtered(lambda face: face.face_type == 'digital')
+        self.env.add_to_compute(faces._fields['views_per_day'], faces)
+        _logger.info("Proof of play %s: %s plays imported, %s duplicates, %s rejected",
+                     self.name, imported, read - imported, rejected)
+
+    @api.model
+    def _iter_records(self, stream):
+        """ Plays of a CSV or JSON player log, parsed as the file is read. """
+        head = stream.read(1024)
+        stream.seek(0)
+        if head.lstrip()[:1] in (b'[', b'{'):
+            return self._iter_json(stream)
+        return csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+
+    @api.model
+    def _iter_json(self, stream, chunk_size=1 << 20):
+        """ Objects of a JSON array or of JSON lines, decoded chunk by chunk. """
+        decoder = json.JSONDecoder()
+        reader = io.TextIOWrapper(stream, encoding='utf-8-sig')
+        buffer, pos, eof = '', 0, False
+        while True:
+            pos = JSON_SEPARATORS.match(buffer, pos).end()
+            try:
+                if pos == len(buffer):
+                    raise ValueError("buffer exhausted")
+                record, pos = decoder.raw_decode(buffer, pos)
+            except ValueError:
+                # Record cut by the end of the chunk, read on
+                if eof:
+                    if pos == len(buffer):
+                        return
+                    raise UserError(_("The player log is not valid JSON."))
+                chunk = reader.read(chunk_size)
+                eof = not chunk
+                buffer, pos = buffer[pos:] + chunk, 0
+                continue
+            yield record
+
+    @api.model
+    def _get_slot_index(self):
+        """ Slots by name and by id: {key: (slot id, screen id)} """
+        self.env['media.dooh.slot'].flush_model(['name', 'digital_screen_id'])
+        self.env.cr.execute("SELECT id, name, digital_screen_id FROM media_dooh_slot")
+        index = {}
+        for slot_id, name, screen_id in self.env.cr.fetchall():
+            index[name] = index[str(slot_id)] = (slot_id, screen_id)
+        return index
+
+    @api.model
+    def _parse_record(self, record, slots):
+        """ Staging row of a log record: (slot id, screen id, played at, duration, impressions) """
+        slot = record.get('slot') or record.get('slot_id')
+        if str(slot) not in slots:
+            raise ValueError(_("unknown slot %s", slot))
+        slot_id, screen_id = slots[str(slot)]
+        played_at = datetime.fromisoformat(str(record.get('played_at') or record['timestamp']).strip())
+        if played_at.tzinfo:
+            played_at = played_at.astimezone(timezone.utc).replace(tzinfo=None)
+        duration = int(float(record['duration'])) if record.get('duration') not in (None, '') else None
+        impressions = int(float(record['impressions'])) if record.get('impressions') not in (None, '') else 0
+        return slot_id, screen_id, played_at, duration, impressions
+
+    def _insert_batch(self, rows):
+        """ Copy ``rows`` to the play log, skipping the plays already loaded,
+        and add the new ones to the hourly statistics in the same statement.
+
+        :return: number of plays inserted
+        """
+        cr = self.env.cr
+        cr.execute("TRUNCATE media_dooh_play_staging")
+        buffer = io.StringIO()
+        for slot_id, screen_id, played_at, duration, impressions in rows:
+            buffer.write('%s\t%s\t%s\t%s\t%s\n' % (slot_id, screen_id, played_at.isoformat(' '), '\\N' if duration is None else duration, impressions))
+        buffer.seek(0)
+        cr.copy_from(buffer, 'media_dooh_play_staging', columns=('slot_id', 'screen_id', 'played_at', 'duration', 'impressions'))
+
+        cr.execute("SELECT DISTINCT date_trunc('month', played_at)::date FROM media_dooh_play_staging")
+        self.env['media.dooh.play.stat']._ensure_log_partitions([row[0] for row in cr.fetchall()])
+
+        self.env['sale.order.line'].flush_model(['media_slot_id', 'state', 'start_date', 'end_date'])
+        cr.execute(SQL("""
+            WITH inserted AS (
+                INSERT INTO media_dooh_play_log (slot_id, screen_id, played_at, duration, impressions, import_id)
+                SELECT DISTINCT ON (slot_id, played_at) slot_id, screen_id, played_at, duration, impressions, %(import_id)s
+                  FROM media_dooh_play_staging
+                    ON CONFLICT (slot_id, played_at) DO NOTHING
+             RETURNING slot_id, screen_id, played_at, impressions
+            ), hourly AS (
+                SELECT slot_id, screen_id, played_at::date AS date, EXTRACT(HOUR FROM played_at)::int AS hour,
+                       COUNT(*) AS plays, SUM(impressions) AS impressions
+                  FROM inserted
+              GROUP BY slot_id, screen_id, played_at::date, EXTRACT(HOUR FROM played_at)::int
+            ), rollup AS (
+                INSERT INTO media_dooh_play_stat (slot_id, screen_id, sale_line_id, date, hour, plays, impressions,
+                                                  create_uid, create_date, write_uid, write_date)
+                SELECT hourly.slot_id, hourly.screen_id, lease.id, hourly.date, hourly.hour, hourly.plays, hourly.impressions,
+                       %(uid)s, %(now)s, %(uid)s, %(now)s
+                  FROM hourly
+             LEFT JOIN LATERAL (
+                       SELECT line.id
+                         FROM sale_order_line line
+                        WHERE line.media_slot_id = hourly.slot_id
+                          AND line.state IN ('sale', 'done')
+                          AND line.start_date <= hourly.date
+                          AND line.end_date >= hourly.date
+                     ORDER BY line.id DESC
+                        LIMIT 1
+                   ) lease ON TRUE
+                    ON CONFLICT (slot_id, date, hour) DO UPDATE
+                   SET plays = media_dooh_play_stat.plays + EXCLUDED.plays,
+                       impressions = media_dooh_play_stat.impressions + EXCLUDED.impressions,
+                       sale_line_id = COALESCE(EXCLUDED.sale_line_id, media_dooh_play_stat.sale_line_id),
+                       write_uid = EXCLUDED.write_uid,
+                       write_date = EXCLUDED.write_date
+            )
+            SELECT COUNT(*) FROM inserted
+        """, import_id=self.id, uid=self.env.uid, now=fields.Datetime.now()))
+        return cr.fetchone()[0]
@@ -1,28 +1,57 @@
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError
+from odoo.tools import SQL, float_round
+
+
+class SaleOrder(models.Model):
+    _inherit = 'sale.order'
+
+    def _get_period_quantities(self, period_start, period_end):
+        """ Lines leasing a slot of a CPM screen are invoiced per thousand
+        impressions played over the period, as reported by proof of play.
+        Those without impressions are not invoiced.
+
+        CPM lines are selected on the period they cover rather than on what is
+        left of their ordered quantity, as the impressions usually exceed it.
+        """
+        quantities = super(SaleOrder, self)._get_period_quantities(period_start, period_end)
+        if not self:
+            return quantities
+        self.env['sale.order.line'].flush_model(['order_id', 'media_slot_id', 'start_date', 'end_date'])
+        self.env['media.dooh.slot'].flush_model(['digital_screen_id'])
+        self.env['media.digital.screen'].flush_model(['pricing_type'])
+        self.env['media.dooh.play.stat'].flush_model(['sale_line_id', 'date', 'impressions'])
+        self.env.cr.execute(SQL("""
+            SELECT line.id, SUM(stat.impressions)
+              FROM sale_order_line line
+              JOIN media_dooh_slot slot ON slot.id = line.media_slot_id
+              JOIN media_digital_screen screen ON screen.id = slot.digital_screen_id
+         LEFT JOIN media_dooh_play_stat stat
+                ON stat.sale_line_id = line.id
+               AND stat.date BETWEEN %(period_start)s AND %(period_end)s
+             WHERE line.order_id = ANY(%(order_ids)s)
+               AND screen.pricing_type = 'cpm'
+               AND line.start_date <= %(period_end)s
+               AND line.end_date >= %(period_start)s
+          GROUP BY line.id
+        """, order_ids=self.ids, period_start=period_start, period_end=period_end))
+        for line_id, impressions in self.env.cr.fetchall():
+            if impressions:
+                quantities[line_id] = float_round(impressions / 1000.0, precision_digits=3)
+            else:
+                quantities.pop(line_id, None)
+        return quantities
+
 
 class SaleOrderLine(models.Model):
     _inherit = 'sale.order.line'
 
-    media_slot_id = fields.Many2one('media.dooh.slot', string='Digital Slot')
+    media_slot_id = fields.Many2one('media.dooh.slot', string='Digital Slot', index='btree_not_null')
     partner_id = fields.Many2one('res.partner', related='order_id.partner_id', string='Customer', store=True)
 
     @api.constrains('media_slot_id', 'start_date', 'end_date', 'state')
     def _check_digital_slot_availability(self):
-        for line in self:
-            if not line.media_slot_id or not line.start_date or not line.end_date:
-                continue
-            
-            domain = [
-                ('id', '!=', line.id),
-                ('media_slot_id', '=', line.media_slot_id.id),
-                ('state', 'in', ['sale', 'done']),
-                ('start_date', '<=', line.end_date),
-                ('end_date', '>=', line.start_date),
-            ]
-            overlapping = self.search_count(domain)
-            if overlapping:
-                raise ValidationError(_('The digital slot %s is already booked for the selected period.') % line.media_slot_id.name)
+        self._check_booking_conflicts('media_slot_id', _('The digital slot %s is already booked for the selected period.'))
 
     def _prepare_invoice_line(self, **optional_values):
         res = super(SaleOrderLine, self)._prepare_invoice_line(**optional_values)
@@ -52,6 +81,8 @@ class SaleOrderLine(models.Model):
                 self.price_unit = screen.price_slot_weekly
             elif screen.pricing_type == 'fixed':
                 self.price_unit = screen.price_per_month
+            elif screen.pricing_type == 'cpm':
+                self.price_unit = screen.cpm_rate
             
             # Update description
             self.name = _("Digital Slot: %s | Screen: %s") % (
@@ -1,4 +1,5 @@
 from odoo import models, fields, api, _
+from odoo.tools import SQL
 from odoo.exceptions import UserError
 from dateutil.relativedelta import relativedelta
 
@@ -50,47 +51,56 @@ class MediaDoohSlot(models.Model):
 
     @api.depends('sale_line_ids.state', 'sale_line_ids.start_date', 'sale_line_ids.end_date')
     def _compute_current_booking(self):
-        today = fields.Date.today()
+        bookings = self._get_current_bookings()
         for slot in self:
-            # Check for active bookings
-            active_booking = slot.sale_line_ids.filtered(lambda l: 
-                l.state in ['sale', 'done'] and 
-                l.start_date and l.end_date and
-                l.start_date <= today <= l.end_date
-            )
-            if active_booking:
-                slot.state = 'booked'
-                continue
-
-            # Check for reserved bookings
-            reserved_booking = slot.sale_line_ids.filtered(lambda l: 
-                l.state in ['draft', 'sent'] and 
-                l.start_date and l.end_date and
-                l.start_date <= today <= l.end_date
-            )
-            if reserved_booking:
-                slot.state = 'reserved'
-            else:
-                slot.state = 'available'
+            booked, reserved, __ = bookings.get(slot._origin.id, (False, False, False))
+            slot.state = 'booked' if booked else 'reserved' if reserved else 'available'
 
     @api.depends('sale_line_ids.state', 'sale_line_ids.end_date')
     def _compute_expiry_status(self):
         today = fields.Date.today()
         soon = today + relativedelta(days=5)
+        bookings = self._get_current_bookings()
         for slot in self:
-            # Find the end date of the *current* active booking
-            active_line = slot.sale_line_ids.filtered(lambda l: 
-                l.state in ['sale', 'done'] and 
-                l.start_date and l.end_date and
-                l.start_date <= today <= l.end_date
-            ).sorted(key=lambda l: l.end_date, reverse=True)
-            
-            end_date = active_line[0].end_date if active_line else False
-            slot.is_expiring_soon = (
-                slot.state == 'booked' and 
-                end_date and 
-                today <= end_date <= soon
-            )
+            booked, __, end_date = bookings.get(slot._origin.id, (False, False, False))
+            slot.is_expiring_soon = bool(booked and end_date and end_date <= soon)
+
+    def _get_current_bookings(self):
+        """ Lease lines covering today, for all the slots at once.
+
+        :return: dict {slot id: (booked, reserved, end of the current confirmed lease)}
+        """
+        slot_ids = [slot_id for slot_id in self._origin.ids if slot_id]
+        if not slot_ids:
+            return {}
+        self.env['sale.order.line'].flush_model(['media_slot_id', 'state', 'start_date', 'end_date'])
+        self.env.cr.execute(SQL("""
+            SELECT media_slot_id,
+                   BOOL_OR(state IN ('sale', 'done')),
+                   BOOL_OR(state IN ('draft', 'sent')),
+                   MAX(end_date) FILTER (WHERE state IN ('sale', 'done'))
+              FROM sale_order_line
+             WHERE media_slot_id = ANY(%(slot_ids)s)
+               AND start_date <= %(today)s
+               AND end_date >= %(today)s
+          GROUP BY media_slot_id
+        """, slot_ids=slot_ids, today=fields.Date.today()))
+        return {slot_id: (booked, reserved, end_date) for slot_id, booked, reserved, end_date in self.env.cr.fetchall()}
+
+    @api.model
+    def _get_rollover_ids(self, last_date, today):
+        """ Slots with a lease line starting or ending since ``last_date``, or
+        entering the 5-day expiry window. """
+        soon = relativedelta(days=5)
+        self.env['sale.order.line'].flush_model(['media_slot_id', 'start_date', 'end_date'])
+        self.env.cr.execute(SQL("""
+            SELECT DISTINCT media_slot_id FROM sale_order_line
+             WHERE media_slot_id IS NOT NULL
+               AND ((start_date > %(last)s AND start_date <= %(today)s)
+                    OR (end_date >= %(last)s AND end_date < %(today)s)
+                    OR (end_date > %(last_soon)s AND end_date <= %(today_soon)s))
+        """, last=last_date, today=today, last_soon=last_date + soon, today_soon=today + soon))
+        return [row[0] for row in self.env.cr.fetchall()]
 
     @api.constrains('ad_duration')
 
@@ -102,11 +112,43 @@ class MediaDoohSlot(models.Model):
 
     @api.model_create_multi
     def create(self, vals_list):
-        for vals in vals_list:
-            if vals.get('name', 'New') == 'New':
-                vals['name'] = self.env['ir.sequence'].next_by_code('media.dooh.slot') or 'New'
+        unnamed = [vals for vals in vals_list if vals.get('name', 'New') == 'New']
+        for vals, name in zip(unnamed, self._reserve_names(len(unnamed))):
+            vals['name'] = name
         return super(MediaDoohSlot, self).create(vals_list)
 
+    @api.model
+    def _reserve_names(self, count):
+        """ Reserve the next ``count`` numbers of the slot sequence in one go,
+        instead of one ``next_by_code`` call per slot.
+        """
+        if not count:
+            return []
+        sequence = self.env['ir.sequence'].sudo().search([
+            ('code', '=', 'media.dooh.slot'),
+            ('company_id', 'in', [self.env.company.id, False]),
+        ], order='company_id', limit=1)
+        if not sequence:
+            return ['New'] * count
+        if sequence.use_date_range:
+            return [sequence.next_by_id() for __ in range(count)]
+        if sequence.implementation == 'standard':
+            self.env.cr.execute(SQL(
+                "SELECT nextval(%s) FROM generate_series(1, %s)",
+                'ir_sequence_%03d' % sequence.id, count,
+            ))
+            numbers = sorted(row[0] for row in self.env.cr.fetchall())
+        else:
+            step = sequence.number_increment
+            self.env.cr.execute(SQL(
+                "UPDATE ir_sequence SET number_next = number_next + %s WHERE id = %s RETURNING number_next",
+                count * step, sequence.id,
+            ))
+            number_next = self.env.cr.fetchone()[0]
+            sequence.invalidate_recordset(['number_next'])
+            numbers = range(number_next - count * step, number_next, step)
+        return [sequence.get_next_char(number) for number in numbers]
+
     @api.depends('digital_screen_id.number_of_slots')
     def _compute_sov(self):
         for slot in self:
@@ -168,3 +210,14 @@ class MediaDoohSlot(models.Model):
                 user_id=user_id.id
             )
 
+
+class MediaRollover(models.AbstractModel):
+    _inherit = 'media.rollover'
+
+    @api.model
+    def _get_rollover_plan(self):
+        plan = super(MediaRollover, self)._get_rollover_plan()
+        plan['media.dooh.slot'] = ['state', 'is_expiring_soon']
+        plan['media.digital.screen'] = ['views_per_day', 'estimated_monthly_impressions']
+        plan['media.face'] = plan.get('media.face', []) + ['views_per_day']
+        return plan
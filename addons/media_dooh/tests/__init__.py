@@ -1 +1,3 @@
 from . import test_dooh_slot
+from . import test_playlist
+from . import test_proof_of_play
@@ -134,3 +134,19 @@ class TestDoohSlot(TransactionCase):
         line.end_date = start_date + relativedelta(months=1, days=15)
         line._onchange_lease_duration()
         self.assertEqual(line.product_uom_qty, 1.5)
+
+    def test_bulk_slot_provisioning(self):
+        """ Slots of several screens are numbered from one reserved block """
+        screens = self.Screen.create([{
+            'name': 'Network Screen %s' % i,
+            'site_id': self.site.id,
+            'number_of_slots': 12,
+        } for i in range(3)])
+        slots = screens.slot_ids
+        self.assertEqual(len(slots), 36)
+        self.assertEqual(len(set(slots.mapped('name'))), 36)
+        self.assertEqual(screens.mapped('slot_count'), [12, 12, 12])
+        self.assertEqual(screens.mapped('available_slots'), [12, 12, 12])
+
+        screens[0].number_of_slots = 4
+        self.assertEqual(screens[0].slot_count, 4)
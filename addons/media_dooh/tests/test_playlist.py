@@ -0,0 +1,75 @@
+import base64
+import json
+
+from odoo.tests.common import TransactionCase
+from odoo import fields
+from dateutil.relativedelta import relativedelta
+
+
+class TestPlaylist(TransactionCase):
+
+    def setUp(self):
+        super(TestPlaylist, self).setUp()
+        self.Playlist = self.env['media.dooh.playlist']
+        self.partner = self.env['res.partner'].create({'name': 'Test Client'})
+        self.site = self.env['media.site'].create({'name': 'Test Site', 'code': 'TS'})
+        self.product = self.env['product.product'].create({'name': 'Digital Screen Service', 'type': 'service'})
+        self.screen = self.env['media.digital.screen'].create({
+            'name': 'Digital Screen 1',
+            'site_id': self.site.id,
+            'number_of_slots': 4,
+            'operating_hours_start': 6.0,
+            'operating_hours_end': 22.0,
+            'product_id': self.product.id,
+        })
+        self.slot = self.screen.slot_ids.sorted('id')[0]
+        self.slot.write({'play_start_time': 6.0, 'play_end_time': 12.0})
+        self.version = self.env['media.dooh.content.version'].create({
+            'slot_id': self.slot.id,
+            'name': 'Morning Ad',
+            'content_file': base64.b64encode(b'creative'),
+            'content_filename': 'morning.mp4',
+            'content_type': 'video',
+            'is_active': True,
+        })
+        self.today = fields.Date.today()
+        order = self.env['sale.order'].create({
+            'partner_id': self.partner.id,
+            'order_line': [(0, 0, {
+                'product_id': self.product.id,
+                'media_slot_id': self.slot.id,
+                'start_date': self.today,
+                'end_date': self.today + relativedelta(days=1),
+            })],
+        })
+        order.action_confirm()
+
+    def test_plays_within_daypart(self):
+        """ A 60s loop plays the slot every minute of its 6h daypart, only on leased days """
+        schedule = self.Playlist._get_schedule(self.screen.ids, self.today, self.today + relativedelta(days=2))
+        screen_schedule = schedule[self.screen.id]
+        self.assertEqual(len(screen_schedule['loop']), 4)
+        self.assertEqual(screen_schedule['loop'][0], self.slot.id)
+        self.assertEqual(screen_schedule['plays'][self.version.id], [360, 360, 0])
+        self.assertEqual(screen_schedule['seconds'][self.version.id], [5400, 5400, 0])
+        self.assertEqual(self.version.daily_plays, 360)
+
+    def test_export_playlist(self):
+        """ The exported loop only names the creatives on air during the period """
+        playlist = json.loads(self.Playlist._export_playlist(self.screen, self.today, self.today + relativedelta(days=2)))
+        self.assertEqual(playlist['loop'], [self.version.id, 0, 0, 0])
+        creative = playlist['creatives'][str(self.version.id)]
+        self.assertEqual(creative['days'], '110')
+        self.assertEqual(creative['daypart'], [6.0, 12.0])
+        self.assertEqual(creative['plays'], 720)
+
+    def test_export_playlist_action(self):
+        """ Downloading the playlist does not leave an attachment behind """
+        action = self.screen.action_export_playlist()
+        self.assertEqual(action['url'], '/media_dooh/playlist/%s' % self.screen.id)
+        filename, content = self.screen._get_playlist_file()
+        self.assertIn(self.today.strftime('%Y-%m'), filename)
+        self.assertIn('loop', json.loads(content))
+        self.assertFalse(self.env['ir.attachment'].search_count([
+            ('res_model', '=', 'media.digital.screen'), ('res_id', '=', self.screen.id),
+        ]))
@@ -0,0 +1,165 @@
+import base64
+import io
+import json
+from datetime import date
+
+from odoo.tests.common import TransactionCase
+from odoo import fields
+from dateutil.relativedelta import relativedelta
+
+
+class TestProofOfPlay(TransactionCase):
+
+    def setUp(self):
+        super(TestProofOfPlay, self).setUp()
+        self.Import = self.env['media.dooh.pop.import']
+        self.Stat = self.env['media.dooh.play.stat']
+        self.partner = self.env['res.partner'].create({'name': 'Test Client'})
+        self.site = self.env['media.site'].create({'name': 'Test Site', 'code': 'TS'})
+        self.product = self.env['product.product'].create({'name': 'Digital Screen Service', 'type': 'service'})
+        self.screen = self.env['media.digital.screen'].create({
+            'name': 'Digital Screen 1',
+            'site_id': self.site.id,
+            'number_of_slots': 2,
+            'product_id': self.product.id,
+        })
+        self.slot = self.screen.slot_ids.sorted('id')[0]
+        self.yesterday = fields.Date.today() - relativedelta(days=1)
+        order = self.env['sale.order'].create({
+            'partner_id': self.partner.id,
+            'order_line': [(0, 0, {
+                'product_id': self.product.id,
+                'media_slot_id': self.slot.id,
+                'start_date': self.yesterday,
+                'end_date': self.yesterday + relativedelta(days=30),
+            })],
+        })
+        order.action_confirm()
+        self.lease = order.order_line
+
+    def _import(self, content, name='player.log'):
+        pop_import = self.Import.create({'name': name, 'file': base64.b64encode(content)})
+        pop_import._import_stream(io.BytesIO(content))
+        return pop_import
+
+    def test_csv_import_rollup(self):
+        """ Plays are rolled up per hour, linked to the lease, and never loaded twice """
+        day = self.yesterday.isoformat()
+        content = (
+            "slot,played_at,duration,impressions\n"
+            "%(slot)s,%(day)s 08:00:00,15,10\n"
+            "%(slot)s,%(day)s 08:01:00,15,12\n"
+            "%(slot)s,%(day)s 09:00:00,15,8\n"
+            "SLOT/UNKNOWN,%(day)s 09:00:00,15,8\n"
+        ) % {'slot': self.slot.name, 'day': day}
+        pop_import = self._import(content.encode())
+        self.assertEqual(pop_import.state, 'done')
+        self.assertEqual(pop_import.imported_count, 3)
+        self.assertEqual(pop_import.rejected_count, 1)
+
+        stats = self.Stat.search([('slot_id', '=', self.slot.id)], order='hour')
+        self.assertEqual(stats.mapped('hour'), [8, 9])
+        self.assertEqual(stats.mapped('plays'), [2, 1])
+        self.assertEqual(stats.mapped('impressions'), [22, 8])
+        self.assertEqual(stats.sale_line_id, self.lease)
+
+        again = self._import(content.encode())
+        self.assertEqual(again.imported_count, 0)
+        self.assertEqual(again.duplicate_count, 3)
+        self.assertEqual(sum(self.Stat.search([('slot_id', '=', self.slot.id)]).mapped('plays')), 3)
+
+    def test_json_import_feeds_screen_audience(self):
+        """ Measured plays replace the theoretical views per day of the screen """
+        plays = [{
+            'slot_id': self.slot.id,
+            'played_at': '%sT%02d:00:00+00:00' % (self.yesterday.isoformat(), hour),
+            'impressions': 5,
+        } for hour in range(6)]
+        pop_import = self._import(json.dumps(plays).encode(), name='player.json')
+        self.assertEqual(pop_import.imported_count, 6)
+        self.env.flush_all()
+        self.assertEqual(self.screen.views_per_day, 6)
+        self.assertEqual(self.screen.estimated_monthly_impressions, 900)
+
+    def test_face_views_follow_screen_audience(self):
+        """ Digital faces show the audience measured on the screen of their site """
+        face = self.env['media.face'].create({
+            'name': 'Digital Face',
+            'site_id': self.site.id,
+            'face_type': 'digital',
+        })
+        loops = face.views_per_day
+        self.assertTrue(loops)
+        plays = [{
+            'slot_id': self.slot.id,
+            'played_at': '%sT%02d:00:00+00:00' % (self.yesterday.isoformat(), hour),
+            'impressions': 5,
+        } for hour in range(6)]
+        self._import(json.dumps(plays).encode(), name='player.json')
+        self.env.flush_all()
+        self.assertEqual(face.views_per_day, 6)
+
+        # The roll-over brings the face back to its loop rate once the plays age out
+        self.env.cr.execute("UPDATE media_dooh_play_stat SET date = date - 40 WHERE screen_id = %s", [self.screen.id])
+        self.Stat.invalidate_model()
+        last_date = fields.Date.today() - relativedelta(days=15)
+        self.assertIn(face.id, self.env['media.face']._get_rollover_ids(last_date, fields.Date.today()))
+        self.env['ir.config_parameter'].sudo().set_param('media_inventory.rollover_last_date', fields.Date.to_string(last_date))
+        self.env['media.rollover']._cron_rollover()
+        self.assertEqual(face.views_per_day, loops)
+
+    def test_cpm_billed_every_month(self):
+        """ CPM leases are billed on the impressions of each month, beyond their ordered quantity """
+        self.screen.write({'pricing_type': 'cpm', 'cpm_rate': 5})
+        slot = self.screen.slot_ids.sorted('id')[1]
+        order = self.env['sale.order'].create({
+            'partner_id': self.partner.id,
+            'order_line': [(0, 0, {
+                'product_id': self.product.id,
+                'media_slot_id': slot.id,
+                'start_date': date(2026, 1, 1),
+                'end_date': date(2026, 2, 28),
+                'product_uom_qty': 1,
+            })],
+        })
+        order.action_confirm()
+        self.Stat.create([{
+            'slot_id': slot.id,
+            'screen_id': self.screen.id,
+            'sale_line_id': order.order_line.id,
+            'date': date(2026, month, 10),
+            'hour': 8,
+            'plays': 100,
+            'impressions': impressions,
+        } for month, impressions in ((1, 150000), (2, 90000))])
+
+        quantities = []
+        for month in (1, 2):
+            invoice_id = order._create_monthly_invoices(date(2026, month, 1))[order.id]
+            quantities.append(self.env['account.move'].browse(invoice_id).invoice_line_ids.quantity)
+        self.assertEqual(quantities, [150.0, 90.0])
+        self.assertEqual(order.order_line.qty_invoiced, 240.0)
+
+    def test_audience_ages_out(self):
+        """ The daily roll-over drops the plays older than the audience window """
+        self.Stat.create({
+            'slot_id': self.slot.id,
+            'screen_id': self.screen.id,
+            'date': fields.Date.today() - relativedelta(days=40),
+            'hour': 8,
+            'plays': 10,
+            'impressions': 500,
+        })
+        # Audience as computed when those plays were still in the window
+        self.env.flush_all()
+        self.env.cr.execute(
+            "UPDATE media_digital_screen SET views_per_day = 10, estimated_monthly_impressions = 15000 WHERE id = %s",
+            [self.screen.id])
+        self.screen.invalidate_recordset(['views_per_day', 'estimated_monthly_impressions'])
+
+        last_date = fields.Date.today() - relativedelta(days=15)
+        self.assertIn(self.screen.id, self.env['media.digital.screen']._get_rollover_ids(last_date, fields.Date.today()))
+        self.env['ir.config_parameter'].sudo().set_param('media_inventory.rollover_last_date', fields.Date.to_string(last_date))
+        self.env['media.rollover']._cron_rollover()
+        self.assertEqual(self.screen.estimated_monthly_impressions, 0)
+        self.assertNotEqual(self.screen.views_per_day, 10)
@@ -1,6 +1,6 @@
 {
     'name': 'Media Finance',
-    'version': '1.0',
+    'version': '1.2',
     'category': 'Accounting',
     'summary': 'Revenue Recognition and Site P&L for Media Assets',
     'author': 'JengaSol Consulting',
@@ -16,6 +16,7 @@
         'wizard/rental_wizard_views.xml',
         'wizard/transfer_booking_wizard_views.xml',
         'views/rental_views.xml',
+        'views/billing_run_views.xml',
         'views/face_views_inherit.xml',
         'views/account_move_views.xml',
         'views/menus.xml',
@@ -0,0 +1,7 @@
+from odoo import api, SUPERUSER_ID
+
+
+def migrate(cr, version):
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    # Invoice lines now reference the artwork of their sale order line
+    env['media.artwork']._adopt_attachments('account.move.line', 'artwork_file')
@@ -1,3 +1,5 @@
 from . import rental
 from . import contract_management
 from . import account_move_inherit
+from . import billing_run
+from . import account_payment
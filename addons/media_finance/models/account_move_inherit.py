@@ -1,18 +1,24 @@
 from odoo import models, fields, api, _
 
 class AccountMoveLine(models.Model):
-    _inherit = 'account.move.line'
+    _inherit = ['account.move.line', 'media.artwork.mixin']
 
     media_face_id = fields.Many2one('media.face', string='Media Face')
     media_digital_screen_id = fields.Many2one('media.digital.screen', string='Digital Screen')
     canopy_id = fields.Many2one('media.canopy', string='Canopy')
+    media_site_id = fields.Many2one('media.site', string='Media Site', compute='_compute_media_site_id', store=True, index='btree_not_null')
     start_date = fields.Date(string='Start Date')
     end_date = fields.Date(string='End Date')
     item_description = fields.Text(string='Item Description')
-    artwork_file = fields.Image(string='Artwork/Graphic', max_width=1920, max_height=1920)
+    artwork_file = fields.Image(string='Artwork/Graphic')
     artwork_filename = fields.Char(string='Artwork Filename')
     move_payment_state = fields.Selection(related='move_id.payment_state', string='Payment Status')
 
+    @api.depends('media_face_id.site_id', 'canopy_id.site_id', 'media_digital_screen_id.site_id')
+    def _compute_media_site_id(self):
+        for line in self:
+            line.media_site_id = line.media_face_id.site_id or line.canopy_id.site_id or line.media_digital_screen_id.site_id
+
     @api.onchange('product_id', 'media_face_id', 'media_digital_screen_id', 'canopy_id', 'start_date', 'end_date')
     def _onchange_generate_custom_description(self):
         for line in self:
@@ -0,0 +1,20 @@
+from odoo import models, fields, api
+
+
+class AccountMove(models.Model):
+    _inherit = 'account.move'
+
+    # Legacy payments are found by their rental number in the reference
+    ref = fields.Char(index='trigram')
+
+
+class AccountPayment(models.Model):
+    _inherit = 'account.payment'
+
+    media_order_ids = fields.Many2many('sale.order', string='Paid Contracts', compute='_compute_media_order_ids',
+                                       help="Contracts of the invoices paid by this payment.")
+
+    @api.depends('invoice_ids.invoice_line_ids.sale_line_ids')
+    def _compute_media_order_ids(self):
+        for payment in self:
+            payment.media_order_ids = payment.invoice_ids.invoice_line_ids.sale_line_ids.order_id
@@ -0,0 +1,278 @@
+import logging
+
+from dateutil.relativedelta import relativedelta
+
+from psycopg2.errors import LockNotAvailable, SerializationFailure
+
+from odoo import models, fields, api, _
+from odoo.tools import SQL, mute_logger
+
+_logger = logging.getLogger(__name__)
+
+# Number of billing workers, each one has its own cron (see billing_crons.xml)
+BILLING_SHARDS = 4
+
+
+class MediaBillingRun(models.Model):
+    _name = 'media.billing.run'
+    _description = 'Monthly Billing Run'
+    _order = 'period_start desc, id desc'
+
+    name = fields.Char(string='Name', compute='_compute_name', store=True)
+    period_start = fields.Date(string='Billing Period', required=True, readonly=True, index=True, help="First day of the billed month.")
+    state = fields.Selection([
+        ('draft', 'Draft'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+    ], string='Status', default='draft', required=True, readonly=True)
+    line_ids = fields.One2many('media.billing.run.line', 'run_id', string='Orders', readonly=True)
+
+    date_start = fields.Datetime(string='Started On', readonly=True)
+    date_end = fields.Datetime(string='Finished On', readonly=True)
+    duration = fields.Float(string='Duration (sec)', readonly=True, help="Wall time from the start of the run until its last shard was done.")
+
+    order_count = fields.Integer(compute='_compute_counts', string='Orders')
+    invoiced_count = fields.Integer(compute='_compute_counts', string='Invoiced')
+    pending_count = fields.Integer(compute='_compute_counts', string='Pending')
+    failed_count = fields.Integer(compute='_compute_counts', string='Failed')
+    skipped_count = fields.Integer(compute='_compute_counts', string='Nothing to Invoice')
+
+    _period_start_uniq = models.Constraint('UNIQUE(period_start)', "There is already a billing run for this period.")
+
+    @api.depends('period_start')
+    def _compute_name(self):
+        for run in self:
+            run.name = _("Billing %s") % run.period_start.strftime('%Y-%m') if run.period_start else _('New')
+
+    def _compute_counts(self):
+        counts = {
+            (run.id, state): count
+            for run, state, count in self.env['media.billing.run.line']._read_group(
+                [('run_id', 'in', self.ids)], ['run_id', 'state'], ['__count'])
+        }
+        for run in self:
+            run.invoiced_count = counts.get((run.id, 'done'), 0)
+            run.pending_count = counts.get((run.id, 'pending'), 0)
+            run.failed_count = counts.get((run.id, 'failed'), 0)
+            run.skipped_count = counts.get((run.id, 'skipped'), 0)
+            run.order_count = run.invoiced_count + run.pending_count + run.failed_count + run.skipped_count
+
+    @api.model
+    def _get_chunk_size(self):
+        return int(self.env['ir.config_parameter'].sudo().get_param('media_finance.billing_chunk_size', 50))
+
+    @api.model
+    def _run_monthly_billing(self, date=None, auto_commit=False):
+        """ Bill the rental contracts active on ``date`` for its month.
+
+        This is the coordinator: it registers the orders of the period, one
+        line per order assigned to a shard, then hands the unfinished runs
+        over to the billing workers. With ``auto_commit`` the worker crons are
+        triggered and run in parallel, otherwise the shards are billed inline.
+        Runs left unfinished by a previous execution are resumed as well.
+        """
+        date = date or fields.Date.today()
+        period_start = date.replace(day=1)
+        run = self.search([('period_start', '=', period_start)], limit=1) or self.create({'period_start': period_start})
+        run._add_eligible_orders(date)
+        self.search([('state', '=', 'draft')]).write({'state': 'running', 'date_start': fields.Datetime.now()})
+
+        if auto_commit:
+            self.env.cr.commit()
+            for shard in range(BILLING_SHARDS):
+                cron = self.env.ref('media_finance.ir_cron_monthly_billing_worker_%s' % shard, raise_if_not_found=False)
+                if cron and cron.active:
+                    cron._trigger()
+        else:
+            for shard in range(BILLING_SHARDS):
+                self._cron_billing_worker(shard)
+        return run
+
+    def _add_eligible_orders(self, date):
+        """ Register the confirmed orders with a lease line covering ``date`` that are not yet part of the run. """
+        self.ensure_one()
+        period = self.period_start.strftime('%Y-%m')
+        orders = self.env['sale.order'].search([
+            ('state', '=', 'sale'),
+            ('order_line.start_date', '<=', date),
+            ('order_line.end_date', '>=', date),
+            ('id', 'not in', self.line_ids.order_id.ids),
+        ])
+        if not orders:
+            return
+        self.env['media.billing.run.line'].create([{
+            'run_id': self.id,
+            'order_id': order.id,
+            # All the orders of a client go to the same worker
+            'shard': order.partner_id.id % BILLING_SHARDS,
+            # Orders billed before the billing runs existed are tracked in invoiced_months
+            'state': 'done' if period in (order.invoiced_months or '').split(',') else 'pending',
+        } for order in orders])
+        self._reopen()
+
+    def _reopen(self):
+        """ Put the finished runs back to running, timing them from now on. """
+        self.filtered(lambda run: run.state == 'done').write({
+            'state': 'running',
+            'date_start': fields.Datetime.now(),
+            'date_end': False,
+            'duration': 0.0,
+        })
+
+    @api.model
+    def _cron_billing_worker(self, shard, auto_commit=False):
+        for run in self.search([('state', '=', 'running')], order='period_start, id'):
+            run._process_shard(shard, auto_commit=auto_commit)
+
+    def _process_shard(self, shard, auto_commit=False):
+        """ Bill the pending lines of ``shard``, then help with the other shards. """
+        self.ensure_one()
+        chunk_size = self._get_chunk_size()
+        invoice_date = self._get_invoice_date()
+        for claimed_shard in (shard, None):
+            lines = self._claim_lines(claimed_shard, chunk_size)
+            while lines:
+                lines._bill(invoice_date)
+                if auto_commit:
+                    self.env.cr.commit()
+                lines = self._claim_lines(claimed_shard, chunk_size)
+        self._check_done()
+        if auto_commit:
+            self.env.cr.commit()
+
+    def _get_invoice_date(self):
+        """ Date of the invoices of the run: today for the current month, the
+        last day of the billed month when resuming the run of a past month.
+        """
+        self.ensure_one()
+        period_end = self.period_start + relativedelta(months=1, days=-1)
+        return max(self.period_start, min(fields.Date.today(), period_end))
+
+    def _claim_lines(self, shard, limit):
+        """ Lock up to ``limit`` pending lines of the run, skipping the ones
+        already locked by another worker. ``shard`` None claims from any shard.
+        """
+        self.ensure_one()
+        Line = self.env['media.billing.run.line']
+        Line.flush_model(['run_id', 'shard', 'state'])
+        self.env.cr.execute(SQL("""
+            SELECT id
+              FROM media_billing_run_line
+             WHERE run_id = %(run_id)s
+               AND state = 'pending'
+               %(shard_clause)s
+          ORDER BY id
+             LIMIT %(limit)s
+               FOR UPDATE SKIP LOCKED
+        """,
+            run_id=self.id,
+            shard_clause=SQL("AND shard = %s", shard) if shard is not None else SQL(),
+            limit=limit,
+        ))
+        return Line.browse(row[0] for row in self.env.cr.fetchall())
+
+    def _check_done(self):
+        """ Close the run once no line is left pending.
+
+        Every worker checks after committing its last chunk, so the last one
+        to finish sees the others' work and closes the run. The run row is
+        locked first: a worker that cannot get the lock leaves the closing to
+        the one holding it rather than failing on a concurrent update. A run
+        left running this way is closed on the next pass of the workers.
+        """
+        self.ensure_one()
+        self.flush_recordset(['state', 'date_start'])
+        self.env['media.billing.run.line'].flush_model(['run_id', 'state'])
+        try:
+            with mute_logger('odoo.sql_db'), self.env.cr.savepoint(flush=False):
+                self.env.cr.execute(SQL("""
+                    SELECT id FROM media_billing_run
+                     WHERE id = %s AND state = 'running'
+                       FOR UPDATE NOWAIT
+                """, self.id))
+                locked = self.env.cr.fetchone()
+        except (LockNotAvailable, SerializationFailure):
+            _logger.info("%s is being closed by another worker", self.name)
+            return
+        if not locked:
+            return
+        self.env.cr.execute(SQL("""
+            UPDATE media_billing_run
+               SET state = 'done',
+                   date_end = NOW() AT TIME ZONE 'UTC',
+                   duration = EXTRACT(EPOCH FROM (NOW() AT TIME ZONE 'UTC') - date_start)
+             WHERE id = %(run_id)s
+               AND state = 'running'
+               AND NOT EXISTS (
+                   SELECT 1 FROM media_billing_run_line
+                    WHERE run_id = %(run_id)s AND state = 'pending'
+               )
+         RETURNING id
+        """, run_id=self.id))
+        if self.env.cr.fetchone():
+            self.invalidate_recordset(['state', 'date_end', 'duration'])
+            _logger.info("%s: %s orders invoiced, %s failed in %.1fs",
+                         self.name, self.invoiced_count, self.failed_count, self.duration)
+
+    def action_retry_failed(self):
+        self.line_ids.filtered(lambda l: l.state == 'failed').write({'state': 'pending', 'error': False})
+        self._reopen()
+        for run in self:
+            run._process_shard(None)
+        return True
+
+
+class MediaBillingRunLine(models.Model):
+    _name = 'media.billing.run.line'
+    _description = 'Monthly Billing Run Order'
+    _order = 'run_id, id'
+
+    run_id = fields.Many2one('media.billing.run', string='Billing Run', required=True, ondelete='cascade', index=True)
+    period_start = fields.Date(related='run_id.period_start', store=True)
+    order_id = fields.Many2one('sale.order', string='Contract', required=True, ondelete='cascade', index=True)
+    shard = fields.Integer(string='Shard', readonly=True, help="Billing worker in charge of the order.")
+    partner_id = fields.Many2one(related='order_id.partner_id', string='Client')
+    state = fields.Selection([
+        ('pending', 'Pending'),
+        ('done', 'Invoiced'),
+        ('failed', 'Failed'),
+        ('skipped', 'Nothing to Invoice'),
+    ], string='Status', default='pending', required=True, index=True)
+    invoice_id = fields.Many2one('account.move', string='Invoice', ondelete='set null')
+    error = fields.Text(string='Error')
+
+    _run_order_uniq = models.Constraint('UNIQUE(run_id, order_id)', "An order can only be billed once per period.")
+
+    def _bill(self, invoice_date):
+        """ Invoice the orders of the lines, in bulk when possible.
+
+        The whole chunk is invoiced in one go inside a savepoint; if it fails,
+        each order is retried on its own so a single faulty contract only fails
+        its own line. Orders for which no invoice was created are marked as
+        skipped rather than invoiced, including the chunks made only of such
+        orders, for which the invoicing must not raise.
+        """
+        orders = self.order_id.with_context(raise_if_nothing_to_invoice=False)
+        try:
+            with self.env.cr.savepoint():
+                invoices = orders._create_monthly_invoices(invoice_date)
+                for line in self:
+                    line._set_invoice(invoices.get(line.order_id.id, False))
+            return
+        except Exception:
+            _logger.info("Bulk billing failed, invoicing orders one by one", exc_info=True)
+
+        for line in self:
+            try:
+                with self.env.cr.savepoint():
+                    invoice = orders.browse(line.order_id.id)._create_monthly_invoice(invoice_date)
+                    line._set_invoice(invoice[:1].id)
+            except Exception as e:
+                line.write({'state': 'failed', 'error': str(e)})
+
+    def _set_invoice(self, invoice_id):
+        self.ensure_one()
+        if invoice_id:
+            self.write({'state': 'done', 'invoice_id': invoice_id, 'error': False})
+        else:
+            self.write({'state': 'skipped', 'invoice_id': False, 'error': _("Nothing to invoice for this period.")})
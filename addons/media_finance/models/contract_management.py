@@ -1,10 +1,20 @@
+from collections import defaultdict
+
+from markupsafe import Markup
+
 from odoo import models, fields, api, _
+from odoo.tools import SQL, float_compare, float_round
 from dateutil.relativedelta import relativedelta
 
+# Days before the end of a contract line at which the salesperson is reminded
+EXPIRY_REMINDER_DAYS = [5, 7, 15, 30]
+
+
 class SaleOrder(models.Model):
     _inherit = 'sale.order'
 
-    invoiced_months = fields.Char(string='Invoiced Months', help='Comma separated YYYY-MM of invoiced months')
+    invoiced_months = fields.Char(string='Invoiced Months', help='Comma separated YYYY-MM of months invoiced before billing runs were introduced')
+    billing_line_ids = fields.One2many('media.billing.run.line', 'order_id', string='Monthly Billing')
 
     def action_cancel(self):
         # Cancel draft invoices related to this sale order when contract is cancelled
@@ -18,59 +28,151 @@ class SaleOrder(models.Model):
                 draft_invoices.button_cancel()
         return res
 
-    def _cron_generate_monthly_invoices(self):
-        today = fields.Date.today()
-        current_month = today.strftime('%Y-%m')
-        
-        # Search for active rental contracts
-        orders = self.search([
-            ('state', '=', 'sale'),
-            ('order_line.start_date', '<=', today),
-            ('order_line.end_date', '>=', today),
-        ])
-        
-        for order in orders:
-            invoiced = (order.invoiced_months or '').split(',')
-            if current_month not in invoiced:
-                # Generate draft invoice for the current month
-                order._create_monthly_invoice(today)
-                
-                # Mark as invoiced
-                invoiced.append(current_month)
-                order.invoiced_months = ','.join(filter(None, invoiced))
+    def _cron_generate_monthly_invoices(self, auto_commit=False):
+        # Progress is tracked per order and per month by the billing runs
+        return self.env['media.billing.run']._run_monthly_billing(auto_commit=auto_commit)
 
     def _cron_contract_expiry_reminder(self):
-        today = fields.Date.today()
-        # Notify for contracts ending in 5, 7, 15, and 30 days
-        reminder_days = [5, 7, 15, 30]
-        for days in reminder_days:
-            expiry_date = today + relativedelta(days=days)
-            orders = self.search([
-                ('state', '=', 'sale'),
-                ('order_line.end_date', '=', expiry_date)
-            ])
-            for order in orders:
-                order._notify_contract_expiry(days)
+        """ Remind salespeople of the contract lines reaching a reminder threshold.
 
-    def _notify_contract_expiry(self, days):
+        Lines are fetched with a single range query and grouped per
+        salesperson and client, each group getting one digest activity. The
+        last threshold reminded is stored on the lines, so a line is reminded
+        once per threshold even if the cron is retried or skips a day.
+        """
+        today = fields.Date.today()
+        lines = self.env['sale.order.line'].search([
+            ('state', '=', 'sale'),
+            ('end_date', '>=', today),
+            ('end_date', '<=', today + relativedelta(days=max(EXPIRY_REMINDER_DAYS))),
+        ], order='end_date, id')
+
+        digests = defaultdict(lambda: self.env['sale.order.line'])
+        thresholds = defaultdict(lambda: self.env['sale.order.line'])
+        for line in lines:
+            days_left = (line.end_date - today).days
+            threshold = min(days for days in EXPIRY_REMINDER_DAYS if days >= days_left)
+            already_reminded = line.expiry_reminder_end_date == line.end_date and line.expiry_reminder_days <= threshold
+            if not already_reminded:
+                digests[line.order_id.user_id, line.order_id.partner_id] |= line
+                thresholds[threshold] |= line
+
+        for (user, partner), digest_lines in digests.items():
+            digest_lines.order_id[:1]._notify_contract_expiry(digest_lines, user, partner)
+        for threshold, reminded_lines in thresholds.items():
+            for end_date, same_end_lines in reminded_lines.grouped('end_date').items():
+                same_end_lines.write({'expiry_reminder_end_date': end_date, 'expiry_reminder_days': threshold})
+
+    def _notify_contract_expiry(self, lines, user, partner):
+        """ Schedule one activity on the order listing all the expiring ``lines`` of the client. """
         self.ensure_one()
-        # In a real system, send email or push notification
-        # For now, we'll log it or use the chatter
-        self.message_post(body=_("Contract for %s is expiring in %s days.") % (self.name, days))
+        today = fields.Date.today()
+        items = Markup().join(
+            Markup("<li>%s - %s: %s</li>") % (
+                line.order_id.name,
+                line.name,
+                _("expires on %(date)s (%(days)s days)", date=line.end_date, days=(line.end_date - today).days),
+            ) for line in lines
+        )
+        self.activity_schedule(
+            'mail.mail_activity_data_todo',
+            date_deadline=today,
+            summary=_("Contracts expiring soon: %s") % partner.display_name,
+            note=Markup("<ul>%s</ul>") % items,
+            user_id=(user or self.env.user).id,
+        )
 
     def _create_monthly_invoice(self, date):
         self.ensure_one()
-        # Simple logic to create a draft invoice for the current month
-        # In a real scenario, this would use the standard _create_invoices() 
-        # but with filtered lines or modified quantities for the period.
-        # For this prototype, we'll assume the full month is invoiced.
-        invoice = self._create_invoices(final=False)
-        invoice.invoice_date = date
-        return invoice
+        invoices = self._create_monthly_invoices(date)
+        return self.env['account.move'].browse(invoices.get(self.id))
+
+    def _create_monthly_invoices(self, date):
+        """ Invoice the month of ``date``, one invoice per order.
+
+        Dated lines are invoiced pro rata of the days they cover in the month,
+        see _get_period_quantities; the other lines follow the standard flow.
+
+        :return: dict {order id: invoice id}
+        """
+        period_start = date.replace(day=1)
+        period_end = period_start + relativedelta(months=1, days=-1)
+        quantities = self._get_period_quantities(period_start, period_end)
+        invoices = self.with_context(
+            media_billing_period=(period_start, period_end),
+            media_period_quantities=quantities,
+        )._create_invoices(grouped=True, final=False)
+        invoices.write({'invoice_date': date})
+        return {invoice.invoice_line_ids.sale_line_ids.order_id[:1].id: invoice.id for invoice in invoices}
+
+    def _get_period_quantities(self, period_start, period_end):
+        """ Quantity to invoice for each dated line of the orders over a month.
+
+        Lines are sold per month: a line covering the whole period gets 1 and
+        a partial one its covered days over the days of the month. The last
+        period of a line gets whatever is left of its ordered quantity, so the
+        contract total is matched exactly and no credit note is needed.
+
+        :return: dict {sale.order.line id: quantity}
+        """
+        if not self:
+            return {}
+        self.env['sale.order.line'].flush_model(['order_id', 'start_date', 'end_date'])
+        self.env.cr.execute(SQL("""
+            SELECT id,
+                   GREATEST(LEAST(end_date, %(period_end)s) - GREATEST(start_date, %(period_start)s) + 1, 0),
+                   end_date <= %(period_end)s
+              FROM sale_order_line
+             WHERE order_id = ANY(%(order_ids)s)
+               AND start_date <= %(period_end)s
+               AND end_date IS NOT NULL
+        """, period_start=period_start, period_end=period_end, order_ids=self.ids))
+        rows = self.env.cr.fetchall()
+
+        month_days = (period_end - period_start).days + 1
+        lines = self.env['sale.order.line'].browse(row[0] for row in rows)
+        quantities = {}
+        for line, (__, days, is_last) in zip(lines, rows):
+            remaining = line.product_uom_qty - line.qty_invoiced
+            quantity = remaining if is_last else min(float_round(days / month_days, precision_digits=2), remaining)
+            if float_compare(quantity, 0.0, precision_digits=2) > 0:
+                quantities[line.id] = quantity
+        return quantities
+
+    def _get_invoiceable_lines(self, final=False):
+        lines = super(SaleOrder, self)._get_invoiceable_lines(final)
+        quantities = self.env.context.get('media_period_quantities')
+        if quantities is None:
+            return lines
+        # Dated lines are only invoiced for the period they cover, even once
+        # their ordered quantity is exceeded (e.g. lines billed on impressions)
+        period_lines = self.order_line.filtered(lambda l: l.id in quantities)
+        return self.order_line & (lines.filtered(lambda l: not (l.start_date and l.end_date)) | period_lines)
+
+
+class SaleOrderLine(models.Model):
+    _inherit = 'sale.order.line'
+
+    expiry_reminder_end_date = fields.Date(string='Reminded End Date', readonly=True, copy=False)
+    expiry_reminder_days = fields.Integer(string='Last Expiry Reminder', readonly=True, copy=False,
+                                          help="Days before the end date of the last expiry reminder sent.")
+
+    def _prepare_invoice_line(self, **optional_values):
+        res = super(SaleOrderLine, self)._prepare_invoice_line(**optional_values)
+        quantities = self.env.context.get('media_period_quantities')
+        if quantities and self.id in quantities:
+            period_start, period_end = self.env.context['media_billing_period']
+            res.update({
+                'quantity': quantities[self.id],
+                'start_date': max(self.start_date, period_start),
+                'end_date': min(self.end_date, period_end),
+            })
+        return res
 
 class MediaSite(models.Model):
     _inherit = 'media.site'
 
+    invoice_line_ids = fields.One2many('account.move.line', 'media_site_id', string='Invoice Lines')
     pending_invoice_count = fields.Integer(compute='_compute_pending_invoices', store=True, group_operator="sum")
     unpaid_invoices_amount = fields.Float(compute='_compute_pending_invoices', string='Total Unpaid Amount', store=True, group_operator="sum")
     occupancy_rate = fields.Float(compute='_compute_occupancy_rate', string='Occupancy Rate (%)', store=True, group_operator="avg")
@@ -80,58 +182,46 @@ class MediaSite(models.Model):
         for site in self:
             site.occupancy_rate = (site.occupied_faces_count / site.total_faces_count * 100.0) if site.total_faces_count else 0.0
 
-    @api.depends('face_ids')
+    @api.depends('invoice_line_ids.move_id.payment_state', 'invoice_line_ids.move_id.state', 'invoice_line_ids.move_id.amount_residual')
     def _compute_pending_invoices(self):
+        """ Unpaid customer invoices with a line on the site's assets.
+
+        Only the sites of the invoices whose payment changed are marked for
+        recompute; they are then computed together with one grouped query.
+        """
+        self.env['account.move.line'].flush_model(['move_id', 'media_site_id'])
+        self.env['account.move'].flush_model(['move_type', 'state', 'payment_state', 'amount_residual'])
+        self.env.cr.execute(SQL("""
+            SELECT site_id, COUNT(*), SUM(amount_residual)
+              FROM (
+                    SELECT DISTINCT line.media_site_id AS site_id, move.id, move.amount_residual
+                      FROM account_move_line line
+                      JOIN account_move move ON move.id = line.move_id
+                     WHERE line.media_site_id = ANY(%(site_ids)s)
+                       AND move.move_type = 'out_invoice'
+                       AND move.state = 'posted'
+                       AND move.payment_state IN ('not_paid', 'partial')
+                   ) pending
+          GROUP BY site_id
+        """, site_ids=self._origin.ids))
+        pending = {site_id: (count, amount) for site_id, count, amount in self.env.cr.fetchall()}
         for site in self:
-            # Count unpaid invoices (posted and not paid) related to faces/canopies on this site
-            domain = [
-                ('move_id.move_type', '=', 'out_invoice'),
-                ('move_id.state', '=', 'posted'),
-                ('move_id.payment_state', 'in', ['not_paid', 'partial'])
-            ]
-            
-            asset_domain = [('media_face_id', 'in', site.face_ids.ids)]
-            if site.site_category == 'canopy':
-                canopy = self.env['media.canopy'].search([('site_id', '=', site.id)], limit=1)
-                if canopy:
-                    asset_domain = ['|'] + asset_domain + [('canopy_id', '=', canopy.id)]
-            elif site.site_category == 'digital':
-                screen = self.env['media.digital.screen'].search([('site_id', '=', site.id)], limit=1)
-                if screen:
-                    asset_domain = ['|'] + asset_domain + [('media_digital_screen_id', '=', screen.id)]
-            
-            invoice_lines = self.env['account.move.line'].search(domain + asset_domain)
-            invoices = invoice_lines.mapped('move_id')
-            site.pending_invoice_count = len(invoices)
-            site.unpaid_invoices_amount = sum(invoices.mapped('amount_residual'))
+            site.pending_invoice_count, site.unpaid_invoices_amount = pending.get(site._origin.id, (0, 0.0))
 
     def action_view_pending_invoices(self):
         self.ensure_one()
-        domain = [
-            ('move_id.move_type', '=', 'out_invoice'),
-            ('move_id.state', '=', 'posted'),
-            ('move_id.payment_state', 'in', ['not_paid', 'partial'])
-        ]
-        
-        asset_domain = [('media_face_id', 'in', self.face_ids.ids)]
-        if self.site_category == 'canopy':
-            canopy = self.env['media.canopy'].search([('site_id', '=', self.id)], limit=1)
-            if canopy:
-                asset_domain = ['|'] + asset_domain + [('canopy_id', '=', canopy.id)]
-        elif self.site_category == 'digital':
-            screen = self.env['media.digital.screen'].search([('site_id', '=', self.id)], limit=1)
-            if screen:
-                asset_domain = ['|'] + asset_domain + [('media_digital_screen_id', '=', screen.id)]
-
-        invoices = self.env['account.move.line'].search(domain + asset_domain).mapped('move_id')
-        
         return {
             'name': _('Pending Invoices'),
             'type': 'ir.actions.act_window',
             'res_model': 'account.move',
             'view_id': False,
             'view_mode': 'list,form',
-            'domain': [('id', 'in', invoices.ids)],
+            'domain': [
+                ('line_ids.media_site_id', '=', self.id),
+                ('move_type', '=', 'out_invoice'),
+                ('state', '=', 'posted'),
+                ('payment_state', 'in', ['not_paid', 'partial']),
+            ],
             'context': {'create': False},
         }
 
@@ -1,4 +1,5 @@
 from odoo import models, fields, api, _
+from odoo.fields import Domain
 from dateutil.relativedelta import relativedelta
 
 class MediaRental(models.Model):
@@ -59,37 +60,62 @@ class MediaRental(models.Model):
     # Availability Logic
     available_face_ids = fields.Many2many('media.face', compute='_compute_available_face_ids', string='Available Faces')
     
-    @api.depends('sale_order_id', 'sale_order_id.invoice_ids', 'sale_order_id.invoice_ids.payment_state')
+    @api.depends('sale_order_id', 'sale_order_id.invoice_ids', 'sale_order_id.invoice_ids.matched_payment_ids')
     def _compute_finance_counts(self):
+        payments = self._get_payments()
         for record in self:
-            invoices = record.sale_order_id.invoice_ids if record.sale_order_id else self.env['account.move']
-            record.invoice_count = len(invoices)
-            
-            # Simple payment count for Odoo Community: check for journal entries linked to these invoices
-            # In a full accounting setup, we'd check partial/reconciled moves.
-            payments = self.env['account.payment'].search([('move_id.ref', 'ilike', record.name)])
-            if record.sale_order_id:
-                payments |= self.env['account.payment'].search([('move_id.ref', 'ilike', record.sale_order_id.name)])
-            record.payment_count = len(payments)
+            record.invoice_count = len(record.sale_order_id.invoice_ids)
+            record.payment_count = len(payments[record])
+
+    def _get_payments(self):
+        """ Payments of the rentals: the ones matched with the invoices of
+        their sale order, and the legacy ones only matched on their reference.
+
+        :return: dict {rental: account.payment}
+        """
+        Payment = self.env['account.payment']
+        legacy = self._get_legacy_payments()
+        return {
+            record: record.sale_order_id.invoice_ids.matched_payment_ids | legacy.get(record, Payment)
+            for record in self
+        }
+
+    def _get_legacy_payments(self):
+        """ Payments not linked to any invoice whose entry reference contains
+        the rental or sale order number, as recorded before payments were
+        matched with invoices. Served by the trigram index of ``account.move.ref``.
+
+        :return: dict {rental: account.payment}
+        """
+        names = {
+            record: [name for name in (record.name, record.sale_order_id.name) if name and name != _('New')]
+            for record in self
+        }
+        all_names = {name for record_names in names.values() for name in record_names}
+        if not all_names:
+            return {}
+        payments = self.env['account.payment'].search(
+            Domain('invoice_ids', '=', False)
+            & Domain.OR(Domain('move_id.ref', 'ilike', name) for name in all_names)
+        )
+        refs = [(payment, (payment.move_id.ref or '').lower()) for payment in payments]
+        return {
+            record: self.env['account.payment'].union(*(
+                payment for payment, ref in refs
+                if any(name.lower() in ref for name in record_names)
+            ))
+            for record, record_names in names.items()
+        }
 
     @api.depends('start_date', 'end_date')
     def _compute_available_face_ids(self):
+        # Rentals sharing the same period share the same availability query
+        available = {}
         for record in self:
-            if not record.start_date or not record.end_date:
-                record.available_face_ids = self.env['media.face'].search([]).ids
-                continue
-                
-            # Find all booked faces for this period (excluding this rental itself if active)
-            booked_lines = self.env['sale.order.line'].search([
-                ('media_face_id', '!=', False),
-                ('state', 'in', ['sale', 'done']),
-                ('start_date', '<=', record.end_date),
-                ('end_date', '>=', record.start_date),
-            ])
-            booked_face_ids = booked_lines.mapped('media_face_id').ids
-            
-            # All faces minus booked ones
-            record.available_face_ids = self.env['media.face'].search([('id', 'not in', booked_face_ids)]).ids
+            period = (record.start_date, record.end_date)
+            if period not in available:
+                available[period] = self.env['media.face']._search_available(*period)
+            record.available_face_ids = available[period]
 
     def action_view_sale_order(self):
         self.ensure_one()
@@ -115,15 +141,12 @@ class MediaRental(models.Model):
 
     def action_view_payments(self):
         self.ensure_one()
-        payments = self.env['account.payment'].search([('move_id.ref', 'ilike', self.name)])
-        if self.sale_order_id:
-            payments |= self.env['account.payment'].search([('move_id.ref', 'ilike', self.sale_order_id.name)])
         return {
             'name': _('Payments'),
             'type': 'ir.actions.act_window',
             'res_model': 'account.payment',
             'view_mode': 'list,form',
-            'domain': [('id', 'in', payments.ids)],
+            'domain': [('id', 'in', self._get_payments()[self].ids)],
             'target': 'current',
         }
 
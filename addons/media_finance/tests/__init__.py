@@ -1 +1,4 @@
 from . import test_transfer_booking_vacate
+from . import test_billing_run
+from . import test_contract_expiry
+from . import test_rental_payments
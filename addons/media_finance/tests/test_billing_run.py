@@ -0,0 +1,147 @@
+from datetime import date
+
+from odoo.tests.common import TransactionCase
+from odoo import fields
+from dateutil.relativedelta import relativedelta
+
+from odoo.addons.media_finance.models.billing_run import BILLING_SHARDS
+
+
+class TestBillingRun(TransactionCase):
+
+    def setUp(self):
+        super(TestBillingRun, self).setUp()
+        self.BillingRun = self.env['media.billing.run']
+        self.partner = self.env['res.partner'].create({'name': 'Test Client'})
+        self.site = self.env['media.site'].create({'name': 'Test Site', 'code': 'TS'})
+        self.face = self.env['media.face'].create({
+            'name': 'Face A',
+            'site_id': self.site.id,
+            'face_type': 'inbound',
+            'price_per_month': 1000,
+        })
+        today = fields.Date.today()
+        self.order = self.env['sale.order'].create({
+            'partner_id': self.partner.id,
+            'order_line': [(0, 0, {
+                'product_id': self.face.product_id.id,
+                'media_face_id': self.face.id,
+                'start_date': today,
+                'end_date': today + relativedelta(days=60),
+                'price_unit': 1000,
+            })]
+        })
+        self.order.action_confirm()
+
+    def test_run_is_resumable(self):
+        """ Re-running the billing for a period never bills an order twice """
+        today = fields.Date.today()
+        run = self.BillingRun._run_monthly_billing(today)
+        self.assertEqual(run.period_start, today.replace(day=1))
+        self.assertEqual(run.state, 'done')
+        self.assertEqual(run.line_ids.order_id, self.order)
+        self.assertNotIn('pending', run.line_ids.mapped('state'))
+        self.assertEqual(run.line_ids.shard, self.partner.id % BILLING_SHARDS)
+
+        invoices = run.line_ids.invoice_id
+        self.assertEqual(self.BillingRun._run_monthly_billing(today), run)
+        self.assertEqual(len(run.line_ids), 1)
+        self.assertEqual(run.line_ids.invoice_id, invoices)
+
+    def test_legacy_invoiced_month(self):
+        """ Months recorded in invoiced_months are not billed again """
+        today = fields.Date.today()
+        self.order.invoiced_months = today.strftime('%Y-%m')
+        run = self.BillingRun._run_monthly_billing(today)
+        self.assertEqual(run.line_ids.state, 'done')
+        self.assertFalse(run.line_ids.invoice_id)
+
+    def test_pro_rated_periods(self):
+        """ Partial months are invoiced pro rata, the last one gets the remainder """
+        order = self.env['sale.order'].create({
+            'partner_id': self.partner.id,
+            'order_line': [(0, 0, {
+                'product_id': self.face.product_id.id,
+                'media_face_id': self.face.id,
+                'start_date': date(2026, 1, 15),
+                'end_date': date(2026, 3, 14),
+                'product_uom_qty': 2.0,
+                'price_unit': 1000,
+            })]
+        })
+        order.action_confirm()
+        line = order.order_line
+
+        quantities = []
+        for month in (1, 2, 3):
+            invoice_id = order._create_monthly_invoices(date(2026, month, 1))[order.id]
+            invoice_line = self.env['account.move'].browse(invoice_id).invoice_line_ids
+            quantities.append(invoice_line.quantity)
+        self.assertEqual(quantities, [0.55, 1.0, 0.45])
+        self.assertEqual(line.qty_invoiced, 2.0)
+        self.assertEqual(invoice_line.start_date, date(2026, 3, 1))
+
+    def test_nothing_to_invoice_is_skipped(self):
+        """ Orders left without an invoice by the run are not reported as invoiced """
+        today = fields.Date.today()
+        self.order._create_invoices()
+        other_face = self.env['media.face'].create({
+            'name': 'Face B',
+            'site_id': self.site.id,
+            'face_type': 'outbound',
+            'price_per_month': 1000,
+        })
+        other_order = self.env['sale.order'].create({
+            'partner_id': self.partner.id,
+            'order_line': [(0, 0, {
+                'product_id': other_face.product_id.id,
+                'media_face_id': other_face.id,
+                'start_date': today,
+                'end_date': today + relativedelta(days=60),
+                'price_unit': 1000,
+            })]
+        })
+        other_order.action_confirm()
+
+        run = self.BillingRun._run_monthly_billing(today)
+        skipped_line = run.line_ids.filtered(lambda l: l.order_id == self.order)
+        self.assertEqual(skipped_line.state, 'skipped')
+        self.assertFalse(skipped_line.invoice_id)
+        self.assertTrue(skipped_line.error)
+        self.assertEqual(run.skipped_count, 1)
+        self.assertEqual((run.line_ids - skipped_line).state, 'done')
+        self.assertTrue((run.line_ids - skipped_line).invoice_id)
+
+    def test_chunk_with_nothing_to_invoice(self):
+        """ A chunk made only of orders with nothing to invoice is skipped, not failed """
+        today = fields.Date.today()
+        self.order._create_invoices()
+        run = self.BillingRun._run_monthly_billing(today)
+        self.assertEqual(run.line_ids.state, 'skipped')
+        self.assertFalse(run.line_ids.invoice_id)
+        self.assertEqual(run.skipped_count, 1)
+        self.assertFalse(run.failed_count)
+        self.assertEqual(run.state, 'done')
+
+    def test_resumed_run_bills_its_own_month(self):
+        """ A run of a past month left unfinished is billed for that month """
+        today = fields.Date.today()
+        last_month = today.replace(day=1) - relativedelta(months=1)
+        self.order.order_line.start_date = last_month
+        run = self.BillingRun.create({'period_start': last_month})
+        run._add_eligible_orders(last_month)
+
+        self.BillingRun._run_monthly_billing(today)
+        self.assertEqual(run.state, 'done')
+        invoice = run.line_ids.invoice_id
+        self.assertEqual(invoice.invoice_date, last_month + relativedelta(months=1, days=-1))
+        self.assertEqual(invoice.invoice_line_ids.start_date, last_month)
+
+    def test_reopened_run_is_timed_again(self):
+        """ Reopening a finished run restarts its timing """
+        today = fields.Date.today()
+        run = self.BillingRun._run_monthly_billing(today)
+        run.date_start = fields.Datetime.now() - relativedelta(days=3)
+        run.action_retry_failed()
+        self.assertEqual(run.state, 'done')
+        self.assertLess(run.duration, 3600)
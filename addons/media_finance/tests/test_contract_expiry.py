@@ -0,0 +1,53 @@
+from odoo.tests.common import TransactionCase
+from odoo import fields
+from dateutil.relativedelta import relativedelta
+
+
+class TestContractExpiry(TransactionCase):
+
+    def setUp(self):
+        super(TestContractExpiry, self).setUp()
+        self.partner = self.env['res.partner'].create({'name': 'Test Client'})
+        self.site = self.env['media.site'].create({'name': 'Test Site', 'code': 'TS'})
+        self.orders = self.env['sale.order']
+        for face_type in ('inbound', 'outbound'):
+            face = self.env['media.face'].create({
+                'name': 'Face %s' % face_type,
+                'site_id': self.site.id,
+                'face_type': face_type,
+                'price_per_month': 1000,
+            })
+            self.orders |= self.env['sale.order'].create({
+                'partner_id': self.partner.id,
+                'order_line': [(0, 0, {
+                    'product_id': face.product_id.id,
+                    'media_face_id': face.id,
+                    'start_date': fields.Date.today() - relativedelta(months=1),
+                    'end_date': fields.Date.today() + relativedelta(days=7),
+                    'price_unit': 1000,
+                })]
+            })
+        self.orders.action_confirm()
+
+    def _get_activities(self):
+        return self.env['mail.activity'].search([('res_model', '=', 'sale.order'), ('res_id', 'in', self.orders.ids)])
+
+    def test_digest_sent_once(self):
+        """ One digest per salesperson and client, not repeated when the cron runs again """
+        self.env['sale.order']._cron_contract_expiry_reminder()
+        activity = self._get_activities()
+        self.assertEqual(len(activity), 1)
+        for order in self.orders:
+            self.assertIn(order.name, activity.note)
+        self.assertEqual(self.orders.order_line.mapped('expiry_reminder_days'), [7, 7])
+
+        self.env['sale.order']._cron_contract_expiry_reminder()
+        self.assertEqual(len(self._get_activities()), 1)
+
+    def test_extended_contract_reminded_again(self):
+        """ Extending the contract re-arms the reminders """
+        self.env['sale.order']._cron_contract_expiry_reminder()
+        self.orders.order_line.end_date = fields.Date.today() + relativedelta(days=25)
+        self.env['sale.order']._cron_contract_expiry_reminder()
+        self.assertEqual(len(self._get_activities()), 2)
+        self.assertEqual(self.orders.order_line.mapped('expiry_reminder_days'), [30, 30])
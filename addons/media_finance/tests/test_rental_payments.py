@@ -0,0 +1,59 @@
+from odoo.tests.common import TransactionCase
+from odoo import fields
+from dateutil.relativedelta import relativedelta
+
+
+class TestRentalPayments(TransactionCase):
+
+    def setUp(self):
+        super(TestRentalPayments, self).setUp()
+        self.partner = self.env['res.partner'].create({'name': 'Test Client'})
+        self.site = self.env['media.site'].create({'name': 'Test Site', 'code': 'TS'})
+        self.face = self.env['media.face'].create({
+            'name': 'Face A',
+            'site_id': self.site.id,
+            'face_type': 'inbound',
+            'price_per_month': 1000,
+        })
+        today = fields.Date.today()
+        self.rental = self.env['media.rental'].create({
+            'partner_id': self.partner.id,
+            'start_date': today,
+            'end_date': today + relativedelta(months=1),
+            'rental_line_ids': [(0, 0, {'face_id': self.face.id, 'price_unit': 1000})],
+        })
+        self.rental.action_confirm()
+        self.order = self.rental.sale_order_id
+        self.order.action_confirm()
+
+    def _pay(self, invoice):
+        return self.env['account.payment.register'].with_context(
+            active_model='account.move', active_ids=invoice.ids,
+        ).create({})._create_payments()
+
+    def test_payment_linked_to_invoices(self):
+        """ Payments are linked to the contract of the invoices they pay, whatever their reference """
+        invoice = self.order._create_invoices()
+        invoice.action_post()
+        self.assertEqual(self.rental.payment_count, 0)
+
+        payment = self._pay(invoice)
+        self.assertEqual(payment.media_order_ids, self.order)
+        self.rental.invalidate_recordset(['payment_count'])
+        self.assertEqual(self.rental.payment_count, 1)
+        self.assertEqual(self.rental.action_view_payments()['domain'], [('id', 'in', payment.ids)])
+
+    def test_payment_without_entry(self):
+        """ Payments matched with an invoice count even without a journal entry """
+        invoice = self.order._create_invoices()
+        invoice.action_post()
+        payment = self.env['account.payment'].create({
+            'partner_id': self.partner.id,
+            'payment_type': 'inbound',
+            'partner_type': 'customer',
+            'amount': invoice.amount_total,
+            'invoice_ids': [fields.Command.set(invoice.ids)],
+        })
+        self.assertFalse(payment.move_id)
+        self.assertEqual(payment.media_order_ids, self.order)
+        self.assertEqual(self.rental.payment_count, 1)
@@ -15,19 +15,8 @@ class MediaRentalWizard(models.TransientModel):
     @api.depends('start_date', 'end_date')
     def _compute_available_faces_domain(self):
         for wizard in self:
-            if not wizard.start_date or not wizard.end_date:
-                wizard.available_faces_domain = self.env['media.face'].search([])
-                continue
-            
-            # Use the same logic as in media.rental to find available faces
-            booked_lines = self.env['sale.order.line'].search([
-                ('media_face_id', '!=', False),
-                ('state', 'in', ['sale', 'done']),
-                ('start_date', '<=', wizard.end_date),
-                ('end_date', '>=', wizard.start_date),
-            ])
-            booked_face_ids = booked_lines.mapped('media_face_id').ids
-            wizard.available_faces_domain = self.env['media.face'].search([('id', 'not in', booked_face_ids)])
+            # Use the same availability service as media.rental
+            wizard.available_faces_domain = self.env['media.face']._search_available(wizard.start_date, wizard.end_date)
 
     def action_add_billboards(self):
         self.ensure_one()
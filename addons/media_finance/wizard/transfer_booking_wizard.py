@@ -125,16 +125,12 @@ class MediaBookingTransfer(models.TransientModel):
 
     def _check_target_availability(self, target_face, start_date, end_date, exclude_line=None):
         """Raise ValidationError if target_face already has a confirmed booking overlapping the period."""
-        domain = [
-            ('media_face_id', '=', target_face.id),
-            ('state', 'in', ['sale', 'done']),
-            ('start_date', '<=', end_date),
-            ('end_date', '>=', start_date),
-        ]
-        if exclude_line:
-            domain += [('id', '!=', exclude_line.id)]
-        count = self.env['sale.order.line'].search_count(domain)
-        if count:
+        overlapping = self.env['media.face.booking']._get_overlapping(
+            target_face.ids, start_date, end_date,
+            booking_types=('sale',), exclude_sale_line_ids=exclude_line.ids if exclude_line else (),
+            include_transferred=True,
+        )
+        if overlapping:
             raise ValidationError(_(
                 "The face '%s' already has a confirmed booking for the period %s → %s."
             ) % (target_face.display_name, start_date, end_date))
@@ -244,25 +240,19 @@ class MediaBookingTransfer(models.TransientModel):
 
         # 1. 'Free up' the source face by adding overlapping bookings to its exclusion lists.
         #    This handles both Sale Order bookings and manual Artwork History bookings.
-        overlapping_sols = self.env['sale.order.line'].search([
-            ('media_face_id', '=', source_face.id),
-            ('state', 'in', ['sale', 'done']),
-            ('start_date', '<=', self.end_date),
-            ('end_date', '>=', self.start_date),
-        ])
-        if overlapping_sols:
+        overlapping = self.env['media.face.booking']._get_overlapping(
+            source_face.ids, self.start_date, self.end_date, include_transferred=True,
+        )
+        overlapping_sol_ids = [row['sale_line_id'] for row in overlapping if row['sale_line_id']]
+        if overlapping_sol_ids:
             source_face.sudo().write({
-                'transferred_out_sol_ids': [(4, sol.id) for sol in overlapping_sols]
+                'transferred_out_sol_ids': [(4, sol_id) for sol_id in overlapping_sol_ids]
             })
 
-        overlapping_history = self.env['media.artwork.history'].search([
-            ('face_id', '=', source_face.id),
-            ('lease_start_date', '<=', self.end_date),
-            ('lease_end_date', '>=', self.start_date),
-        ])
-        if overlapping_history:
+        overlapping_history_ids = [row['history_id'] for row in overlapping if row['history_id']]
+        if overlapping_history_ids:
             source_face.sudo().write({
-                'transferred_out_history_ids': [(4, hist.id) for hist in overlapping_history]
+                'transferred_out_history_ids': [(4, hist_id) for hist_id in overlapping_history_ids]
             })
 
         # 2. Create an artwork history record as a face-to-face booking commitment log.
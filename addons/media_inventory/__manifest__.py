@@ -1,6 +1,6 @@
 {
     'name': 'Media Inventory',
-    'version': '1.1',
+    'version': '1.2',
     'category': 'Sales',
     'summary': 'Manage Billboard/Canopy Sites and Faces for OOH Media',
     'description': """
@@ -41,6 +41,7 @@
             'media_inventory/static/src/xml/map_templates.xml',
         ],
     },
+    'uninstall_hook': 'uninstall_hook',
     'installable': True,
     'application': True,
 }
@@ -0,0 +1,8 @@
+def uninstall_hook(env):
+    """ Drop the booking calendar triggers, which outlive the media_face_booking table. """
+    env.cr.execute("""
+        DROP FUNCTION IF EXISTS media_face_booking_sync_sale_line() CASCADE;
+        DROP FUNCTION IF EXISTS media_face_booking_sync_history() CASCADE;
+        DROP FUNCTION IF EXISTS media_face_booking_sync_sol_transfer() CASCADE;
+        DROP FUNCTION IF EXISTS media_face_booking_sync_history_transfer() CASCADE;
+    """)
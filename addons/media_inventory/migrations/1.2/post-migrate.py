@@ -0,0 +1,8 @@
+from odoo import api, SUPERUSER_ID
+
+
+def migrate(cr, version):
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    # Artwork files are now shared media.artwork records
+    env['media.artwork']._adopt_attachments('media.artwork.history', 'artwork_file')
+    env['media.artwork']._adopt_attachments('sale.order.line', 'artwork_file')
@@ -1,3 +1,5 @@
+from . import report_image
+from . import artwork
 from . import site
 from . import face
 from . import product
@@ -7,3 +9,5 @@ from . import media_expense
 from . import artwork_history
 
 from . import digital_screen
+from . import face_booking
+from . import rollover
@@ -0,0 +1,181 @@
+import base64
+import hashlib
+from collections import defaultdict
+from datetime import timedelta
+
+from odoo import models, fields, api
+from odoo.tools import SQL
+
+
+class MediaArtwork(models.Model):
+    """ Artwork files, stored once per content and shared by every history
+    row, contract line and invoice line showing them.
+    """
+    _name = 'media.artwork'
+    _description = 'Artwork File'
+    _rec_name = 'checksum'
+
+    checksum = fields.Char(string='Checksum', required=True, readonly=True, index=True,
+                           help="SHA-1 of the uploaded file.")
+    image = fields.Image(string='Artwork', max_width=1920, max_height=1920, readonly=True)
+
+    _checksum_uniq = models.Constraint('UNIQUE(checksum)', "This artwork is already stored.")
+
+    @api.model
+    def _get_checksum(self, data):
+        return hashlib.sha1(base64.b64decode(data)).hexdigest()
+
+    @api.model
+    def _get_artworks(self, datas):
+        """ Artwork of each base64 file of ``datas``, creating the new ones.
+
+        :return: dict {data: media.artwork id}
+        """
+        checksums = {data: self._get_checksum(data) for data in set(filter(None, datas))}
+        if not checksums:
+            return {}
+        artworks = self._fetch_by_checksum(checksums.values())
+        missing = {checksum: data for data, checksum in checksums.items() if checksum not in artworks}
+        if missing:
+            artworks.update(self._insert_checksums(missing))
+        return {data: artworks[checksum] for data, checksum in checksums.items()}
+
+    @api.model
+    def _insert_checksums(self, datas):
+        """ Store the artworks of ``datas`` ({checksum: base64 file}) that do
+        not exist yet.
+
+        The rows are inserted with ON CONFLICT DO NOTHING: an artwork uploaded
+        at the same time by another transaction makes the insert wait for it,
+        then fail as a serialization failure if it committed, so the request is
+        retried and finds its row, instead of aborting on the unique violation.
+
+        :return: dict {checksum: media.artwork id}
+        """
+        self.flush_model()
+        self.env.cr.execute(SQL("""
+            INSERT INTO media_artwork (checksum, create_uid, create_date, write_uid, write_date)
+                 SELECT checksum, %(uid)s, NOW() AT TIME ZONE 'UTC', %(uid)s, NOW() AT TIME ZONE 'UTC'
+                   FROM unnest(%(checksums)s::varchar[]) AS checksum
+            ON CONFLICT (checksum) DO NOTHING
+              RETURNING checksum, id
+        """, uid=self.env.uid, checksums=list(datas)))
+        created = dict(self.env.cr.fetchall())
+        for artwork in self.sudo().browse(created.values()):
+            artwork.image = datas[artwork.checksum]
+        conflicting = datas.keys() - created.keys()
+        if conflicting:
+            # Rows already visible to this transaction
+            created.update(self._fetch_by_checksum(conflicting))
+        return created
+
+    @api.model
+    def _fetch_by_checksum(self, checksums):
+        return {
+            artwork.checksum: artwork.id
+            for artwork in self.sudo().search([('checksum', 'in', list(checksums))])
+        }
+
+    @api.autovacuum
+    def _gc_orphan_artworks(self):
+        """ Remove the artworks no longer used by any record. Recent ones are
+        kept, as they may be about to be linked by a running transaction.
+        """
+        references = SQL(" AND ").join(
+            SQL("NOT EXISTS (SELECT 1 FROM %s t WHERE t.artwork_id = a.id)", SQL.identifier(self.env[model_name]._table))
+            for model_name in self.env.registry.descendants(['media.artwork.mixin'], '_inherit')
+            if not self.env[model_name]._abstract
+        )
+        self.env.cr.execute(SQL("""
+            SELECT a.id
+              FROM media_artwork a
+             WHERE a.write_date < %(limit_date)s
+               AND %(references)s
+        """, limit_date=fields.Datetime.now() - timedelta(days=1), references=references))
+        orphans = self.browse(row[0] for row in self.env.cr.fetchall())
+        orphans.sudo().unlink()
+
+    @api.model
+    def _adopt_attachments(self, model_name, fname):
+        """ Move the files of the former binary field ``fname`` of ``model_name``
+        to shared artworks and link the records to them. The first attachment of
+        each content becomes the artwork image, the duplicates are removed.
+        """
+        Model = self.env[model_name]
+        self.env.cr.execute(SQL("""
+            SELECT id, res_id, checksum
+              FROM ir_attachment
+             WHERE res_model = %s AND res_field = %s AND res_id IS NOT NULL
+          ORDER BY id
+        """, model_name, fname))
+        attachments_by_checksum = defaultdict(list)
+        for attachment_id, res_id, checksum in self.env.cr.fetchall():
+            attachments_by_checksum[checksum].append((attachment_id, res_id))
+        if not attachments_by_checksum:
+            return
+
+        existing = self._fetch_by_checksum(attachments_by_checksum)
+        new_checksums = [checksum for checksum in attachments_by_checksum if checksum not in existing]
+        created = self.sudo().create([{'checksum': checksum} for checksum in new_checksums])
+        artworks = {**existing, **dict(zip(new_checksums, created.ids))}
+
+        duplicate_ids = []
+        for checksum, attachments in attachments_by_checksum.items():
+            artwork_id = artworks[checksum]
+            kept_id = None
+            if checksum not in existing:
+                kept_id = attachments[0][0]
+                self.env.cr.execute(SQL("""
+                    UPDATE ir_attachment
+                       SET res_model = %s, res_field = 'image', res_id = %s
+                     WHERE id = %s
+                """, self._name, artwork_id, kept_id))
+            duplicate_ids.extend(attachment_id for attachment_id, __ in attachments if attachment_id != kept_id)
+            self.env.cr.execute(SQL(
+                "UPDATE %s SET artwork_id = %s WHERE id = ANY(%s)",
+                SQL.identifier(Model._table), artwork_id, [res_id for __, res_id in attachments],
+            ))
+        self.env['ir.attachment'].sudo().browse(duplicate_ids).unlink()
+        self.env.invalidate_all()
+
+
+class MediaArtworkMixin(models.AbstractModel):
+    """ ``artwork_file`` backed by a shared media.artwork: writing a file
+    links the record to the artwork with the same content, and copying the
+    artwork to another record only copies ``artwork_id``.
+    """
+    _name = 'media.artwork.mixin'
+    _description = 'Shared Artwork Mixin'
+
+    artwork_id = fields.Many2one('media.artwork', string='Artwork File', index='btree_not_null', ondelete='restrict')
+    artwork_file = fields.Image(string='Artwork', compute='_compute_artwork_file', inverse='_inverse_artwork_file')
+
+    @api.depends('artwork_id')
+    def _compute_artwork_file(self):
+        for record in self:
+            record.artwork_file = record.artwork_id.image
+
+    def _inverse_artwork_file(self):
+        artworks = self.env['media.artwork']._get_artworks(self.mapped('artwork_file'))
+        for record in self:
+            record.artwork_id = artworks.get(record.artwork_file, False)
+
+    @api.model
+    def _vals_with_artwork(self, vals_list):
+        """ Copy of ``vals_list`` with the ``artwork_file`` values resolved to
+        ``artwork_id``, so the artwork is set when the records are inserted.
+        """
+        artworks = self.env['media.artwork']._get_artworks(
+            [vals['artwork_file'] for vals in vals_list if vals.get('artwork_file')])
+        vals_list = [dict(vals) for vals in vals_list]
+        for vals in vals_list:
+            if 'artwork_file' in vals:
+                vals['artwork_id'] = artworks.get(vals.pop('artwork_file'), False)
+        return vals_list
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        return super(MediaArtworkMixin, self).create(self._vals_with_artwork(vals_list))
+
+    def write(self, vals):
+        return super(MediaArtworkMixin, self).write(self._vals_with_artwork([vals])[0])
@@ -1,10 +1,13 @@
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError
+from odoo.tools import SQL
 
 class MediaArtworkHistory(models.Model):
     _name = 'media.artwork.history'
     _description = 'Artwork History'
+    _inherit = ['media.artwork.mixin', 'media.report.image.mixin']
     _order = 'upload_date desc'
+    _report_image_fields = ['measurement_image']
 
     face_id = fields.Many2one('media.face', string='Face', required=False, ondelete='cascade')
     site_id = fields.Many2one('media.site', string='Site', store=True)
@@ -83,76 +86,97 @@ class MediaArtworkHistory(models.Model):
         if self.env.context.get('skip_baseline_archiving'):
             return super(MediaArtworkHistory, self).create(vals_list)
 
-        # Pre-process vals to ensure face_id and partner_id are set where possible
+        # Canopy sites without face: use the face of the site, found for the whole batch at once
+        faceless_site_ids = {vals['site_id'] for vals in vals_list if vals.get('site_id') and not vals.get('face_id')}
+        canopy_site_ids = set(self.env['media.site'].browse(faceless_site_ids).filtered(
+            lambda site: site.site_category == 'canopy').ids)
+        site_faces = {
+            site.id: face_id
+            for site, face_id in self.env['media.face']._read_group(
+                [('site_id', 'in', list(canopy_site_ids))], ['site_id'], ['id:min'])
+        }
+
         for vals in vals_list:
-            if vals.get('site_id') and not vals.get('face_id'):
-                site = self.env['media.site'].browse(vals['site_id'])
-                if site.site_category == 'canopy':
-                    faces = self.env['media.face'].search([('site_id', '=', site.id)], limit=1)
-                    if faces:
-                        vals['face_id'] = faces[0].id
-            
+            if vals.get('site_id') and not vals.get('face_id') and vals['site_id'] in site_faces:
+                vals['face_id'] = site_faces[vals['site_id']]
+
             # Ensure partner_id is set from sale_order_line_id if not explicitly provided
             if vals.get('sale_order_line_id') and not vals.get('partner_id'):
                 sol = self.env['sale.order.line'].browse(vals['sale_order_line_id'])
                 vals['partner_id'] = sol.order_id.partner_id.id
-            
-            # Link to previous history record
-            face_id = vals.get('face_id')
-            site_id = vals.get('site_id')
-            if face_id:
-                prev = self.search([('face_id', '=', face_id)], order='upload_date desc', limit=1)
-                if prev:
-                    vals['previous_history_id'] = prev.id
-            elif site_id:
-                prev = self.search([('site_id', '=', site_id), ('face_id', '=', False)], order='upload_date desc', limit=1)
-                if prev:
-                    vals['previous_history_id'] = prev.id
+
+        # Link to the previous history record of the face, or of the site when there is no face
+        previous_by_face, previous_by_site = self._get_latest_history(
+            {vals['face_id'] for vals in vals_list if vals.get('face_id')},
+            {vals['site_id'] for vals in vals_list if vals.get('site_id') and not vals.get('face_id')},
+        )
+        for vals in vals_list:
+            if vals.get('face_id'):
+                previous_id = previous_by_face.get(vals['face_id'])
+            elif vals.get('site_id'):
+                previous_id = previous_by_site.get(vals['site_id'])
+            else:
+                previous_id = None
+            if previous_id:
+                vals['previous_history_id'] = previous_id
 
         # Baseline check for canopies: if this is the first history record, archive current canopy image
         baseline_vals_list = []
-        checked_sites = set()
-        
+        site_categories = {}
         for vals in vals_list:
-            site_id = vals.get('site_id')
-            if not site_id or site_id in checked_sites:
-                continue
-            
-            site_category = vals.get('site_category')
-            if not site_category:
-                site_category = self.env['media.site'].browse(site_id).site_category
+            if vals.get('site_id'):
+                site_categories.setdefault(vals['site_id'], vals.get('site_category'))
+        sites = self.env['media.site'].browse(site_id for site_id, category in site_categories.items() if not category)
+        site_categories.update((site.id, site.site_category) for site in sites)
+        canopy_site_ids = [site_id for site_id, category in site_categories.items() if category == 'canopy']
 
-            if site_category == 'canopy':
-                checked_sites.add(site_id)
-                history_count = self.search_count([
-                    ('site_id', '=', site_id),
-                    ('site_category', '=', 'canopy')
-                ])
-                if history_count == 0:
-                    canopy = self.env['media.canopy'].search([('site_id', '=', site_id)], limit=1)
-                    if canopy and (canopy.canopy_image or canopy.measurement_image_1):
-                        partner_id = vals.get('partner_id')
-                        if not partner_id:
-                             # Fallback logic for partner
-                             last_sol = self.env['sale.order.line'].search([
-                                ('media_face_id', 'in', canopy.face_ids.ids)
-                             ], order='create_date desc', limit=1)
-                             partner_id = last_sol.order_id.partner_id.id if last_sol else self.env.user.partner_id.id
+        if canopy_site_ids:
+            documented_site_ids = {
+                site.id for [site] in self._read_group(
+                    [('site_id', 'in', canopy_site_ids), ('site_category', '=', 'canopy')], ['site_id'])
+            }
+            canopies = self.env['media.canopy'].search([('site_id', 'in', canopy_site_ids)])
+            canopy_by_site = {}
+            for canopy in canopies:
+                canopy_by_site.setdefault(canopy.site_id.id, canopy)
+            first_vals_by_site = {}
+            for vals in vals_list:
+                first_vals_by_site.setdefault(vals.get('site_id'), vals)
+
+            for site_id in canopy_site_ids:
+                canopy = canopy_by_site.get(site_id)
+                if site_id in documented_site_ids or not canopy or not canopy.canopy_image:
+                    continue
+                partner_id = first_vals_by_site[site_id].get('partner_id')
+                if not partner_id:
+                     # Fallback logic for partner
+                     last_sol = self.env['sale.order.line'].search([
+                        ('media_face_id', 'in', canopy.face_ids.ids)
+                     ], order='create_date desc', limit=1)
+                     partner_id = last_sol.order_id.partner_id.id if last_sol else self.env.user.partner_id.id
+
+                baseline_vals_list.append({
+                    'site_id': canopy.site_id.id,
+                    'site_category': 'canopy',
+                    'artwork_file': canopy.canopy_image,
+                    'measurement_image': canopy.measurement_image_1,
+                    'partner_id': partner_id,
+                    'description': _('Baseline images before first recorded renovation'),
+                    'renovation_date': canopy.allocated_date or fields.Date.today(),
+                })
 
-                        baseline_vals_list.append({
-                            'site_id': canopy.site_id.id,
-                            'site_category': 'canopy',
-                            'artwork_file': canopy.canopy_image,
-                            'measurement_image': canopy.measurement_image_1,
-                            'partner_id': partner_id,
-                            'description': _('Baseline images before first recorded renovation'),
-                            'renovation_date': canopy.allocated_date or fields.Date.today(),
-                        })
-        
         if baseline_vals_list:
             self.with_context(skip_baseline_archiving=True, skip_face_sync=True).create(baseline_vals_list)
 
         records = super(MediaArtworkHistory, self).create(vals_list)
+
+        # Chain the records of a same face or site created together
+        last_in_batch = {}
+        for record in records:
+            key = record.face_id or record.site_id
+            if key and key in last_in_batch:
+                record.previous_history_id = last_in_batch[key]
+            last_in_batch[key] = record
         
         # Force recompute of occupancy status on linked faces using Odoo's trigger
         for face in records.mapped('face_id'):
@@ -193,6 +217,34 @@ class MediaArtworkHistory(models.Model):
                             screen.with_context(skip_history_creation=True).write({'image_1': record.artwork_file})
         return records
 
+    @api.model
+    def _get_latest_history(self, face_ids, site_ids):
+        """ Latest history record of each face, and of each site for its
+        records without face, using one DISTINCT ON query each.
+
+        :return: tuple of dicts ({face id: history id}, {site id: history id})
+        """
+        self.flush_model(['face_id', 'site_id', 'upload_date'])
+        latest_by_face = {}
+        if face_ids:
+            self.env.cr.execute(SQL("""
+                SELECT DISTINCT ON (face_id) face_id, id
+                  FROM media_artwork_history
+                 WHERE face_id = ANY(%s)
+              ORDER BY face_id, upload_date DESC, id DESC
+            """, list(face_ids)))
+            latest_by_face = dict(self.env.cr.fetchall())
+        latest_by_site = {}
+        if site_ids:
+            self.env.cr.execute(SQL("""
+                SELECT DISTINCT ON (site_id) site_id, id
+                  FROM media_artwork_history
+                 WHERE site_id = ANY(%s) AND face_id IS NULL
+              ORDER BY site_id, upload_date DESC, id DESC
+            """, list(site_ids)))
+            latest_by_site = dict(self.env.cr.fetchall())
+        return latest_by_face, latest_by_site
+
     def write(self, vals):
         res = super(MediaArtworkHistory, self).write(vals)
         if any(f in vals for f in ['lease_start_date', 'lease_end_date', 'face_id']):
@@ -231,13 +283,16 @@ class MediaArtworkHistory(models.Model):
                 # Clear sale order line if it doesn't match the selected partner
                 self.sale_order_line_id = False
     
-    artwork_file = fields.Image(string='Artwork', required=True)
+    artwork_id = fields.Many2one(required=True)
     artwork_filename = fields.Char(string='Filename')
     
     upload_date = fields.Datetime(string='Upload Date', default=fields.Datetime.now, readonly=True)
     description = fields.Text(string='Description')
     uploaded_by = fields.Many2one('res.users', string='Uploaded By', default=lambda self: self.env.user, readonly=True)
 
+    _face_upload_idx = models.Index('(face_id, upload_date DESC)')
+    _site_upload_idx = models.Index('(site_id, upload_date DESC)')
+
     @api.constrains('sale_order_line_id')
     def _check_contract_validity(self):
         today = fields.Date.today()
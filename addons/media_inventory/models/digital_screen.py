@@ -73,7 +73,7 @@ class MediaDigitalScreen(models.Model):
             for record in self:
                 record._sync_product()
                 
-        if 'image_1' in vals:
+        if vals.get('image_1'):
             for record in self:
                 face = record.face_ids[:1]
                 if face:
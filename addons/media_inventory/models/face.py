@@ -1,13 +1,14 @@
 from odoo import models, fields, api, _
-from odoo.tools.image import image_process
-import base64
+from odoo.tools import SQL
 from dateutil.relativedelta import relativedelta
 import datetime
 
 class MediaFace(models.Model):
     _name = 'media.face'
     _description = 'Media Face/Unit'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'media.report.image.mixin']
+    # Job card picture first, then the current artwork
+    _report_image_fields = ['face_image', 'default_artwork']
 
     name = fields.Char(string='Face Name', required=True, tracking=True)
     code = fields.Char(string='Face Code', tracking=True)
@@ -33,21 +34,6 @@ class MediaFace(models.Model):
     width = fields.Float(string='Width (m)')
     length_m = fields.Float(string='Length (m)', help="Length/Depth in meters if applicable")
     face_image = fields.Image(string='Face Image', max_width=1920, max_height=1920)
-    image_report = fields.Image(compute='_compute_image_report')
-
-    def _compute_image_report(self):
-        for record in self:
-            # Use face_image (job card/maintenance) or default_artwork (current active artwork)
-            image_to_process = record.face_image or record.default_artwork
-            if image_to_process:
-                try:
-                    decoded = base64.b64decode(image_to_process)
-                    processed = image_process(decoded, size=(800, 800), quality=80)
-                    record.image_report = base64.b64encode(processed)
-                except Exception:
-                    record.image_report = False
-            else:
-                record.image_report = False
     default_artwork = fields.Image(string='Default Artwork', help="Default artwork to display when no active contract artwork exist.")
     artwork_history_ids = fields.One2many('media.artwork.history', 'face_id', string='Artwork History')
 
@@ -110,9 +96,10 @@ class MediaFace(models.Model):
         ('maintenance', 'Maintenance')
     ], string='Occupancy Status', compute='_compute_occupancy_status', store=True, default='available')
 
-    next_available_date = fields.Date(string='Available From', compute='_compute_next_available_date', store=True)
+    next_available_date = fields.Date(string='Available From', compute='_compute_next_available_date', store=True, index=True,
+                                      help="Day after the last booking of the face, empty when it is available now.")
     current_booking_start = fields.Date(string='Booking Start', compute='_compute_current_booking_dates', store=True)
-    current_booking_end = fields.Date(string='Booking End', compute='_compute_current_booking_dates', store=True)
+    current_booking_end = fields.Date(string='Booking End', compute='_compute_current_booking_dates', store=True, index=True)
     
     latest_lease_start_date = fields.Date(string='Latest Lease Start', compute='_compute_latest_lease_dates', store=True)
     latest_lease_end_date = fields.Date(string='Latest Lease End', compute='_compute_latest_lease_dates', store=True)
@@ -121,54 +108,31 @@ class MediaFace(models.Model):
     is_expired = fields.Boolean(compute='_compute_status_flags', store=True)
     is_reserved = fields.Boolean(compute='_compute_status_flags', store=True)
 
+    def _get_booking_summary(self):
+        """ Booking calendar summary of each face as of today, keyed by face id. """
+        return self.env['media.face.booking']._get_face_summary(self._origin.ids, fields.Date.today())
+
     @api.depends('lease_line_ids.state', 'lease_line_ids.start_date', 'lease_line_ids.end_date', 'artwork_history_ids.lease_start_date', 'artwork_history_ids.lease_end_date', 'transferred_out_sol_ids', 'transferred_out_history_ids')
     def _compute_latest_lease_dates(self):
+        # Most recent confirmed lease line or manual booking (NOT transferred out)
+        summaries = self._get_booking_summary()
         for record in self:
-            # Combine confirmed lease lines (NOT transferred out) and artwork history bookings (NOT transferred out)
-            confirmed_leases = record.lease_line_ids.filtered(lambda l: l.state in ['sale', 'done'] and l.start_date and l.end_date and l.id not in record.transferred_out_sol_ids.ids)
-            history_leases = record.artwork_history_ids.filtered(lambda h: h.lease_start_date and h.lease_end_date and h.id not in record.transferred_out_history_ids.ids)
-            
-            bookings = []
-            for l in confirmed_leases:
-                bookings.append((l.start_date, l.end_date))
-            for h in history_leases:
-                bookings.append((h.lease_start_date, h.lease_end_date))
-                
-            if bookings:
-                # Sort by start date desc to get the most recent lease record
-                sorted_bookings = sorted(bookings, key=lambda x: x[0], reverse=True)
-                latest = sorted_bookings[0]
-                record.latest_lease_start_date = latest[0]
-                record.latest_lease_end_date = latest[1]
-            else:
-                record.latest_lease_start_date = False
-                record.latest_lease_end_date = False
+            summary = summaries.get(record._origin.id, {})
+            record.latest_lease_start_date = summary.get('latest_start') or False
+            record.latest_lease_end_date = summary.get('latest_end') or False
 
     @api.depends('lease_line_ids.state', 'lease_line_ids.start_date', 'lease_line_ids.end_date', 'artwork_history_ids.lease_start_date', 'artwork_history_ids.lease_end_date', 'transferred_out_sol_ids', 'transferred_out_history_ids')
     def _compute_current_booking_dates(self):
-        today = fields.Date.today()
+        summaries = self._get_booking_summary()
         for record in self:
-            # Check lease lines (NOT transferred out)
-            active_lease = record.lease_line_ids.filtered(lambda l: 
-                l.state in ['sale', 'done'] and 
-                l.start_date and l.end_date and
-                l.start_date <= today <= l.end_date and
-                l.id not in record.transferred_out_sol_ids.ids
-            ).sorted(key=lambda l: l.end_date, reverse=True)
-            
-            # Check manual artwork history bookings (NOT transferred out)
-            active_history = record.artwork_history_ids.filtered(lambda h:
-                h.lease_start_date and h.lease_end_date and
-                h.lease_start_date <= today <= h.lease_end_date and
-                h.id not in record.transferred_out_history_ids.ids
-            ).sorted(key=lambda h: h.lease_end_date, reverse=True)
-
-            if active_lease:
-                record.current_booking_start = active_lease[0].start_date
-                record.current_booking_end = active_lease[0].end_date
-            elif active_history:
-                record.current_booking_start = active_history[0].lease_start_date
-                record.current_booking_end = active_history[0].lease_end_date
+            summary = summaries.get(record._origin.id, {})
+            # Lease lines covering today take precedence over manual artwork history bookings
+            if summary.get('sale_start'):
+                record.current_booking_start = summary['sale_start']
+                record.current_booking_end = summary['sale_end']
+            elif summary.get('manual_start'):
+                record.current_booking_start = summary['manual_start']
+                record.current_booking_end = summary['manual_end']
             else:
                 record.current_booking_start = False
                 record.current_booking_end = False
@@ -187,55 +151,86 @@ class MediaFace(models.Model):
     @api.depends('lease_line_ids.end_date', 'lease_line_ids.state', 'artwork_history_ids.lease_end_date', 'transferred_out_sol_ids', 'transferred_out_history_ids')
     def _compute_next_available_date(self):
         today = fields.Date.today()
+        summaries = self._get_booking_summary()
         for record in self:
-            # Combine all end dates from active/future leases (NOT transferred out) and history (NOT transferred out)
-            end_dates = []
-            
-            future_rentals = record.lease_line_ids.filtered(lambda l: 
-                l.state in ['sale', 'done'] and 
-                l.end_date and l.end_date >= today and
-                l.id not in record.transferred_out_sol_ids.ids
-            )
-            if future_rentals:
-                end_dates.extend(future_rentals.mapped('end_date'))
-
-            future_history = record.artwork_history_ids.filtered(lambda h:
-                h.lease_end_date and h.lease_end_date >= today and
-                h.id not in record.transferred_out_history_ids.ids
-            )
-            if future_history:
-                end_dates.extend(future_history.mapped('lease_end_date'))
-            
-            if end_dates:
-                record.next_available_date = max(end_dates) + relativedelta(days=1)
-            else:
-                record.next_available_date = today
+            # Last end date of active/future leases and history bookings (NOT transferred out),
+            # left empty for free faces so that the roll-over does not rewrite them every day
+            last_end = summaries.get(record._origin.id, {}).get('last_end')
+            record.next_available_date = last_end + relativedelta(days=1) if last_end and last_end >= today else False
 
     @api.depends('active', 'lease_line_ids.state', 'lease_line_ids.start_date', 'lease_line_ids.end_date', 'artwork_history_ids.lease_start_date', 'artwork_history_ids.lease_end_date', 'transferred_out_sol_ids', 'transferred_out_history_ids')
     def _compute_occupancy_status(self):
-        today = fields.Date.today()
+        summaries = self._get_booking_summary()
         for record in self:
-            # Priority 1: Find any active confirmed lease (NOT transferred out) covering today → Booked
-            active_lease = record.lease_line_ids.filtered(lambda l:
-                l.state in ['sale', 'done'] and
-                l.start_date and l.end_date and
-                l.start_date <= today <= l.end_date and
-                l.id not in record.transferred_out_sol_ids.ids
-            )
-
-            # Find any active manual artwork history (NOT transferred out) covering today → Booked
-            active_history = record.artwork_history_ids.filtered(lambda h:
-                h.lease_start_date and h.lease_end_date and
-                h.lease_start_date <= today <= h.lease_end_date and
-                h.id not in record.transferred_out_history_ids.ids
-            )
-
-            if active_lease or active_history:
+            summary = summaries.get(record._origin.id, {})
+            # Priority 1: Any confirmed lease or manual booking (NOT transferred out) covering today → Booked
+            if summary.get('sale_start') or summary.get('manual_start'):
                 record.occupancy_status = 'booked'
             else:
                 # Priority 2: Any draft SOL referencing this face → Reserved
-                has_draft = any(l.state == 'draft' for l in record.lease_line_ids)
-                record.occupancy_status = 'reserved' if has_draft else 'available'
+                record.occupancy_status = 'reserved' if summary.get('has_draft') else 'available'
+
+    @api.model
+    def _get_rollover_ids(self, last_date, today):
+        """ Faces with a booking starting or ending since ``last_date``, or whose
+        current booking is now in the past or within the 30-day "soon available"
+        window. Free faces have no availability date, so they are left alone. """
+        soon = relativedelta(days=30)
+        self.env['media.face.booking']._flush_sources()
+        self.flush_model(['current_booking_end'])
+        self.env.cr.execute(SQL("""
+            SELECT face_id FROM media_face_booking
+             WHERE (date_from > %(last)s AND date_from <= %(today)s)
+                OR (date_to >= %(last)s AND date_to < %(today)s)
+             UNION
+            SELECT id FROM media_face
+             WHERE current_booking_end < %(today)s
+                OR (current_booking_end > %(last_soon)s AND current_booking_end <= %(today_soon)s)
+        """, last=last_date, today=today, last_soon=last_date + soon, today_soon=today + soon))
+        return [row[0] for row in self.env.cr.fetchall()]
+
+    @api.model
+    def _search_available(self, date_from, date_to, county_id=False, sub_county_id=False, face_type=False,
+                          illumination_type=False, site_category=False, limit=None, offset=0, order=None, count=False):
+        """ Return the faces free over the whole period, optionally filtered on location and specs.
+
+        A face is free when it has no confirmed lease line nor manual booking
+        (ignoring transferred-out ones) overlapping ``date_from``-``date_to``;
+        this is evaluated as a single anti-join on the booking calendar.
+
+        :param count: return the number of free faces instead of the records
+        """
+        domain = []
+        if county_id:
+            domain.append(('site_id.county_id', '=', county_id))
+        if sub_county_id:
+            domain.append(('site_id.sub_county_id', '=', sub_county_id))
+        if face_type:
+            domain.append(('face_type', '=', face_type))
+        if illumination_type:
+            domain.append(('illumination_type', '=', illumination_type))
+        if site_category:
+            domain.append(('site_id.site_category', '=', site_category))
+
+        if count:
+            query = self._search(domain, order='')
+        else:
+            query = self._search(domain, offset=offset, limit=limit, order=order or self._order)
+        if date_from and date_to:
+            self.env['media.face.booking']._flush_sources()
+            query.add_where(SQL("""
+                NOT EXISTS (
+                    SELECT 1 FROM media_face_booking b
+                     WHERE b.face_id = %s
+                       AND b.is_confirmed AND NOT b.transferred_out
+                       AND b.date_from IS NOT NULL AND b.date_to IS NOT NULL
+                       AND daterange(b.date_from, b.date_to, '[]') && daterange(%s, %s, '[]')
+                )
+            """, SQL.identifier(self._table, 'id'), date_from, date_to))
+        if count:
+            self.env.cr.execute(query.select(SQL("COUNT(*)")))
+            return self.env.cr.fetchone()[0]
+        return self.browse(query)
 
     @api.depends('operating_hours_start', 'operating_hours_end')
     def _compute_views_per_day(self):
@@ -268,19 +263,8 @@ class MediaFace(models.Model):
             
             # Show availability info if booked in the future
             if record.next_available_date and record.next_available_date > today:
-                last_line = record.lease_line_ids.filtered(lambda l: l.state in ['sale', 'done'] and l.end_date and l.end_date >= today).sorted(key=lambda l: l.end_date, reverse=True)
-                last_history = record.artwork_history_ids.filtered(lambda h: h.lease_end_date and h.lease_end_date >= today).sorted(key=lambda h: h.lease_end_date, reverse=True)
-                
-                booking_end = False
-                if last_line and last_history:
-                    booking_end = max(last_line[0].end_date, last_history[0].lease_end_date)
-                elif last_line:
-                    booking_end = last_line[0].end_date
-                elif last_history:
-                    booking_end = last_history[0].lease_end_date
-
-                if booking_end:
-                    name += " (Booked until: %s)" % booking_end.strftime('%b %d')
+                booking_end = record.next_available_date - relativedelta(days=1)
+                name += " (Booked until: %s)" % booking_end.strftime('%b %d')
             
             record.display_name = name
 
@@ -303,15 +287,15 @@ class MediaFace(models.Model):
                 record._sync_product()
         
         if not self.env.context.get('skip_history_creation'):
-            if 'default_artwork' in vals or 'face_image' in vals:
+            if vals.get('default_artwork') or vals.get('face_image'):
                 for record in self:
-                    if 'default_artwork' in vals:
+                    if vals.get('default_artwork'):
                         self.env['media.artwork.history'].with_context(skip_face_sync=True).create({
                             'face_id': record.id,
                             'artwork_file': vals['default_artwork'],
                             'description': _('Updated default artwork'),
                         })
-                    if 'face_image' in vals:
+                    if vals.get('face_image'):
                          self.env['media.artwork.history'].with_context(skip_face_sync=True).create({
                             'face_id': record.id,
                             'artwork_file': vals['face_image'],
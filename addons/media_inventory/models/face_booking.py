@@ -0,0 +1,248 @@
+import logging
+
+import psycopg2
+
+from odoo import models, fields, api, _
+from odoo.tools import SQL
+
+_logger = logging.getLogger(__name__)
+
+
+class MediaFaceBooking(models.Model):
+    """ Booking calendar of billboard faces.
+
+    One row per sale order line or manual (artwork history) booking referencing
+    a face. The table is maintained by PostgreSQL triggers on the source tables,
+    so it is always in sync with what has been flushed to the database and can
+    be queried with set-based SQL instead of walking the face One2manys.
+    """
+    _name = 'media.face.booking'
+    _description = 'Face Booking Interval'
+    _order = 'date_from desc, id desc'
+    _log_access = False
+
+    face_id = fields.Many2one('media.face', string='Face', required=True, index=True, ondelete='cascade', readonly=True)
+    booking_type = fields.Selection([
+        ('sale', 'Sale Order Line'),
+        ('manual', 'Manual Booking'),
+    ], string='Booking Type', required=True, readonly=True)
+    sale_line_id = fields.Many2one('sale.order.line', string='Contract Line', index='btree_not_null', ondelete='cascade', readonly=True)
+    history_id = fields.Many2one('media.artwork.history', string='Manual Booking', index='btree_not_null', ondelete='cascade', readonly=True)
+    state = fields.Char(string='Order Status', readonly=True, help="Status of the sale order line. Empty for manual bookings.")
+    is_confirmed = fields.Boolean(string='Confirmed', readonly=True)
+    date_from = fields.Date(string='Start Date', index=True, readonly=True)
+    date_to = fields.Date(string='End Date', index=True, readonly=True)
+    transferred_out = fields.Boolean(string='Transferred Out', readonly=True, help="The booking has been inventory-transferred to another face and no longer occupies this one.")
+
+    # Source queries, shared by the triggers and the full rebuild done in init().
+    _SALE_LINE_SELECT = """
+        SELECT sol.media_face_id, 'sale', sol.id, NULL::integer, sol.state,
+               COALESCE(sol.state IN ('sale', 'done'), FALSE),
+               sol.start_date, sol.end_date,
+               EXISTS (
+                   SELECT 1 FROM media_face_sol_transfer_rel rel
+                    WHERE rel.face_id = sol.media_face_id AND rel.sol_id = sol.id
+               )
+          FROM sale_order_line sol
+         WHERE sol.media_face_id IS NOT NULL
+    """
+    _HISTORY_SELECT = """
+        SELECT hist.face_id, 'manual', NULL::integer, hist.id, NULL, TRUE,
+               hist.lease_start_date, hist.lease_end_date,
+               EXISTS (
+                   SELECT 1 FROM media_face_history_transfer_rel rel
+                    WHERE rel.face_id = hist.face_id AND rel.history_id = hist.id
+               )
+          FROM media_artwork_history hist
+         WHERE hist.face_id IS NOT NULL AND hist.lease_end_date IS NOT NULL
+    """
+    _INSERT_COLUMNS = """
+        INSERT INTO media_face_booking (face_id, booking_type, sale_line_id, history_id, state,
+                                        is_confirmed, date_from, date_to, transferred_out)
+    """
+
+    _EXCLUSION_PARAM = 'media_inventory.booking_exclusion_constraint'
+
+    def init(self):
+        cr = self.env.cr
+        cr.execute("""
+            CREATE INDEX IF NOT EXISTS media_face_booking_period_gist_idx
+                ON media_face_booking USING gist (daterange(date_from, date_to, '[]'))
+             WHERE date_from IS NOT NULL AND date_to IS NOT NULL
+        """)
+        cr.execute("""
+            CREATE INDEX IF NOT EXISTS media_face_booking_face_date_to_idx
+                ON media_face_booking (face_id, date_to)
+        """)
+
+        cr.execute("""
+            CREATE OR REPLACE FUNCTION media_face_booking_sync_sale_line() RETURNS trigger AS $$
+            BEGIN
+                DELETE FROM media_face_booking WHERE sale_line_id = NEW.id;
+                %s %s AND sol.id = NEW.id;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+        """ % (self._INSERT_COLUMNS, self._SALE_LINE_SELECT))
+        cr.execute("""
+            CREATE OR REPLACE FUNCTION media_face_booking_sync_history() RETURNS trigger AS $$
+            BEGIN
+                DELETE FROM media_face_booking WHERE history_id = NEW.id;
+                %s %s AND hist.id = NEW.id;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+        """ % (self._INSERT_COLUMNS, self._HISTORY_SELECT))
+        cr.execute("""
+            CREATE OR REPLACE FUNCTION media_face_booking_sync_sol_transfer() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP = 'INSERT' THEN
+                    UPDATE media_face_booking SET transferred_out = TRUE
+                     WHERE face_id = NEW.face_id AND sale_line_id = NEW.sol_id;
+                ELSE
+                    UPDATE media_face_booking SET transferred_out = FALSE
+                     WHERE face_id = OLD.face_id AND sale_line_id = OLD.sol_id;
+                END IF;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+        """)
+        cr.execute("""
+            CREATE OR REPLACE FUNCTION media_face_booking_sync_history_transfer() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP = 'INSERT' THEN
+                    UPDATE media_face_booking SET transferred_out = TRUE
+                     WHERE face_id = NEW.face_id AND history_id = NEW.history_id;
+                ELSE
+                    UPDATE media_face_booking SET transferred_out = FALSE
+                     WHERE face_id = OLD.face_id AND history_id = OLD.history_id;
+                END IF;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+        """)
+
+        # Deleted sources are handled by the ON DELETE CASCADE foreign keys.
+        cr.execute("""
+            DROP TRIGGER IF EXISTS media_face_booking_sale_line_trg ON sale_order_line;
+            CREATE TRIGGER media_face_booking_sale_line_trg
+                AFTER INSERT OR UPDATE OF media_face_id, state, start_date, end_date ON sale_order_line
+                FOR EACH ROW EXECUTE FUNCTION media_face_booking_sync_sale_line();
+
+            DROP TRIGGER IF EXISTS media_face_booking_history_trg ON media_artwork_history;
+            CREATE TRIGGER media_face_booking_history_trg
+                AFTER INSERT OR UPDATE OF face_id, lease_start_date, lease_end_date ON media_artwork_history
+                FOR EACH ROW EXECUTE FUNCTION media_face_booking_sync_history();
+
+            DROP TRIGGER IF EXISTS media_face_booking_sol_transfer_trg ON media_face_sol_transfer_rel;
+            CREATE TRIGGER media_face_booking_sol_transfer_trg
+                AFTER INSERT OR DELETE ON media_face_sol_transfer_rel
+                FOR EACH ROW EXECUTE FUNCTION media_face_booking_sync_sol_transfer();
+
+            DROP TRIGGER IF EXISTS media_face_booking_history_transfer_trg ON media_face_history_transfer_rel;
+            CREATE TRIGGER media_face_booking_history_transfer_trg
+                AFTER INSERT OR DELETE ON media_face_history_transfer_rel
+                FOR EACH ROW EXECUTE FUNCTION media_face_booking_sync_history_transfer();
+        """)
+
+        # Rebuild the calendar from its sources on every install/upgrade.
+        cr.execute("ALTER TABLE media_face_booking DROP CONSTRAINT IF EXISTS media_face_booking_no_double_booking")
+        cr.execute("DELETE FROM media_face_booking")
+        cr.execute(self._INSERT_COLUMNS + self._SALE_LINE_SELECT)
+        cr.execute(self._INSERT_COLUMNS + self._HISTORY_SELECT)
+
+        if self.env['ir.config_parameter'].sudo().get_param(self._EXCLUSION_PARAM):
+            self._add_exclusion_constraint()
+
+    def _add_exclusion_constraint(self):
+        """ Forbid overlapping confirmed lease lines on a face at the database level.
+
+        Opt-in through the ``media_inventory.booking_exclusion_constraint`` system
+        parameter (applied on module upgrade): it needs the ``btree_gist``
+        extension and existing data free of double bookings. Unlike the Python
+        constraint on sale.order.line, it also holds for concurrent confirmations.
+
+        :return: whether the constraint could be added
+        """
+        try:
+            with self.env.cr.savepoint():
+                self.env.cr.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+                self.env.cr.execute("""
+                    ALTER TABLE media_face_booking
+                      ADD CONSTRAINT media_face_booking_no_double_booking
+                      EXCLUDE USING gist (face_id WITH =, daterange(date_from, date_to, '[]') WITH &&)
+                      WHERE (booking_type = 'sale' AND is_confirmed AND date_from IS NOT NULL AND date_to IS NOT NULL)
+                """)
+        except psycopg2.Error as e:
+            _logger.warning("Could not add the face double booking exclusion constraint: %s", e)
+            return False
+        return True
+
+    @api.model
+    def _flush_sources(self):
+        """ Push pending ORM writes of the source tables so the triggers have run. """
+        self.env['sale.order.line'].flush_model(['media_face_id', 'state', 'start_date', 'end_date'])
+        self.env['media.artwork.history'].flush_model(['face_id', 'lease_start_date', 'lease_end_date'])
+        self.env['media.face'].flush_model(['transferred_out_sol_ids', 'transferred_out_history_ids'])
+        self.invalidate_model()
+
+    @api.model
+    def _get_face_summary(self, face_ids, date):
+        """ Summarize the booking calendar of the given faces as of ``date``.
+
+        :return: dict {face_id: {'has_draft', 'sale_start', 'sale_end',
+            'manual_start', 'manual_end', 'latest_start', 'latest_end', 'last_end'}}
+            where ``sale_*``/``manual_*`` are the booking covering ``date`` that
+            ends last, ``latest_*`` the booking that starts last and ``last_end``
+            the last end date on or after ``date``.
+        """
+        if not face_ids:
+            return {}
+        self._flush_sources()
+        live = SQL("b.is_confirmed AND NOT b.transferred_out")
+        dated = SQL("%s AND b.date_from IS NOT NULL AND b.date_to IS NOT NULL", live)
+        current = SQL("%s AND b.date_from <= %s AND b.date_to >= %s", dated, date, date)
+        self.env.cr.execute(SQL("""
+            SELECT b.face_id,
+                   COALESCE(bool_or(b.state = 'draft'), FALSE) AS has_draft,
+                   (array_agg(b.date_from ORDER BY b.date_to DESC, b.id) FILTER (WHERE %(current)s AND b.booking_type = 'sale'))[1] AS sale_start,
+                   (array_agg(b.date_to ORDER BY b.date_to DESC, b.id) FILTER (WHERE %(current)s AND b.booking_type = 'sale'))[1] AS sale_end,
+                   (array_agg(b.date_from ORDER BY b.date_to DESC, b.id) FILTER (WHERE %(current)s AND b.booking_type = 'manual'))[1] AS manual_start,
+                   (array_agg(b.date_to ORDER BY b.date_to DESC, b.id) FILTER (WHERE %(current)s AND b.booking_type = 'manual'))[1] AS manual_end,
+                   (array_agg(b.date_from ORDER BY b.date_from DESC, b.id) FILTER (WHERE %(dated)s))[1] AS latest_start,
+                   (array_agg(b.date_to ORDER BY b.date_from DESC, b.id) FILTER (WHERE %(dated)s))[1] AS latest_end,
+                   max(b.date_to) FILTER (WHERE %(live)s AND b.date_to >= %(date)s) AS last_end
+              FROM media_face_booking b
+             WHERE b.face_id = ANY(%(face_ids)s)
+          GROUP BY b.face_id
+        """, current=current, dated=dated, live=live, date=date, face_ids=list(face_ids)))
+        return {row['face_id']: row for row in self.env.cr.dictfetchall()}
+
+    @api.model
+    def _get_overlapping(self, face_ids, date_from, date_to, booking_types=('sale', 'manual'),
+                         exclude_sale_line_ids=(), include_transferred=False):
+        """ Return the confirmed bookings of ``face_ids`` overlapping the given period.
+
+        :return: list of dicts with the face, sale line, history and dates of each booking
+        """
+        if not face_ids or not date_from or not date_to:
+            return []
+        self._flush_sources()
+        conditions = [
+            SQL("b.face_id = ANY(%s)", list(face_ids)),
+            SQL("b.booking_type = ANY(%s)", list(booking_types)),
+            SQL("b.is_confirmed"),
+            SQL("b.date_from IS NOT NULL AND b.date_to IS NOT NULL"),
+            SQL("daterange(b.date_from, b.date_to, '[]') && daterange(%s, %s, '[]')", date_from, date_to),
+        ]
+        if not include_transferred:
+            conditions.append(SQL("NOT b.transferred_out"))
+        if exclude_sale_line_ids:
+            conditions.append(SQL("(b.sale_line_id IS NULL OR b.sale_line_id != ALL(%s))", list(exclude_sale_line_ids)))
+        self.env.cr.execute(SQL("""
+            SELECT b.face_id, b.booking_type, b.sale_line_id, b.history_id, b.date_from, b.date_to
+              FROM media_face_booking b
+             WHERE %s
+          ORDER BY b.face_id, b.date_from
+        """, SQL(" AND ").join(conditions)))
+        return self.env.cr.dictfetchall()
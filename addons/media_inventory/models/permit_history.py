@@ -8,7 +8,7 @@ class MediaPermitHistory(models.Model):
     site_id = fields.Many2one('media.site', string='Billboard', required=True, ondelete='cascade')
     permit_number = fields.Char(string='Permit Number', required=True)
     issue_date = fields.Date(string='Issue Date')
-    expiry_date = fields.Date(string='Expiry Date', required=True)
+    expiry_date = fields.Date(string='Expiry Date', required=True, index=True)
     permit_file = fields.Binary(string='Permit Document')
     permit_filename = fields.Char(string='Filename')
     
@@ -27,3 +27,8 @@ class MediaPermitHistory(models.Model):
                 record.status = 'expired'
             else:
                 record.status = 'active'
+
+    @api.model
+    def _get_rollover_ids(self, last_date, today):
+        """ Active permits that have expired since. """
+        return self.search([('status', '=', 'active'), ('expiry_date', '<', today)]).ids
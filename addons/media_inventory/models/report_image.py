@@ -0,0 +1,240 @@
+import base64
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg2
+
+from odoo import models, fields, api, _
+from odoo.tools import SQL, split_every
+from odoo.tools.image import image_process
+
+_logger = logging.getLogger(__name__)
+
+REPORT_IMAGE_SIZE = (800, 800)
+REPORT_IMAGE_QUALITY = 80
+# Below this number of images, starting threads costs more than it saves
+POOL_MIN_IMAGES = 4
+
+
+def _process_image(raw):
+    """ Resize ``raw`` for reports, False if it is not an image. """
+    try:
+        return base64.b64encode(image_process(raw, size=REPORT_IMAGE_SIZE, quality=REPORT_IMAGE_QUALITY))
+    except Exception:
+        return False
+
+
+class MediaReportImage(models.Model):
+    """ Report-sized copies of the asset images, keyed by the checksum of the
+    source attachment: a source image is only processed once, whatever the
+    number of records or reports using it, and a new upload gets a new key.
+    """
+    _name = 'media.report.image'
+    _description = 'Report Image Thumbnail'
+
+    checksum = fields.Char(string='Source Checksum', required=True, readonly=True, index=True)
+    image = fields.Binary(string='Thumbnail', attachment=True, readonly=True,
+                          help="Empty when the source could not be processed as an image.")
+
+    _checksum_uniq = models.Constraint('UNIQUE(checksum)', "A thumbnail already exists for this image.")
+
+    @api.model
+    def _get_source_models(self):
+        """ Models using report images, with their source image fields. """
+        return {
+            model_name: self.env[model_name]._report_image_fields
+            for model_name in self.env.registry.descendants(['media.report.image.mixin'], '_inherit')
+            if not self.env[model_name]._abstract
+        }
+
+    @api.model
+    def _get_thumbnails(self, checksums):
+        """ Thumbnails of the given source checksums, generating the missing ones.
+
+        :return: dict {checksum: base64 thumbnail or False}
+        """
+        checksums = set(filter(None, checksums))
+        if not checksums:
+            return {}
+        cached = self.sudo().search([('checksum', 'in', list(checksums))])
+        thumbnails = {thumbnail.checksum: thumbnail.image for thumbnail in cached}
+        missing = checksums - thumbnails.keys()
+        if missing:
+            thumbnails.update(self._generate(missing))
+        return thumbnails
+
+    @api.model
+    def _generate(self, checksums):
+        """ Process the source images of ``checksums`` and store the thumbnails.
+
+        :return: dict {checksum: base64 thumbnail or False}
+        """
+        sources = {}
+        for attachment in self.env['ir.attachment'].sudo().search([
+            ('checksum', 'in', list(checksums)),
+            ('res_field', '!=', False),
+        ]):
+            sources.setdefault(attachment.checksum, attachment)
+
+        thumbnails = self._process_images({checksum: attachment.raw for checksum, attachment in sources.items()})
+        self._store(thumbnails)
+        return thumbnails
+
+    @api.model
+    def _process_images(self, raws):
+        """ Resize the images of ``raws`` ({key: raw image}), spreading them
+        over a pool of threads when there are enough of them.
+
+        PIL releases the GIL while decoding and resizing, so the threads run
+        in parallel; they only get raw bytes, the ORM stays in this thread.
+        """
+        workers = min(self._get_pool_size(), len(raws))
+        if workers < 2 or len(raws) < POOL_MIN_IMAGES:
+            return {key: _process_image(raw) for key, raw in raws.items()}
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='media_report_image') as pool:
+            return dict(zip(raws, pool.map(_process_image, raws.values())))
+
+    @api.model
+    def _get_pool_size(self):
+        return int(self.env['ir.config_parameter'].sudo().get_param('media_inventory.report_image_workers', os.cpu_count() or 1))
+
+    @api.model
+    def _store(self, thumbnails):
+        if not thumbnails:
+            return
+        try:
+            with self.env.cr.savepoint():
+                self.sudo().create([
+                    {'checksum': checksum, 'image': image}
+                    for checksum, image in thumbnails.items()
+                ])
+        except psycopg2.IntegrityError:
+            # Generated concurrently by another transaction, theirs is as good as ours
+            _logger.info("Report thumbnails already stored by another transaction")
+
+    @api.model
+    def _cron_generate_thumbnails(self, limit=200, batch_size=20, auto_commit=False):
+        """ Generate the thumbnails of the recently uploaded asset images and
+        drop the ones whose source image no longer exists.
+
+        The images are processed by chunks of ``batch_size``, each chunk being
+        committed with ``auto_commit``, so only one chunk of source images is
+        loaded at a time and an interrupted run keeps the work done.
+        """
+        sources = SQL(" OR ").join(
+            SQL("(res_model = %s AND res_field = ANY(%s))", model_name, list(field_names))
+            for model_name, field_names in self._get_source_models().items()
+        )
+        self.env.cr.execute(SQL("""
+            SELECT DISTINCT checksum
+              FROM ir_attachment
+             WHERE (%(sources)s)
+               AND checksum IS NOT NULL
+               AND NOT EXISTS (SELECT 1 FROM media_report_image r WHERE r.checksum = ir_attachment.checksum)
+             LIMIT %(limit)s
+        """, sources=sources, limit=limit))
+        checksums = [row[0] for row in self.env.cr.fetchall()]
+        for batch in split_every(batch_size, checksums):
+            self._generate(batch)
+            if auto_commit:
+                self.env.cr.commit()
+            self.env.invalidate_all()
+
+        self.env.cr.execute(SQL("""
+            SELECT r.id
+              FROM media_report_image r
+             WHERE NOT EXISTS (
+                   SELECT 1 FROM ir_attachment a
+                    WHERE a.checksum = r.checksum AND (%(sources)s)
+             )
+        """, sources=sources))
+        orphans = self.browse(row[0] for row in self.env.cr.fetchall())
+        orphans.sudo().unlink()
+
+        if len(checksums) == limit:
+            self.env.ref('media_inventory.ir_cron_generate_report_images')._trigger()
+
+
+class MediaReportImageMixin(models.AbstractModel):
+    """ Adds ``image_report``, the first set image of ``_report_image_fields``
+    resized for reports, served from the media.report.image cache.
+    """
+    _name = 'media.report.image.mixin'
+    _description = 'Report Image Mixin'
+
+    # Source image fields, by order of preference
+    _report_image_fields = []
+
+    image_report = fields.Image(compute='_compute_image_report')
+
+    @api.depends(lambda self: self._report_image_fields)
+    def _compute_image_report(self):
+        checksums = self._get_report_image_checksums()
+        thumbnails = self.env['media.report.image']._get_thumbnails(checksums.values())
+        for record in self:
+            if record.id in checksums:
+                record.image_report = thumbnails.get(checksums[record.id], False)
+            else:
+                # Record being edited, its images are not stored as attachments yet
+                image = next((record[fname] for fname in self._report_image_fields if record[fname]), False)
+                record.image_report = image and _process_image(base64.b64decode(image))
+
+    def _get_report_image_checksums(self):
+        """ Checksum of the report source image of each stored record, without loading the images.
+
+        :return: dict {record id: checksum}, records without image map to False
+        """
+        by_field = self._get_report_image_field_checksums()
+        return {
+            record_id: next((by_field[record_id, fname] for fname in self._report_image_fields if (record_id, fname) in by_field), False)
+            for record_id in self.ids if record_id
+        }
+
+    def _get_report_image_field_checksums(self):
+        """ Checksums of all the source images of the stored records.
+
+        :return: dict {(record id, field name): checksum}
+        """
+        record_ids = [record_id for record_id in self.ids if record_id]
+        if not record_ids:
+            return {}
+        self.env.cr.execute(SQL("""
+            SELECT res_id, res_field, checksum
+              FROM ir_attachment
+             WHERE res_model = %s AND res_field = ANY(%s) AND res_id = ANY(%s)
+        """, self._name, self._report_image_fields, record_ids))
+        return {(res_id, res_field): checksum for res_id, res_field, checksum in self.env.cr.fetchall()}
+
+    def _get_report_image(self, fname):
+        """ Report-sized copy of the image of ``fname``, for the reports
+        printing a given source image rather than ``image_report``.
+        """
+        self.ensure_one()
+        checksum = self._get_report_image_field_checksums().get((self.id, fname))
+        return checksum and self.env['media.report.image']._get_thumbnails([checksum])[checksum]
+
+    def _prepare_report_images(self):
+        """ Pre-render stage of the reports: generate the missing thumbnails
+        of all the source images of the records at once, in parallel, so
+        rendering only reads the cache.
+        """
+        checksums = self._get_report_image_field_checksums()
+        self.env['media.report.image']._get_thumbnails(checksums.values())
+
+    def _trigger_report_images(self, vals_list):
+        if any(vals.get(fname) for vals in vals_list for fname in self._report_image_fields):
+            cron = self.env.ref('media_inventory.ir_cron_generate_report_images', raise_if_not_found=False)
+            if cron:
+                cron._trigger()
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super(MediaReportImageMixin, self).create(vals_list)
+        records._trigger_report_images(vals_list)
+        return records
+
+    def write(self, vals):
+        res = super(MediaReportImageMixin, self).write(vals)
+        self._trigger_report_images([vals])
+        return res
@@ -0,0 +1,70 @@
+import logging
+
+from odoo import models, fields, api
+from odoo.tools import split_every
+from dateutil.relativedelta import relativedelta
+
+_logger = logging.getLogger(__name__)
+
+
+class MediaRollover(models.AbstractModel):
+    """ Daily roll-over of the date-sensitive stored computes.
+
+    Occupancy and expiry fields depend on ``fields.Date.today()`` and therefore go
+    stale overnight without any dependency changing. Instead of recomputing every
+    record, each model returns the records whose booking/expiry boundaries were
+    crossed since the last run (``_get_rollover_ids``) and only those are
+    recomputed, in bounded batches.
+    """
+    _name = 'media.rollover'
+    _description = 'Media Daily Roll-over'
+
+    _LAST_DATE_PARAM = 'media_inventory.rollover_last_date'
+
+    @api.model
+    def _get_rollover_plan(self):
+        """ Return {model name: [stored fields to recompute]} """
+        return {
+            'media.face': [
+                'occupancy_status', 'current_booking_start', 'current_booking_end', 'next_available_date',
+                'is_soon_available', 'is_expired', 'is_reserved',
+            ],
+            'media.permit.history': ['status'],
+        }
+
+    @api.model
+    def _cron_rollover(self, batch_size=500, auto_commit=False):
+        """ Recompute the records whose date boundaries crossed today since the last run.
+
+        :return: dict {model name: number of records whose values changed}
+        """
+        today = fields.Date.today()
+        ICP = self.env['ir.config_parameter'].sudo()
+        last_date = fields.Date.to_date(ICP.get_param(self._LAST_DATE_PARAM)) or today - relativedelta(days=1)
+        if last_date >= today:
+            return {}
+
+        changes = {}
+        for model_name, fnames in self._get_rollover_plan().items():
+            Model = self.env[model_name].with_context(active_test=False)
+            record_ids = Model._get_rollover_ids(last_date, today)
+            changed = 0
+            for batch_ids in split_every(batch_size, record_ids):
+                records = Model.browse(batch_ids).exists()
+                before = {rec.id: [rec[fname] for fname in fnames] for rec in records}
+                for fname in fnames:
+                    self.env.add_to_compute(Model._fields[fname], records)
+                records.flush_recordset(fnames)
+                changed += sum(1 for rec in records if [rec[fname] for fname in fnames] != before[rec.id])
+                if auto_commit:
+                    self.env.cr.commit()
+                self.env.invalidate_all()
+            changes[model_name] = changed
+            _logger.info("Media roll-over %s -> %s: %s records checked, %s changed on %s",
+                         last_date, today, len(record_ids), changed, model_name)
+
+        ICP.set_param(self._LAST_DATE_PARAM, fields.Date.to_string(today))
+        if auto_commit:
+            self.env.cr.commit()
+        return changes
+
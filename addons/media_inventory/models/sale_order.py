@@ -1,5 +1,8 @@
+from collections import defaultdict
+
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError
+from odoo.tools import SQL
 from dateutil.relativedelta import relativedelta
 
 class SaleOrder(models.Model):
@@ -8,39 +11,69 @@ class SaleOrder(models.Model):
 
 
 class SaleOrderLine(models.Model):
-    _inherit = 'sale.order.line'
+    _inherit = ['sale.order.line', 'media.artwork.mixin']
 
-    media_face_id = fields.Many2one('media.face', string='Media Face')
+    media_face_id = fields.Many2one('media.face', string='Media Face', index='btree_not_null')
     media_digital_screen_id = fields.Many2one('media.digital.screen', string='Digital Screen')
     canopy_id = fields.Many2one('media.canopy', string='Canopy')
-    start_date = fields.Date(string='Start Date')
-    end_date = fields.Date(string='End Date')
+    start_date = fields.Date(string='Start Date', index=True)
+    end_date = fields.Date(string='End Date', index=True)
+    site_id = fields.Many2one('media.site', string='Site', compute='_compute_site_id', store=True, index='btree_not_null')
     item_description = fields.Text(string='Item Description')
     
-    artwork_file = fields.Image(string='Artwork/Graphic', max_width=1920, max_height=1920)
+    artwork_file = fields.Image(string='Artwork/Graphic')
     artwork_filename = fields.Char(string='Artwork Filename')
     
     @api.constrains('media_face_id', 'media_digital_screen_id', 'start_date', 'end_date', 'state')
     def _check_availability(self):
-        for line in self:
-            if not line.start_date or not line.end_date:
-                continue
-            
-            # Check for overlapping bookings for static faces
-            if line.media_face_id and line.media_face_id.face_type != 'digital':
-                domain = [
-                    ('id', '!=', line.id),
-                    ('media_face_id', '=', line.media_face_id.id),
-                    ('state', 'in', ['sale', 'done']),
-                    ('start_date', '<=', line.end_date),
-                    ('end_date', '>=', line.start_date),
-                ]
-                overlapping = self.search_count(domain)
-                if overlapping:
-                    raise ValidationError(_('The face %s is already booked for the selected period.') % line.media_face_id.name)
+        # Check for overlapping bookings for static faces
+        static_lines = self.filtered(lambda l: l.media_face_id and l.media_face_id.face_type != 'digital')
+        static_lines._check_booking_conflicts('media_face_id', _('The face %s is already booked for the selected period.'))
+
+        # Check for overlapping bookings for digital screens is handled by the slot logic or SOV rules.
+        # But the constraint signature must include media_digital_screen_id if we want logic for it in future.
+
+    def _check_booking_conflicts(self, resource_fname, message):
+        """ Raise if any line books its ``resource_fname`` over a period already taken by a confirmed line.
 
-            # Check for overlapping bookings for digital screens is handled by the slot logic or SOV rules.
-            # But the constraint signature must include media_digital_screen_id if we want logic for it in future.
+        Lines of the batch are first swept against each other in memory, then
+        checked against the database with a single query for the whole batch.
+        """
+        lines = self.filtered(lambda l: l[resource_fname] and l.start_date and l.end_date)
+        if not lines:
+            return
+        confirmed_states = ('sale', 'done')
+
+        # 1. Conflicts inside the batch: sweep the lines of each resource by start date
+        lines_by_resource = defaultdict(list)
+        for line in lines:
+            lines_by_resource[line[resource_fname]].append(line)
+        for resource, resource_lines in lines_by_resource.items():
+            running = []
+            for line in sorted(resource_lines, key=lambda l: l.start_date):
+                running = [other for other in running if other.end_date >= line.start_date]
+                if any(line.state in confirmed_states or other.state in confirmed_states for other in running):
+                    raise ValidationError(message % resource.name)
+                running.append(line)
+
+        # 2. Conflicts with the confirmed lines already in the database
+        self.flush_model([resource_fname, 'state', 'start_date', 'end_date'])
+        self.env.cr.execute(SQL("""
+            SELECT line.%(resource)s
+              FROM sale_order_line line
+              JOIN sale_order_line other
+                ON other.%(resource)s = line.%(resource)s
+               AND other.id != line.id
+               AND other.state IN %(states)s
+               AND other.start_date <= line.end_date
+               AND other.end_date >= line.start_date
+             WHERE line.id = ANY(%(line_ids)s)
+             LIMIT 1
+        """, resource=SQL.identifier(resource_fname), states=confirmed_states, line_ids=lines.ids))
+        row = self.env.cr.fetchone()
+        if row:
+            resource = self.env[self._fields[resource_fname].comodel_name].browse(row[0])
+            raise ValidationError(message % resource.name)
 
     @api.onchange('media_face_id')
     def _onchange_media_face_id(self):
@@ -203,6 +236,11 @@ class SaleOrderLine(models.Model):
             else:
                 line.item_description = False
 
+    @api.depends('media_face_id.site_id', 'canopy_id.site_id', 'media_digital_screen_id.site_id')
+    def _compute_site_id(self):
+        for line in self:
+            line.site_id = line.media_face_id.site_id or line.canopy_id.site_id or line.media_digital_screen_id.site_id
+
     @api.onchange('start_date', 'end_date')
     def _onchange_lease_duration(self):
         for line in self:
@@ -224,7 +262,7 @@ class SaleOrderLine(models.Model):
             'start_date': self.start_date,
             'end_date': self.end_date,
             'item_description': self.item_description,
-            'artwork_file': self.artwork_file,
+            'artwork_id': self.artwork_id.id,
             'artwork_filename': self.artwork_filename,
         })
         if self.media_face_id:
@@ -240,7 +278,7 @@ class SaleOrderLine(models.Model):
             for line in self:
                 history_vals = {
                     'sale_order_line_id': line.id,
-                    'artwork_file': vals['artwork_file'],
+                    'artwork_id': line.artwork_id.id,
                     'description': _('Updated artwork for contract %s') % line.order_id.name,
                 }
                 if line.media_face_id:
@@ -264,10 +302,10 @@ class SaleOrderLine(models.Model):
     def create(self, vals_list):
         lines = super(SaleOrderLine, self).create(vals_list)
         for line in lines:
-            if line.artwork_file:
+            if line.artwork_id:
                 history_vals = {
                     'sale_order_line_id': line.id,
-                    'artwork_file': line.artwork_file,
+                    'artwork_id': line.artwork_id.id,
                     'description': _('Initial artwork for contract %s') % line.order_id.name,
                 }
                 if line.media_face_id:
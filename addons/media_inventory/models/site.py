@@ -1,6 +1,6 @@
+from collections import defaultdict
+
 from odoo import models, fields, api, _
-from odoo.tools.image import image_process
-import base64
 import re
 import requests
 from odoo.exceptions import UserError, ValidationError
@@ -79,32 +79,44 @@ class MediaSiteMixin(models.AbstractModel):
                 self.longitude = float(match.group(2))
                 return
 
-    @api.depends('face_ids', 'face_ids.occupancy_status', 'face_ids.price_per_month', 'permit_history_ids', 'expense_ids', 'lease_line_ids')
+    def _get_site_id(self):
+        """ Id of the underlying media.site, for a site as well as for the assets delegating to it. """
+        self.ensure_one()
+        return self._origin.id if self._name == 'media.site' else self.site_id._origin.id
+
+    @api.depends('face_ids', 'permit_history_ids', 'expense_ids', 'lease_line_ids')
     def _compute_site_stats(self):
+        site_ids = [site_id for site_id in (record._get_site_id() for record in self) if site_id]
+
+        def count_by_site(model, domain):
+            return {
+                site.id: count
+                for site, count in self.env[model]._read_group(domain + [('site_id', 'in', site_ids)], ['site_id'], ['__count'])
+            }
+
+        face_counts = count_by_site('media.face', [])
+        permit_counts = count_by_site('media.permit.history', [])
+        expense_counts = count_by_site('media.expense', [])
+        rental_counts = count_by_site('sale.order.line', [])
+        canopy_history_counts = count_by_site('media.artwork.history', [('site_category', '=', 'canopy')])
+        face_history_counts = defaultdict(int)
+        for face, count in self.env['media.artwork.history']._read_group(
+                [('face_id.site_id', 'in', site_ids)], ['face_id'], ['__count']):
+            face_history_counts[face.site_id.id] += count
+
         for record in self:
-            record.face_count = len(record.face_ids)
-            record.permit_count = len(record.permit_history_ids)
-            record.expenses_count = len(record.expense_ids)
-            record.rentals_count = len(record.lease_line_ids)
-            
-            # Count history from all faces/canopies associated with this site
-            if hasattr(record, 'artwork_history_count'):
-                domain = []
-                if record.face_ids:
-                    domain = [('face_id', 'in', record.face_ids.ids)]
-                elif record.site_category == 'canopy':
-                    domain = [('site_id', '=', record.id), ('site_category', '=', 'canopy')]
-                
-                if domain:
-                    history = self.env['media.artwork.history'].search(domain)
-                    record.artwork_history_count = len(history)
-                else:
-                    record.artwork_history_count = 0
-            
-            record.total_faces_count = record.face_count
-            record.occupied_faces_count = len(record.face_ids.filtered(lambda f: f.occupancy_status == 'booked'))
-            record.available_faces_count = record.total_faces_count - record.occupied_faces_count
-            record.total_monthly_revenue = sum(record.face_ids.mapped('price_per_month'))
+            site_id = record._get_site_id()
+            record.face_count = face_counts.get(site_id, 0)
+            record.permit_count = permit_counts.get(site_id, 0)
+            record.expenses_count = expense_counts.get(site_id, 0)
+            record.rentals_count = rental_counts.get(site_id, 0)
+            # History of the faces of the site, or of the canopy itself when it has no face
+            if record.face_count:
+                record.artwork_history_count = face_history_counts[site_id]
+            elif record.site_category == 'canopy':
+                record.artwork_history_count = canopy_history_counts.get(site_id, 0)
+            else:
+                record.artwork_history_count = 0
 
     def action_view_faces(self):
         self.ensure_one()
@@ -138,7 +150,7 @@ class MediaSiteMixin(models.AbstractModel):
             'type': 'ir.actions.act_window',
             'res_model': 'sale.order.line',
             'view_mode': 'list,form',
-            'domain': [('id', 'in', self.lease_line_ids.ids)],
+            'domain': [('site_id', '=', self._get_site_id())],
         }
 
     def action_view_expenses(self):
@@ -153,20 +165,6 @@ class MediaSiteMixin(models.AbstractModel):
             'context': {'default_site_id': base_id},
         }
 
-    def _compute_lease_history(self):
-        for record in self:
-            domain = [('media_face_id', 'in', record.face_ids.ids)]
-            if record.site_category == 'canopy':
-                canopy = self.env['media.canopy'].search([('site_id', '=', record.id)], limit=1)
-                if canopy:
-                    domain = ['|'] + domain + [('canopy_id', '=', canopy.id)]
-            elif record.site_category == 'digital':
-                screen = self.env['media.digital.screen'].search([('site_id', '=', record.id)], limit=1)
-                if screen:
-                    domain = ['|'] + domain + [('media_digital_screen_id', '=', screen.id)]
-            
-            record.lease_line_ids = self.env['sale.order.line'].search(domain)
-
 class MediaCounty(models.Model):
     _name = 'media.county'
     _description = 'Kenya County'
@@ -220,7 +218,7 @@ class MediaSite(models.Model):
     # Links (Common to all assets)
     face_ids = fields.One2many('media.face', 'site_id', string='Faces')
     permit_history_ids = fields.One2many('media.permit.history', 'site_id', string='Permit History')
-    lease_line_ids = fields.One2many('sale.order.line', compute='_compute_lease_history', string='Lease History')
+    lease_line_ids = fields.One2many('sale.order.line', 'site_id', string='Lease History')
     expense_ids = fields.One2many('media.expense', 'site_id', string='Expenses')
     artwork_history_ids = fields.One2many('media.artwork.history', 'site_id', string='Artwork History')
     image_ids = fields.Many2many('ir.attachment', string='Site Photos')
@@ -246,10 +244,38 @@ class MediaSite(models.Model):
     
 
     
-    total_faces_count = fields.Integer(compute='_compute_site_stats', string='Total Faces', store=True, aggregator="sum")
-    occupied_faces_count = fields.Integer(compute='_compute_site_stats', string='Occupied Faces', store=True, aggregator="sum")
-    available_faces_count = fields.Integer(compute='_compute_site_stats', string='Available Faces', store=True, aggregator="sum")
-    total_monthly_revenue = fields.Float(compute='_compute_site_stats', string='Monthly Revenue', store=True, aggregator="sum")
+    total_faces_count = fields.Integer(compute='_compute_occupancy_stats', string='Total Faces', store=True, aggregator="sum")
+    occupied_faces_count = fields.Integer(compute='_compute_occupancy_stats', string='Occupied Faces', store=True, aggregator="sum")
+    available_faces_count = fields.Integer(compute='_compute_occupancy_stats', string='Available Faces', store=True, aggregator="sum")
+    total_monthly_revenue = fields.Float(compute='_compute_occupancy_stats', string='Monthly Revenue', store=True, aggregator="sum")
+
+    @api.depends('face_ids', 'face_ids.occupancy_status', 'face_ids.price_per_month')
+    def _compute_occupancy_stats(self):
+        """ Only the sites of the modified faces are recomputed, all together
+        with one grouped query on their faces.
+        """
+        stats = defaultdict(lambda: {'total': 0, 'occupied': 0, 'revenue': 0.0})
+        for site, status, count, revenue in self.env['media.face']._read_group(
+                [('site_id', 'in', self._origin.ids)], ['site_id', 'occupancy_status'], ['__count', 'price_per_month:sum']):
+            stats[site.id]['total'] += count
+            stats[site.id]['revenue'] += revenue or 0.0
+            if status == 'booked':
+                stats[site.id]['occupied'] += count
+
+        for record in self:
+            if record.id:
+                site_stats = stats[record.id]
+            else:
+                # Faces being edited in a form are not in the database yet
+                site_stats = {
+                    'total': len(record.face_ids),
+                    'occupied': len(record.face_ids.filtered(lambda f: f.occupancy_status == 'booked')),
+                    'revenue': sum(record.face_ids.mapped('price_per_month')),
+                }
+            record.total_faces_count = site_stats['total']
+            record.occupied_faces_count = site_stats['occupied']
+            record.available_faces_count = site_stats['total'] - site_stats['occupied']
+            record.total_monthly_revenue = site_stats['revenue']
 
     @api.depends('name', 'code', 'shop_name')
     def _compute_display_name(self):
@@ -273,7 +299,8 @@ class MediaBillboard(models.Model):
     _name = 'media.billboard'
     _description = 'Billboard Asset'
     _inherits = {'media.site': 'site_id'}
-    _inherit = ['media.site.mixin', 'mail.thread', 'mail.activity.mixin']
+    _inherit = ['media.site.mixin', 'mail.thread', 'mail.activity.mixin', 'media.report.image.mixin']
+    _report_image_fields = ['image_1', 'image_2']
 
     site_id = fields.Many2one('media.site', string='Base Site', required=True, ondelete='cascade')
     
@@ -284,21 +311,6 @@ class MediaBillboard(models.Model):
     image_1 = fields.Image(string='Image 1')
     image_2 = fields.Image(string='Image 2')
     comments = fields.Text(string='Comments')
-    image_report = fields.Image(compute='_compute_image_report')
-
-    def _compute_image_report(self):
-        for record in self:
-            main_image = record.image_1 or record.image_2
-            if main_image:
-                try:
-                    # In Odoo, Image fields are often Base64. PIL/image_process needs decoded bytes.
-                    decoded = base64.b64decode(main_image)
-                    processed = image_process(decoded, size=(800, 800), quality=80)
-                    record.image_report = base64.b64encode(processed)
-                except Exception:
-                    record.image_report = False
-            else:
-                record.image_report = False
 
     @api.model_create_multi
     def create(self, vals_list):
@@ -312,7 +324,8 @@ class MediaCanopy(models.Model):
     _name = 'media.canopy'
     _description = 'Canopy Asset'
     _inherits = {'media.site': 'site_id'}
-    _inherit = ['media.site.mixin', 'mail.thread', 'mail.activity.mixin']
+    _inherit = ['media.site.mixin', 'mail.thread', 'mail.activity.mixin', 'media.report.image.mixin']
+    _report_image_fields = ['canopy_image', 'measurement_image_1', 'measurement_image_2', 'measurement_image_3', 'measurement_image_4']
 
     site_id = fields.Many2one('media.site', string='Base Site', required=True, ondelete='cascade')
 
@@ -340,20 +353,6 @@ class MediaCanopy(models.Model):
     allocated_date = fields.Date(string='Allocated Date')
     
     canopy_image = fields.Image(string='Canopy Image')
-    image_report = fields.Image(compute='_compute_image_report')
-
-    def _compute_image_report(self):
-        for record in self:
-            if record.canopy_image:
-                try:
-                    decoded = base64.b64decode(record.canopy_image)
-                    processed = image_process(decoded, size=(800, 800), quality=80)
-                    record.image_report = base64.b64encode(processed)
-                except Exception:
-                    record.image_report = False
-            else:
-                record.image_report = False
-
     last_renovation_date = fields.Date(string='Last Renovated', compute='_compute_last_renovation', store=True)
     last_renovation_id = fields.Many2one('media.artwork.history', string='Last Renovation Artwork', compute='_compute_last_renovation', store=True)
 
@@ -392,7 +391,7 @@ class MediaCanopy(models.Model):
     def write(self, vals):
         res = super(MediaCanopy, self).write(vals)
         if not self.env.context.get('skip_history_creation'):
-            if 'canopy_image' in vals:
+            if vals.get('canopy_image'):
                 for record in self:
                     # Find associated face (canopies should usually have one)
                     face = record.face_ids[:1]
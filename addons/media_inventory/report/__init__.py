@@ -0,0 +1 @@
+from . import media_asset_report
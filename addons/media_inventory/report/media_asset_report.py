@@ -0,0 +1,34 @@
+from odoo import models, api
+
+
+class ReportMediaAsset(models.AbstractModel):
+    _name = 'report.media_inventory.report_media_asset_template'
+    _description = 'Billboard Asset Report'
+
+    @api.model
+    def _get_report_values(self, docids, data=None):
+        faces = self.env['media.face'].browse(docids)
+        # The template falls back on the image of the billboard of the face
+        billboards = self.env['media.billboard'].search([('site_id', 'in', faces.site_id.ids)])
+        checksums = list(faces._get_report_image_checksums().values()) + list(billboards._get_report_image_checksums().values())
+        self.env['media.report.image']._get_thumbnails(checksums)
+        return {
+            'doc_ids': docids,
+            'doc_model': 'media.face',
+            'docs': faces,
+        }
+
+
+class ReportCanopyAsset(models.AbstractModel):
+    _name = 'report.media_inventory.report_canopy_asset_template'
+    _description = 'Canopy Asset Report'
+
+    @api.model
+    def _get_report_values(self, docids, data=None):
+        canopies = self.env['media.canopy'].browse(docids)
+        canopies._prepare_report_images()
+        return {
+            'doc_ids': docids,
+            'doc_model': 'media.canopy',
+            'docs': canopies,
+        }
@@ -1 +1,5 @@
 from . import test_face_lease_dates
+from . import test_face_booking
+from . import test_site_stats
+from . import test_report_image
+from . import test_artwork
@@ -0,0 +1,23 @@
+import base64
+
+from odoo.tests.common import TransactionCase
+
+TRANSPARENT_1PX = (
+    b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01'
+    b'\x08\x06\x00\x00\x00\x1f\x15\xc4\x89\x00\x00\x00\nIDATx\x9cc\x00\x01'
+    b'\x00\x00\x05\x00\x01\r\n-\xb4\x00\x00\x00\x00IEND\xaeB`\x82'
+)
+
+
+class MediaInventoryCommon(TransactionCase):
+
+    def setUp(self):
+        super(MediaInventoryCommon, self).setUp()
+        self.placeholder = base64.b64encode(TRANSPARENT_1PX)
+        self.partner = self.env['res.partner'].create({'name': 'Test Client'})
+        self.site = self.env['media.site'].create({'name': 'Test Site', 'code': 'TS'})
+        self.face = self.env['media.face'].create({
+            'name': 'Face 1',
+            'site_id': self.site.id,
+            'face_type': 'inbound',
+        })
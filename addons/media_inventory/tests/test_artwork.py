@@ -0,0 +1,59 @@
+from odoo import fields
+from dateutil.relativedelta import relativedelta
+
+from odoo.addons.media_inventory.tests.common import MediaInventoryCommon
+
+
+class TestArtwork(MediaInventoryCommon):
+
+    def test_artwork_stored_once(self):
+        """ The contract line, its history and later uploads share the same artwork """
+        order = self.env['sale.order'].create({
+            'partner_id': self.partner.id,
+            'order_line': [(0, 0, {
+                'product_id': self.face.product_id.id,
+                'media_face_id': self.face.id,
+                'start_date': fields.Date.today(),
+                'end_date': fields.Date.today() + relativedelta(months=1),
+                'artwork_file': self.placeholder,
+            })]
+        })
+        line = order.order_line
+        self.assertTrue(line.artwork_id)
+        history = self.env['media.artwork.history'].search([('sale_order_line_id', '=', line.id)])
+        self.assertEqual(history.artwork_id, line.artwork_id)
+
+        other = self.env['media.artwork.history'].create({
+            'face_id': self.face.id,
+            'artwork_file': self.placeholder,
+            'description': 'Same artwork uploaded again',
+        })
+        self.assertEqual(other.artwork_id, line.artwork_id)
+        self.assertEqual(self.env['media.artwork'].search_count([('checksum', '=', line.artwork_id.checksum)]), 1)
+        self.assertTrue(other.artwork_file)
+
+    def test_batch_history_chaining(self):
+        """ Records created together are chained after the latest existing one """
+        History = self.env['media.artwork.history']
+        first = History.create({'face_id': self.face.id, 'artwork_file': self.placeholder, 'description': 'First'})
+        batch = History.create([
+            {'face_id': self.face.id, 'artwork_file': self.placeholder, 'description': 'Photo %s' % index}
+            for index in range(3)
+        ])
+        self.assertEqual(batch.mapped('previous_history_id'), first | batch[:2])
+        self.assertEqual(batch[2].previous_history_id, batch[1])
+
+    def test_orphan_artworks_collected(self):
+        """ Artworks no longer used by any record are garbage collected """
+        Artwork = self.env['media.artwork']
+        used = self.env['media.artwork.history'].create({
+            'face_id': self.face.id,
+            'artwork_file': self.placeholder,
+            'description': 'Used artwork',
+        }).artwork_id
+        orphan = Artwork.create({'checksum': 'no longer used'})
+        (used | orphan).flush_recordset()
+        self.env.cr.execute("UPDATE media_artwork SET write_date = NOW() - INTERVAL '2 days' WHERE id IN %s", [tuple((used | orphan).ids)])
+        Artwork._gc_orphan_artworks()
+        self.assertTrue(used.exists())
+        self.assertFalse(orphan.exists())
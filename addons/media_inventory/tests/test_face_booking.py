@@ -0,0 +1,109 @@
+from odoo.exceptions import ValidationError
+from odoo import fields
+from dateutil.relativedelta import relativedelta
+
+from odoo.addons.media_inventory.tests.common import MediaInventoryCommon
+
+
+class TestFaceBooking(MediaInventoryCommon):
+
+    def setUp(self):
+        super(TestFaceBooking, self).setUp()
+        self.Booking = self.env['media.face.booking']
+        self.today = fields.Date.today()
+
+    def _create_order(self, start, end):
+        return self.env['sale.order'].create({
+            'partner_id': self.partner.id,
+            'order_line': [(0, 0, {
+                'product_id': self.face.product_id.id,
+                'media_face_id': self.face.id,
+                'start_date': start,
+                'end_date': end,
+            })]
+        })
+
+    def test_calendar_follows_sale_lines(self):
+        """ The booking table mirrors sale order lines through the triggers """
+        order = self._create_order(self.today, self.today + relativedelta(months=1))
+        summary = self.Booking._get_face_summary(self.face.ids, self.today)[self.face.id]
+        self.assertTrue(summary['has_draft'])
+        self.assertFalse(summary['sale_start'])
+
+        order.action_confirm()
+        summary = self.Booking._get_face_summary(self.face.ids, self.today)[self.face.id]
+        self.assertEqual(summary['sale_start'], self.today)
+        self.assertEqual(summary['last_end'], self.today + relativedelta(months=1))
+
+        self.face._compute_occupancy_status()
+        self.face._compute_next_available_date()
+        self.assertEqual(self.face.occupancy_status, 'booked')
+        self.assertEqual(self.face.next_available_date, self.today + relativedelta(months=1, days=1))
+
+    def test_transferred_out_is_ignored(self):
+        """ Transferred-out bookings no longer occupy the face """
+        order = self._create_order(self.today, self.today + relativedelta(days=10))
+        order.action_confirm()
+        self.face.write({'transferred_out_sol_ids': [(4, order.order_line.id)]})
+
+        self.assertFalse(self.Booking._get_overlapping(self.face.ids, self.today, self.today))
+        self.assertTrue(self.Booking._get_overlapping(self.face.ids, self.today, self.today, include_transferred=True))
+        self.face._compute_occupancy_status()
+        self.assertEqual(self.face.occupancy_status, 'available')
+
+    def test_rollover_picks_crossed_boundaries(self):
+        """ The roll-over recomputes faces whose booking started since the last run """
+        order = self._create_order(self.today + relativedelta(days=1), self.today + relativedelta(days=10))
+        order.action_confirm()
+        self.face._compute_occupancy_status()
+        self.assertEqual(self.face.occupancy_status, 'available')
+
+        tomorrow = self.today + relativedelta(days=1)
+        self.assertIn(self.face.id, self.env['media.face']._get_rollover_ids(self.today, tomorrow))
+        self.assertNotIn(self.face.id, self.env['media.face']._get_rollover_ids(self.today, self.today))
+
+    def test_free_face_left_alone(self):
+        """ Free faces have no availability date and are not recomputed every night """
+        self.face._compute_next_available_date()
+        self.assertFalse(self.face.next_available_date)
+        yesterday = self.today - relativedelta(days=1)
+        self.assertNotIn(self.face.id, self.env['media.face']._get_rollover_ids(yesterday, self.today))
+
+    def test_search_available(self):
+        """ Manual bookings and transfers are taken into account by the availability service """
+        other_face = self.env['media.face'].create({
+            'name': 'Face 2',
+            'site_id': self.site.id,
+            'face_type': 'outbound',
+        })
+        history = self.env['media.artwork.history'].create({
+            'face_id': self.face.id,
+            'lease_start_date': self.today,
+            'lease_end_date': self.today + relativedelta(days=10),
+            'artwork_file': self.placeholder,
+            'description': 'Manual Booking',
+        })
+        Face = self.env['media.face']
+        available = Face._search_available(self.today + relativedelta(days=5), self.today + relativedelta(days=20))
+        self.assertNotIn(self.face, available)
+        self.assertIn(other_face, available)
+        self.assertNotIn(other_face, Face._search_available(self.today, self.today, face_type='inbound'))
+
+        self.face.write({'transferred_out_history_ids': [(4, history.id)]})
+        self.assertIn(self.face, Face._search_available(self.today, self.today))
+        available = Face._search_available(self.today, self.today, site_category='billboard')
+        self.assertIn(self.face | other_face, available)
+        self.assertEqual(Face._search_available(self.today, self.today, site_category='billboard', count=True), len(available))
+        self.assertEqual(Face._search_available(self.today, self.today, site_category='billboard', offset=1, count=True), len(available))
+
+    def test_batch_overlap_validation(self):
+        """ Overlapping lines of the same batch are rejected on confirmation """
+        order = self._create_order(self.today, self.today + relativedelta(days=10))
+        order.write({'order_line': [(0, 0, {
+            'product_id': self.face.product_id.id,
+            'media_face_id': self.face.id,
+            'start_date': self.today + relativedelta(days=5),
+            'end_date': self.today + relativedelta(days=15),
+        })]})
+        with self.assertRaises(ValidationError):
+            order.action_confirm()
@@ -1,7 +1,11 @@
+import base64
+
 from odoo.tests.common import TransactionCase
 from odoo import fields
 from dateutil.relativedelta import relativedelta
 
+from odoo.addons.media_inventory.tests.common import TRANSPARENT_1PX
+
 class TestFaceLeaseDates(TransactionCase):
 
     def setUp(self):
@@ -12,6 +16,7 @@ class TestFaceLeaseDates(TransactionCase):
         self.SO = self.env['sale.order']
         self.ArtworkHistory = self.env['media.artwork.history']
 
+        self.placeholder = base64.b64encode(TRANSPARENT_1PX)
         self.partner = self.Partner.create({'name': 'Test Client'})
         self.site = self.Site.create({'name': 'Test Site', 'code': 'TS'})
         self.face = self.Face.create({
@@ -36,6 +41,7 @@ class TestFaceLeaseDates(TransactionCase):
             'face_id': self.face.id,
             'lease_start_date': start1,
             'lease_end_date': end1,
+            'artwork_file': self.placeholder,
             'description': 'Past Manual Booking',
         })
         self.face._compute_latest_lease_dates()
@@ -0,0 +1,53 @@
+from odoo.addons.media_inventory.models.report_image import _process_image
+from odoo.addons.media_inventory.tests.common import MediaInventoryCommon, TRANSPARENT_1PX
+
+
+class TestReportImage(MediaInventoryCommon):
+
+    def setUp(self):
+        super(TestReportImage, self).setUp()
+        self.faces = self.face | self.env['media.face'].create({
+            'name': 'Face 2',
+            'site_id': self.site.id,
+            'face_type': 'outbound',
+        })
+        self.faces.with_context(skip_history_creation=True).write({'default_artwork': self.placeholder})
+
+    def test_thumbnail_shared_by_checksum(self):
+        """ Identical images are processed once and the thumbnail is reused """
+        self.faces.invalidate_recordset(['image_report'])
+        self.assertTrue(all(self.faces.mapped('image_report')))
+        checksums = self.faces._get_report_image_checksums()
+        self.assertEqual(len(set(checksums.values())), 1)
+        thumbnails = self.env['media.report.image'].search([('checksum', 'in', list(checksums.values()))])
+        self.assertEqual(len(thumbnails), 1)
+
+    def test_cron_pregenerates_thumbnails(self):
+        """ The background job prepares the thumbnails of uploaded images """
+        self.env['media.report.image']._cron_generate_thumbnails()
+        checksum = self.faces[0]._get_report_image_checksums()[self.faces[0].id]
+        self.assertTrue(self.env['media.report.image'].search_count([('checksum', '=', checksum)]))
+
+    def test_process_images(self):
+        """ Images processed by the pool match the ones processed one by one """
+        ReportImage = self.env['media.report.image']
+        self.env['ir.config_parameter'].sudo().set_param('media_inventory.report_image_workers', 2)
+        raws = {index: TRANSPARENT_1PX for index in range(4)}
+        raws['invalid'] = b'not an image'
+        thumbnails = ReportImage._process_images(raws)
+        self.assertEqual(thumbnails[0], _process_image(TRANSPARENT_1PX))
+        self.assertEqual(len(set(thumbnails[index] for index in range(4))), 1)
+        self.assertFalse(thumbnails['invalid'])
+
+    def test_measurement_images_prerendered(self):
+        """ The pre-render stage covers every source image, not only the main one """
+        history = self.env['media.artwork.history'].create({
+            'face_id': self.face.id,
+            'artwork_file': self.placeholder,
+            'measurement_image': self.placeholder,
+            'description': 'Renovation',
+        })
+        history._prepare_report_images()
+        checksum = history._get_report_image_field_checksums()[history.id, 'measurement_image']
+        self.assertTrue(self.env['media.report.image'].search_count([('checksum', '=', checksum)]))
+        self.assertTrue(history._get_report_image('measurement_image'))
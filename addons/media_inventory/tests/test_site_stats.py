@@ -0,0 +1,75 @@
+import base64
+
+from odoo.tests.common import TransactionCase
+from odoo import fields
+from dateutil.relativedelta import relativedelta
+
+from odoo.addons.media_inventory.tests.common import TRANSPARENT_1PX
+
+class TestSiteStats(TransactionCase):
+
+    def setUp(self):
+        super(TestSiteStats, self).setUp()
+        self.placeholder = base64.b64encode(TRANSPARENT_1PX)
+        self.partner = self.env['res.partner'].create({'name': 'Test Client'})
+        self.sites = self.env['media.site'].create([
+            {'name': 'Site A', 'code': 'SA'},
+            {'name': 'Site B', 'code': 'SB'},
+        ])
+        self.faces = self.env['media.face'].create([{
+            'name': 'Face %s' % index,
+            'site_id': site.id,
+            'face_type': face_type,
+            'price_per_month': 1000,
+        } for site in self.sites for index, face_type in enumerate(('inbound', 'outbound'))])
+
+    def test_site_stats(self):
+        """ Counters of several sites are computed together """
+        site_a, site_b = self.sites
+        self.env['media.artwork.history'].create({
+            'face_id': self.faces[0].id,
+            'artwork_file': self.placeholder,
+            'description': 'Manual Booking',
+        })
+        self.sites.invalidate_recordset()
+        self.assertEqual(self.sites.mapped('face_count'), [2, 2])
+        self.assertEqual(site_a.artwork_history_count, 1)
+        self.assertEqual(site_b.artwork_history_count, 0)
+        self.assertEqual(self.sites.mapped('total_monthly_revenue'), [2000.0, 2000.0])
+
+    def test_occupancy_follows_faces(self):
+        """ Booking a face updates the stored counters of its site only """
+        site_a, site_b = self.sites
+        today = fields.Date.today()
+        self.env['media.artwork.history'].create({
+            'face_id': self.faces[0].id,
+            'lease_start_date': today,
+            'lease_end_date': today + relativedelta(months=1),
+            'artwork_file': self.placeholder,
+            'description': 'Manual Booking',
+        })
+        self.assertEqual(site_a.occupied_faces_count, 1)
+        self.assertEqual(site_a.available_faces_count, 1)
+        self.assertEqual(site_b.occupied_faces_count, 0)
+
+    def test_lease_lines_linked_to_site(self):
+        """ Sale order lines are linked to the site of their face """
+        site_a, site_b = self.sites
+        order = self.env['sale.order'].create({
+            'partner_id': self.partner.id,
+            'order_line': [(0, 0, {
+                'product_id': self.faces[0].product_id.id,
+                'media_face_id': self.faces[0].id,
+                'start_date': fields.Date.today(),
+                'end_date': fields.Date.today() + relativedelta(months=1),
+                'price_unit': 1000,
+            })]
+        })
+        self.assertEqual(order.order_line.site_id, site_a)
+        self.assertEqual(site_a.lease_line_ids, order.order_line)
+        self.assertEqual(self.sites.mapped('rentals_count'), [1, 0])
+
+        order.order_line.media_face_id = self.faces[2]
+        self.sites.invalidate_recordset()
+        self.assertEqual(order.order_line.site_id, site_b)
+        self.assertEqual(self.sites.mapped('rentals_count'), [0, 1])
@@ -3,7 +3,12 @@ from odoo import models, fields, api, _
 class MediaJobCard(models.Model):
     _name = 'media.job.card'
     _description = 'Job Card'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'media.report.image.mixin']
+    _report_image_fields = [
+        'new_canopy_photo', 'old_canopy_photo', 'damaged_photo',
+        'new_measurement_image_1', 'new_measurement_image_2', 'new_measurement_image_3', 'new_measurement_image_4',
+        'old_measurement_image_1', 'old_measurement_image_2', 'old_measurement_image_3', 'old_measurement_image_4',
+    ]
 
     name = fields.Char(string='Job Number', required=True, copy=False, readonly=True, index=True, default=lambda self: _('New'))
     job_type_id = fields.Many2one('media.job.type', string='Job Type', required=True)
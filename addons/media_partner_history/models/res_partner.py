@@ -1,89 +1,71 @@
 from odoo import models, fields, api, _
 
+MEDIA_CATEGORIES = ['billboard', 'digital', 'canopy', 'printing']
+
 class ResPartner(models.Model):
     _inherit = 'res.partner'
 
     media_line_ids = fields.One2many('sale.order.line', 'partner_id', string='All Media Lines', domain=[('state', 'in', ['sale', 'done'])])
     
-    billboard_line_ids = fields.Many2many('sale.order.line', string='Billboard History', compute='_compute_media_history_lines')
-    digital_line_ids = fields.Many2many('sale.order.line', string='Digital History', compute='_compute_media_history_lines')
-    canopy_line_ids = fields.Many2many('sale.order.line', string='Canopy History', compute='_compute_media_history_lines')
-    printing_line_ids = fields.Many2many('sale.order.line', string='Printing History', compute='_compute_media_history_lines')
+    billboard_line_ids = fields.One2many('sale.order.line', 'partner_id', string='Billboard History', domain=[('state', 'in', ['sale', 'done']), ('media_category', '=', 'billboard')])
+    digital_line_ids = fields.One2many('sale.order.line', 'partner_id', string='Digital History', domain=[('state', 'in', ['sale', 'done']), ('media_category', '=', 'digital')])
+    canopy_line_ids = fields.One2many('sale.order.line', 'partner_id', string='Canopy History', domain=[('state', 'in', ['sale', 'done']), ('media_category', '=', 'canopy')])
+    printing_line_ids = fields.One2many('sale.order.line', 'partner_id', string='Printing History', domain=[('state', 'in', ['sale', 'done']), ('media_category', '=', 'printing')])
 
-    billboard_count = fields.Integer(compute='_compute_media_history_lines', string='Billboards')
-    digital_count = fields.Integer(compute='_compute_media_history_lines', string='Digital Slots')
-    canopy_count = fields.Integer(compute='_compute_media_history_lines', string='Canopies')
-    printing_count = fields.Integer(compute='_compute_media_history_lines', string='Printing')
+    billboard_count = fields.Integer(compute='_compute_media_history_counts', string='Billboards')
+    digital_count = fields.Integer(compute='_compute_media_history_counts', string='Digital Slots')
+    canopy_count = fields.Integer(compute='_compute_media_history_counts', string='Canopies')
+    printing_count = fields.Integer(compute='_compute_media_history_counts', string='Printing')
 
     billboard_artwork_count = fields.Integer(compute='_compute_artwork_counts', string='Billboard Art')
     digital_artwork_count = fields.Integer(compute='_compute_artwork_counts', string='Digital Art')
     canopy_artwork_count = fields.Integer(compute='_compute_artwork_counts', string='Canopy Art')
 
-    def _compute_media_history_lines(self):
+    def _compute_media_history_counts(self):
+        counts = {
+            (partner.id, category): count
+            for partner, category, count in self.env['sale.order.line']._read_group(
+                self._get_media_history_domain(),
+                ['partner_id', 'media_category'], ['__count'])
+        }
         for partner in self:
-            # We fetch all confirmed sale order lines for this partner
-            # that have any of our media-related fields set.
-            # Using order_id.partner_id for robustness if partner_id is not stored.
-            all_lines = self.env['sale.order.line'].search([
-                ('order_id.partner_id', '=', partner.id),
-                ('state', 'in', ['sale', 'done']),
-                '|', '|', '|',
-                ('media_face_id', '!=', False),
-                ('canopy_id', '!=', False),
-                ('media_digital_screen_id', '!=', False),
-                ('media_slot_id', '!=', False)
-            ])
-
-            billboard_lines = []
-            digital_lines = []
-            canopy_lines = []
-            printing_lines = []
-
-            for line in all_lines:
-                if line.canopy_id:
-                    canopy_lines.append(line.id)
-                elif line.media_slot_id or (line.media_face_id and line.media_face_id.face_type == 'digital'):
-                    digital_lines.append(line.id)
-                elif line.media_face_id:
-                    if 'flexi' in (line.media_face_id.name or '').lower():
-                        printing_lines.append(line.id)
-                    else:
-                        billboard_lines.append(line.id)
-                # Fallback check for printing products if any (future proofing)
-                elif line.product_id and 'printing' in (line.product_id.name or '').lower():
-                    printing_lines.append(line.id)
-
-            partner.billboard_line_ids = [(6, 0, billboard_lines)]
-            partner.digital_line_ids = [(6, 0, digital_lines)]
-            partner.canopy_line_ids = [(6, 0, canopy_lines)]
-            partner.printing_line_ids = [(6, 0, printing_lines)]
-            
-            partner.billboard_count = len(billboard_lines)
-            partner.digital_count = len(digital_lines)
-            partner.canopy_count = len(canopy_lines)
-            partner.printing_count = len(printing_lines)
+            for category in MEDIA_CATEGORIES:
+                partner['%s_count' % category] = counts.get((partner._origin.id, category), 0)
 
     def _compute_artwork_counts(self):
+        counts = {
+            (partner.id, category): count
+            for partner, category, count in self.env['media.artwork.history']._read_group(
+                [('partner_id', 'in', self._origin.ids)], ['partner_id', 'site_category'], ['__count'])
+        }
         for partner in self:
-            hist = self.env['media.artwork.history'].search([('partner_id', '=', partner.id)])
-            partner.billboard_artwork_count = len(hist.filtered(lambda h: h.site_category == 'billboard'))
-            partner.digital_artwork_count = len(hist.filtered(lambda h: h.site_category == 'digital'))
-            partner.canopy_artwork_count = len(hist.filtered(lambda h: h.site_category == 'canopy'))
+            partner.billboard_artwork_count = counts.get((partner._origin.id, 'billboard'), 0)
+            partner.digital_artwork_count = counts.get((partner._origin.id, 'digital'), 0)
+            partner.canopy_artwork_count = counts.get((partner._origin.id, 'canopy'), 0)
+
+    def _get_media_history_domain(self, category=None):
+        domain = [
+            ('partner_id', 'in', self._origin.ids),
+            ('state', 'in', ['sale', 'done']),
+        ]
+        if category:
+            return domain + [('media_category', '=', category)]
+        return domain + [('media_category', '!=', False)]
 
     def action_view_billboard_history(self):
         view_id = self.env.ref('media_partner_history.view_sale_order_line_media_history_list').id
-        return self._action_view_history(self.billboard_line_ids, _('Billboard History'), view_id=view_id)
+        return self._action_view_history('billboard', _('Billboard History'), view_id=view_id)
 
     def action_view_digital_history(self):
         view_id = self.env.ref('media_partner_history.view_sale_order_line_media_history_list').id
-        return self._action_view_history(self.digital_line_ids, _('Digital History'), view_id=view_id)
+        return self._action_view_history('digital', _('Digital History'), view_id=view_id)
 
     def action_view_canopy_history(self):
         view_id = self.env.ref('media_partner_history.view_sale_order_line_media_history_list').id
-        return self._action_view_history(self.canopy_line_ids, _('Canopy History'), view_id=view_id)
+        return self._action_view_history('canopy', _('Canopy History'), view_id=view_id)
 
     def action_view_printing_history(self):
-        return self._action_view_history(self.printing_line_ids, _('Printing History'))
+        return self._action_view_history('printing', _('Printing History'))
 
     def action_view_billboard_artwork(self):
         return self._action_view_artwork('billboard', _('Billboard Artwork History'))
@@ -104,13 +86,13 @@ class ResPartner(models.Model):
             'context': {'default_partner_id': self.id, 'default_site_category': category},
         }
 
-    def _action_view_history(self, lines, name, view_id=False):
+    def _action_view_history(self, category, name, view_id=False):
         action = {
             'name': name,
             'type': 'ir.actions.act_window',
             'res_model': 'sale.order.line',
             'view_mode': 'list,form',
-            'domain': [('id', 'in', lines.ids)],
+            'domain': self._get_media_history_domain(category),
             'context': {'create': False},
         }
         if view_id:
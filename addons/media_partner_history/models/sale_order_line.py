@@ -0,0 +1,26 @@
+from odoo import models, fields, api
+
+class SaleOrderLine(models.Model):
+    _inherit = 'sale.order.line'
+
+    media_category = fields.Selection([
+        ('billboard', 'Billboard'),
+        ('digital', 'Digital'),
+        ('canopy', 'Canopy'),
+        ('printing', 'Printing'),
+    ], string='Media Category', compute='_compute_media_category', store=True, index='btree_not_null')
+
+    @api.depends('canopy_id', 'media_slot_id', 'media_face_id.face_type', 'media_face_id.name', 'media_digital_screen_id', 'product_id.name')
+    def _compute_media_category(self):
+        for line in self:
+            if line.canopy_id:
+                line.media_category = 'canopy'
+            elif line.media_slot_id or line.media_face_id.face_type == 'digital':
+                line.media_category = 'digital'
+            elif line.media_face_id:
+                line.media_category = 'printing' if 'flexi' in (line.media_face_id.name or '').lower() else 'billboard'
+            # Fallback check for printing products if any (future proofing)
+            elif line.media_digital_screen_id and 'printing' in (line.product_id.name or '').lower():
+                line.media_category = 'printing'
+            else:
+                line.media_category = False
@@ -0,0 +1,76 @@
+from odoo import fields
+from dateutil.relativedelta import relativedelta
+
+from odoo.addons.media_inventory.tests.common import MediaInventoryCommon
+
+
+class TestPartnerHistory(MediaInventoryCommon):
+
+    def setUp(self):
+        super(TestPartnerHistory, self).setUp()
+        self.flexi_face = self.env['media.face'].create({
+            'name': 'Flexi Banner',
+            'site_id': self.site.id,
+            'face_type': 'outbound',
+        })
+        self.digital_face = self.env['media.face'].create({
+            'name': 'Digital Face',
+            'site_id': self.site.id,
+            'face_type': 'digital',
+        })
+        today = fields.Date.today()
+        self.order = self.env['sale.order'].create({
+            'partner_id': self.partner.id,
+            'order_line': [(0, 0, {
+                'product_id': face.product_id.id,
+                'media_face_id': face.id,
+                'start_date': today,
+                'end_date': today + relativedelta(months=1),
+            }) for face in (self.face, self.flexi_face, self.digital_face)],
+        })
+
+    def _get_line(self, face):
+        return self.order.order_line.filtered(lambda line: line.media_face_id == face)
+
+    def test_media_category(self):
+        """ Lines are classified by the face they book """
+        self.assertEqual(self._get_line(self.face).media_category, 'billboard')
+        self.assertEqual(self._get_line(self.flexi_face).media_category, 'printing')
+        self.assertEqual(self._get_line(self.digital_face).media_category, 'digital')
+
+        self.flexi_face.name = 'Face 3'
+        self.assertEqual(self._get_line(self.flexi_face).media_category, 'billboard')
+
+    def test_history_lines(self):
+        """ Only confirmed lines make the history of the client """
+        self.assertFalse(self.partner.media_line_ids)
+        self.assertEqual(self.partner.billboard_count, 0)
+
+        self.order.action_confirm()
+        self.partner.invalidate_recordset()
+        self.assertEqual(self.partner.media_line_ids, self.order.order_line)
+        self.assertEqual(self.partner.billboard_line_ids, self._get_line(self.face))
+        self.assertEqual(self.partner.printing_line_ids, self._get_line(self.flexi_face))
+        self.assertEqual(self.partner.digital_line_ids, self._get_line(self.digital_face))
+        self.assertFalse(self.partner.canopy_line_ids)
+        self.assertEqual(
+            [self.partner.billboard_count, self.partner.digital_count, self.partner.canopy_count, self.partner.printing_count],
+            [1, 1, 0, 1])
+
+        action = self.partner.action_view_printing_history()
+        self.assertEqual(self.env['sale.order.line'].search(action['domain']), self._get_line(self.flexi_face))
+
+    def test_artwork_counts(self):
+        """ Artwork uploads are counted per site category """
+        self.env['media.artwork.history'].create([{
+            'face_id': face.id,
+            'partner_id': self.partner.id,
+            'site_category': category,
+            'artwork_file': self.placeholder,
+            'description': 'Artwork %s' % index,
+        } for index, (face, category) in enumerate([
+            (self.face, 'billboard'), (self.flexi_face, 'billboard'), (self.digital_face, 'digital'),
+        ])])
+        self.assertEqual(self.partner.billboard_artwork_count, 2)
+        self.assertEqual(self.partner.digital_artwork_count, 1)
+        self.assertEqual(self.partner.canopy_artwork_count, 0)